@@ -1,3 +1,5 @@
+from typing import Union
+from core.utils.metrics import track_call
 from openai import AzureOpenAI
 from core.audio.speech_to_text.utils.words_parser import parse_stt_azure_openai_words
 
@@ -7,7 +9,8 @@ azure_config_interface = {
     "deployment": str
 }
 
-def generate_azure_openai_speech_to_text(api_key: str, audio_file: str, azure_config: dict) -> list[dict]:
+def generate_azure_openai_speech_to_text(api_key: str, audio_file: Union[str, tuple[str, bytes]], azure_config: dict) -> list[dict]:
+    """audio_file is a path, or a (file name, bytes) tuple of audio already in memory."""
     # Validate config values exist
     required_keys = ["endpoint", "api_version", "deployment"]
     if not all(key in azure_config for key in required_keys):
@@ -21,12 +24,18 @@ def generate_azure_openai_speech_to_text(api_key: str, audio_file: str, azure_co
         deployment=azure_config["deployment"]
     )
 
-    # Use context manager for file handling
-    with open(audio_file, "rb") as audio:
-        transcript = client.audio.transcriptions.create(
-            file=audio,
-            response_format="verbose_json",
-            timestamp_granularities=["word"]    
-        ) 
+    transcribe = lambda audio: client.audio.transcriptions.create(
+        file=audio,
+        response_format="verbose_json",
+        timestamp_granularities=["word"]
+    )
+    if isinstance(audio_file, tuple):
+        with track_call("azure_openai", "stt"):
+            transcript = transcribe(audio_file)
+    else:
+        # Use context manager for file handling
+        with open(audio_file, "rb") as audio:
+            with track_call("azure_openai", "stt"):
+                transcript = transcribe(audio)
 
     return parse_stt_azure_openai_words(transcript.words)
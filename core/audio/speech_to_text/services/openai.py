@@ -1,14 +1,23 @@
+from typing import Union
+from core.utils.metrics import track_call
 from openai import OpenAI
 from core.audio.speech_to_text.utils.words_parser import parse_stt_openai_words
 
-def generate_openai_speech_to_text(api_key: str, audio_file: str) -> list[dict]:
+def generate_openai_speech_to_text(api_key: str, audio_file: Union[str, tuple[str, bytes]]) -> list[dict]:
+    """audio_file is a path, or a (file name, bytes) tuple of audio already in memory."""
     client = OpenAI(api_key=api_key)
-    audio_file = open(audio_file, "rb")
-    transcript = client.audio.transcriptions.create(
+    transcribe = lambda audio: client.audio.transcriptions.create(
         model="whisper-1",
-        file=audio_file,
+        file=audio,
         response_format="verbose_json",
-        timestamp_granularities=["word"]    
+        timestamp_granularities=["word"]
     )
-    
+    if isinstance(audio_file, tuple):
+        with track_call("openai", "stt"):
+            transcript = transcribe(audio_file)
+    else:
+        with open(audio_file, "rb") as audio:
+            with track_call("openai", "stt"):
+                transcript = transcribe(audio)
+
     return parse_stt_openai_words(transcript.words)
@@ -1,16 +1,29 @@
-import core.audio.speech_to_text.services.openai as openai
-import core.audio.speech_to_text.services.azure_openai as azure_openai
-from typing import Literal
+import numpy as np
+from core.audio.speech_to_text.utils.chunking import transcribe_chunked
+from typing import Literal, Union
 
-def generate_speech_to_text(service: Literal["openai", "azure_openai"], api_key: str, audio_file: str, azure_config: dict = None) -> list[dict]:
+def generate_speech_to_text(service: Literal["openai", "azure_openai"], api_key: str, audio_file: Union[str, np.ndarray], azure_config: dict = None,
+                            chunked: bool = True, chunk_seconds: float = 60, max_workers: int = 4) -> list[dict]:
+    """
+    Transcribe an audio file, or 16 kHz mono PCM in memory (chunked only), into word timestamps.
+    With chunked, long audio (or audio over the upload limit) is split at silences and the chunks are transcribed concurrently.
+    """
     if service == "openai":
         try:
-            return openai.generate_openai_speech_to_text(api_key, audio_file)
+            import core.audio.speech_to_text.services.openai as openai
+            transcribe = lambda audio: openai.generate_openai_speech_to_text(api_key, audio)
+            if chunked:
+                return transcribe_chunked(transcribe, audio_file, chunk_seconds=chunk_seconds, max_workers=max_workers)
+            return transcribe(audio_file)
         except Exception as e:
             raise ValueError(f"Error generating speech-to-text with OpenAI: {e}")
     elif service == "azure_openai":
         try:
-            return azure_openai.generate_azure_openai_speech_to_text(api_key, audio_file, azure_config)
+            import core.audio.speech_to_text.services.azure_openai as azure_openai
+            transcribe = lambda audio: azure_openai.generate_azure_openai_speech_to_text(api_key, audio, azure_config)
+            if chunked:
+                return transcribe_chunked(transcribe, audio_file, chunk_seconds=chunk_seconds, max_workers=max_workers)
+            return transcribe(audio_file)
         except Exception as e:
             raise ValueError(f"Error generating speech-to-text with Azure OpenAI: {e}")
     else:
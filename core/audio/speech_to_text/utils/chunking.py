@@ -0,0 +1,171 @@
+"""
+Silence-split chunked transcription for long audio.
+
+Short audio is uploaded whole, its duration read from the container header without decoding it.
+Longer audio is decoded once to 16 kHz mono PCM, split at the quietest point near every
+chunk boundary (vectorized RMS scan), the chunks are transcribed concurrently and the
+word timestamps are merged back with their offsets.
+"""
+
+import os
+import re
+import contextvars
+import uuid
+import logging
+import tempfile
+import subprocess as sp
+import numpy as np
+import imageio_ffmpeg
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Union
+
+from core.audio.speech_to_text.utils.preprocess import STT_SAMPLE_RATE, encode_pcm, encode_pcm_bytes, prepare_stt_audio
+from core.utils.workspace import current_workspace
+
+WHISPER_UPLOAD_LIMIT_BYTES = 25 * 1024 * 1024
+
+
+def probe_duration(audio_file: str) -> Optional[float]:
+    """Duration of an audio (or video) file from its container header, None when it isn't known."""
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-i", audio_file]
+    # Without an output ffmpeg exits with an error, after printing the input infos
+    result = sp.run(cmd, stdout=sp.DEVNULL, stderr=sp.PIPE, stdin=sp.DEVNULL)
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr.decode(errors="ignore"))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def load_pcm(audio_file: str, sample_rate: int = STT_SAMPLE_RATE) -> np.ndarray:
+    """Decode any audio (or video) file to mono float32 PCM at sample_rate."""
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error",
+           "-i", audio_file, "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "-"]
+    result = sp.run(cmd, stdout=sp.PIPE, stderr=sp.PIPE, stdin=sp.DEVNULL)
+    if result.returncode != 0:
+        raise RuntimeError(f"Error decoding {audio_file}: {result.stderr.decode(errors='ignore')}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def find_split_points(samples: np.ndarray, sample_rate: int, chunk_seconds: float = 60,
+                      search_seconds: float = 10, frame_ms: int = 30) -> list[float]:
+    """
+    Find split times (seconds) close to every chunk_seconds, at the lowest-energy frame
+    in the search_seconds before each nominal boundary.
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return []
+
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    # Smooth over ~450 ms so short pauses between words lose against real silences
+    smoothing = max(1, int(450 / frame_ms))
+    rms = np.convolve(rms, np.ones(smoothing) / smoothing, mode="same")
+
+    frames_per_second = 1000 / frame_ms
+    duration = len(samples) / sample_rate
+    split_points = []
+    boundary = chunk_seconds
+    while boundary < duration - search_seconds:
+        window_start = int(max(boundary - search_seconds, split_points[-1] if split_points else 0) * frames_per_second)
+        window_end = int(boundary * frames_per_second)
+        quietest = window_start + int(np.argmin(rms[window_start:window_end]))
+        split_time = (quietest + 0.5) / frames_per_second
+        split_points.append(split_time)
+        boundary = split_time + chunk_seconds
+    return split_points
+
+
+def merge_chunk_words(chunk_words: list[list[dict]], chunk_offsets: list[float], boundaries: list[float]) -> list[dict]:
+    """
+    Offset the words of every chunk and keep, for each chunk, only the words whose midpoint
+    falls between its boundaries, which de-duplicates the words heard in the overlaps.
+    """
+    merged = []
+    for index, (words, offset) in enumerate(zip(chunk_words, chunk_offsets)):
+        low, high = boundaries[index], boundaries[index + 1]
+        for word in words:
+            start, end = word["start"] + offset, word["end"] + offset
+            if low <= (start + end) / 2 < high:
+                merged.append({**word, "start": start, "end": end})
+    merged.sort(key=lambda word: word["start"])
+    return merged
+
+
+AudioUpload = Union[str, tuple[str, bytes]]
+
+
+def transcribe_chunked(transcribe: Callable[[AudioUpload], list[dict]], audio_file: Union[str, np.ndarray],
+                       chunk_seconds: float = 60, overlap_seconds: float = 0.5, max_workers: int = 4,
+                       min_duration_to_split: Optional[float] = None, preprocess: bool = True,
+                       in_memory: bool = True) -> list[dict]:
+    """
+    Transcribe audio in silence-split chunks, concurrently.
+
+    Args:
+        transcribe: Transcribes one upload, a file path or a (file name, bytes) tuple, and returns
+            its words ({"start", "end", "text"}).
+        audio_file: Path to the audio file, or mono float32 PCM at 16 kHz already in memory.
+        chunk_seconds: Target chunk duration.
+        overlap_seconds: Audio added on both sides of each chunk so boundary words aren't cut.
+        max_workers: Number of chunks transcribed at the same time.
+        min_duration_to_split: Shorter audio under the upload limit is sent in one request. Defaults to 2 * chunk_seconds.
+        preprocess: Upload 16 kHz mono low bitrate audio instead of the original file.
+        in_memory: Encode the uploads to bytes instead of temporary files.
+
+    Returns:
+        list[dict]: The merged words, with timestamps relative to the whole audio.
+    """
+    from_memory = isinstance(audio_file, np.ndarray)
+    samples = np.asarray(audio_file, dtype=np.float32) if from_memory else None
+    duration = len(samples) / STT_SAMPLE_RATE if from_memory else probe_duration(audio_file)
+    if duration is None:
+        samples = load_pcm(audio_file, STT_SAMPLE_RATE)
+        duration = len(samples) / STT_SAMPLE_RATE
+    min_duration_to_split = min_duration_to_split if min_duration_to_split is not None else 2 * chunk_seconds
+
+    if duration <= min_duration_to_split:
+        if from_memory:
+            upload = encode_pcm_bytes(samples, STT_SAMPLE_RATE)
+            if len(upload[1]) <= WHISPER_UPLOAD_LIMIT_BYTES:
+                return transcribe(upload)
+        else:
+            upload_file = prepare_stt_audio(audio_file) if preprocess else audio_file
+            if os.path.getsize(upload_file) <= WHISPER_UPLOAD_LIMIT_BYTES:
+                return transcribe(upload_file)
+
+    if samples is None:
+        # Only decoded once chunking is needed
+        samples = load_pcm(audio_file, STT_SAMPLE_RATE)
+        duration = len(samples) / STT_SAMPLE_RATE
+    split_points = find_split_points(samples, STT_SAMPLE_RATE, chunk_seconds)
+    boundaries = [0.0] + split_points + [float("inf")]
+    logging.info(f"Transcribing {duration:.1f}s of audio in {len(split_points) + 1} chunks")
+
+    workspace = current_workspace()
+    chunks_dir = None if in_memory else tempfile.TemporaryDirectory(prefix="stt_chunks_", dir=workspace.path if workspace else None)
+    try:
+        chunks, chunk_offsets = [], []
+        for index in range(len(boundaries) - 1):
+            start = max(0.0, boundaries[index] - overlap_seconds)
+            end = min(duration, boundaries[index + 1] + overlap_seconds)
+            chunk = samples[int(start * STT_SAMPLE_RATE):int(end * STT_SAMPLE_RATE)]
+            if chunks_dir is None:
+                file_name, content = encode_pcm_bytes(chunk, STT_SAMPLE_RATE)
+                chunks.append((f"chunk_{index}_{file_name}", content))
+            else:
+                chunk_path = os.path.join(chunks_dir.name, f"chunk_{index}_{uuid.uuid4()}.mp3")
+                chunks.append(encode_pcm(chunk, chunk_path, STT_SAMPLE_RATE))
+            chunk_offsets.append(start)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Each call runs in a copy of this context, so it keeps the job's workspace and metrics
+            futures = [executor.submit(contextvars.copy_context().run, transcribe, chunk) for chunk in chunks]
+            chunk_words = [future.result() for future in futures]
+    finally:
+        if chunks_dir is not None:
+            chunks_dir.cleanup()
+
+    return merge_chunk_words(chunk_words, chunk_offsets, boundaries)
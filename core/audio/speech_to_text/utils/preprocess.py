@@ -0,0 +1,113 @@
+"""
+Speech-to-text upload preprocessing.
+
+Whisper-class models work on 16 kHz mono audio, so uploading the original file
+(often 44.1 kHz stereo WAV) only costs upload time. Audio is resampled to 16 kHz mono
+and encoded at a low bitrate before upload, and cached by source hash. The cache is bounded
+by MEDIACHAIN_STT_CACHE_MAX_BYTES, least recently used files are evicted first.
+"""
+
+import os
+import hashlib
+import logging
+import subprocess as sp
+import numpy as np
+import imageio_ffmpeg
+from typing import Literal
+
+from core.utils.clients import get_env
+from core.utils.workspace import evict_assets
+
+DEFAULT_STT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mediachain", "stt")
+DEFAULT_STT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+STT_SAMPLE_RATE = 16000
+
+CODECS = {
+    "mp3": ("libmp3lame", ".mp3"),
+    "opus": ("libopus", ".ogg"),
+}
+
+
+def _file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _encode_args(codec: str, bitrate: str, sample_rate: int) -> list[str]:
+    if codec not in CODECS:
+        raise ValueError(f"Invalid codec: {codec}")
+    return ["-vn", "-ac", "1", "-ar", str(sample_rate), "-c:a", CODECS[codec][0], "-b:a", bitrate]
+
+
+def _run_pcm_encoder(samples: np.ndarray, sample_rate: int, codec: str, bitrate: str, output: list[str]) -> sp.CompletedProcess:
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+           "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "-",
+           *_encode_args(codec, bitrate, sample_rate), *output]
+    return sp.run(cmd, input=np.ascontiguousarray(samples, dtype=np.float32).tobytes(), stdout=sp.PIPE, stderr=sp.PIPE)
+
+
+def encode_pcm(samples: np.ndarray, output_path: str, sample_rate: int = STT_SAMPLE_RATE,
+               codec: Literal["mp3", "opus"] = "mp3", bitrate: str = "32k") -> str:
+    """Encode mono float32 PCM straight from memory to a compact upload file."""
+    result = _run_pcm_encoder(samples, sample_rate, codec, bitrate, [output_path])
+    if result.returncode != 0:
+        raise RuntimeError(f"Error encoding {output_path}: {result.stderr.decode(errors='ignore')}")
+    return output_path
+
+
+def encode_pcm_bytes(samples: np.ndarray, sample_rate: int = STT_SAMPLE_RATE,
+                     codec: Literal["mp3", "opus"] = "mp3", bitrate: str = "32k") -> tuple[str, bytes]:
+    """
+    Encode mono float32 PCM to a compact upload without touching the disk.
+
+    Returns:
+        tuple[str, bytes]: (file name, content), accepted as a file by the OpenAI client.
+    """
+    suffix = CODECS[codec][1] if codec in CODECS else ""
+    result = _run_pcm_encoder(samples, sample_rate, codec, bitrate, ["-f", suffix.lstrip("."), "-"])
+    if result.returncode != 0:
+        raise RuntimeError(f"Error encoding audio: {result.stderr.decode(errors='ignore')}")
+    return f"audio{suffix}", result.stdout
+
+
+def prepare_stt_audio(audio_file: str, codec: Literal["mp3", "opus"] = "mp3", bitrate: str = "32k",
+                      sample_rate: int = STT_SAMPLE_RATE, cache_dir: str = DEFAULT_STT_CACHE_DIR,
+                      max_cache_bytes: int = None) -> str:
+    """
+    Resample an audio file to 16 kHz mono and encode it at a low bitrate for upload.
+
+    Args:
+        audio_file: Path to the source audio (or video) file.
+        codec: "mp3" or "opus" (Ogg container).
+        bitrate: Target audio bitrate.
+        sample_rate: Output sample rate.
+        cache_dir: Where prepared files are cached by source hash.
+        max_cache_bytes: Size of the cache, defaults to MEDIACHAIN_STT_CACHE_MAX_BYTES (256 MB).
+
+    Returns:
+        str: Path to the prepared file, or audio_file itself when preprocessing fails.
+    """
+    key = hashlib.sha256(f"{_file_hash(audio_file)}:{codec}:{bitrate}:{sample_rate}".encode()).hexdigest()
+    output_path = os.path.join(cache_dir, f"{key}{CODECS[codec][1]}")
+    if os.path.exists(output_path):
+        os.utime(output_path)  # Touch it so eviction drops the least recently used files first
+        return output_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{output_path}.tmp{CODECS[codec][1]}"
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+           "-i", audio_file, *_encode_args(codec, bitrate, sample_rate), tmp_path]
+    result = sp.run(cmd, stdout=sp.DEVNULL, stderr=sp.PIPE, stdin=sp.DEVNULL)
+    if result.returncode != 0:
+        logging.error(f"Error preparing {audio_file} for speech-to-text: {result.stderr.decode(errors='ignore')}")
+        return audio_file
+    os.replace(tmp_path, output_path)
+    evict_assets(cache_dir, max_cache_bytes or int(get_env("MEDIACHAIN_STT_CACHE_MAX_BYTES", DEFAULT_STT_CACHE_MAX_BYTES)))
+
+    original_size, prepared_size = os.path.getsize(audio_file), os.path.getsize(output_path)
+    logging.info(f"Prepared {audio_file} for speech-to-text: {original_size} -> {prepared_size} bytes "
+                 f"({original_size - prepared_size} bytes saved)")
+    return output_path
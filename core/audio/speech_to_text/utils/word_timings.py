@@ -0,0 +1,246 @@
+"""
+Columnar word timestamps and caption grouping.
+
+One transcription is stored once as NumPy arrays (start, end, text index) and can be
+grouped into captions with any policy (max words, max chars, gap threshold, max line
+width) and exported to SRT, VTT, JSON or styled ASS with karaoke word highlighting.
+"""
+
+import json
+import numpy as np
+from typing import Callable, Optional
+
+
+def _format_timestamp(seconds: float, separator: str) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def _format_ass_timestamp(seconds: float) -> str:
+    centis = int(round(seconds * 100))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def _ass_color(color) -> str:
+    """ASS &HAABBGGRR color from "#RRGGBB", "#RRGGBBAA" or an (r, g, b[, a]) tuple."""
+    if isinstance(color, str):
+        value = color.lstrip("#")
+        color = tuple(int(value[i:i + 2], 16) for i in range(0, len(value), 2))
+    r, g, b = color[:3]
+    alpha = 255 - color[3] if len(color) == 4 else 0  # ASS alpha is transparency
+    return f"&H{alpha:02X}{b:02X}{g:02X}{r:02X}"
+
+
+class CaptionGroups:
+    """Result of grouping words into captions: one row per caption."""
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, first_word: np.ndarray, last_word: np.ndarray, texts: list[str],
+                 word_timings: Optional["WordTimings"] = None):
+        self.starts = starts
+        self.ends = ends
+        self.first_word = first_word
+        self.last_word = last_word  # exclusive
+        self.texts = texts
+        self.word_timings = word_timings  # The grouped words, needed for karaoke timing
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self):
+        return iter(zip(self.starts.tolist(), self.ends.tolist(), self.texts))
+
+    def group_at(self, t: float) -> Optional[int]:
+        """Index of the caption shown at time t, or None."""
+        index = int(np.searchsorted(self.starts, t, side="right")) - 1
+        if index >= 0 and t < self.ends[index]:
+            return index
+        return None
+
+    def to_srt(self) -> str:
+        blocks = [f"{i}\n{_format_timestamp(start, ',')} --> {_format_timestamp(end, ',')}\n{text}\n"
+                  for i, (start, end, text) in enumerate(self, 1)]
+        return "\n".join(blocks)
+
+    def to_vtt(self) -> str:
+        blocks = [f"{_format_timestamp(start, '.')} --> {_format_timestamp(end, '.')}\n{text}\n"
+                  for start, end, text in self]
+        return "WEBVTT\n\n" + "\n".join(blocks)
+
+    def to_json(self) -> str:
+        return json.dumps([{"start": start, "end": end, "text": text} for start, end, text in self], ensure_ascii=False)
+
+    def to_ass(self, width: int, height: int, font_name: str = "Arial", font_size: float = 60,
+               color="#FFFFFF", highlight_color: Optional[str] = None, outline_color="#000000",
+               outline_width: float = 4, position: float = 0.4, uppercase: bool = True, karaoke: bool = True) -> str:
+        """
+        Export as an ASS script.
+
+        Args:
+            width: Video width (PlayResX).
+            height: Video height (PlayResY).
+            font_name: Font family name, as libass will look it up.
+            font_size: Font size in pixels.
+            color: Text color ("#RRGGBB" or RGB tuple).
+            highlight_color: Color of the words already spoken, with karaoke. Defaults to color.
+            outline_color: Stroke color.
+            outline_width: Stroke width in pixels.
+            position: Top of the captions as a fraction of the height.
+            uppercase: Uppercase the caption text.
+            karaoke: Add \\k tags so each word is highlighted when spoken.
+        """
+        highlight_color = highlight_color or color
+        # With \k, words are drawn in the secondary color until spoken, then in the primary color
+        primary, secondary = (highlight_color, color) if karaoke else (color, color)
+        header = "\n".join([
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {int(width)}",
+            f"PlayResY: {int(height)}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, "
+            "Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: Caption,{font_name},{int(round(font_size))},{_ass_color(primary)},{_ass_color(secondary)},"
+            f"{_ass_color(outline_color)},&H00000000,0,0,0,0,100,100,0,0,1,{outline_width:g},0,8,"
+            f"{int(width * 0.1)},{int(width * 0.1)},0,1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ])
+
+        placement = f"{{\\an8\\pos({int(width / 2)},{int(height * position)})}}"
+        events = []
+        for index, (start, end, text) in enumerate(self):
+            if karaoke and self.word_timings is not None:
+                first, last = int(self.first_word[index]), int(self.last_word[index])
+                word_starts = self.word_timings.starts[first:last]
+                # Each word lasts until the next one starts, the last one until the caption ends
+                durations = np.diff(np.append(word_starts, end))
+                words = self.word_timings.words[first:last]
+                text = " ".join(f"{{\\k{max(0, int(round(duration * 100)))}}}{word.upper() if uppercase else word}"
+                                for word, duration in zip(words, durations))
+            else:
+                text = (text.upper() if uppercase else text).replace("\n", "\\N")
+            events.append(f"Dialogue: 0,{_format_ass_timestamp(start)},{_format_ass_timestamp(end)},Caption,,0,0,0,,{placement}{text}")
+        return header + "\n" + "\n".join(events) + "\n"
+
+
+class WordTimings:
+    """Word timestamps backed by NumPy arrays, with a text table indexed by text_index."""
+
+    def __init__(self, starts, ends, words: list[str]):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.words = [word.strip() for word in words]
+        self.text_index = np.arange(len(self.words), dtype=np.int32)
+        self.char_lengths = np.fromiter((len(word) for word in self.words), dtype=np.int32, count=len(self.words))
+
+    @classmethod
+    def from_words(cls, words: list) -> "WordTimings":
+        """Build from the parsed STT words ({"start", "end", "text"}) or from raw transcript words."""
+        starts, ends, texts = [], [], []
+        for word in words:
+            if isinstance(word, dict):
+                starts.append(word["start"])
+                ends.append(word["end"])
+                texts.append(word.get("text", word.get("word", "")))
+            else:
+                starts.append(word.start)
+                ends.append(word.end)
+                texts.append(getattr(word, "word", None) or getattr(word, "text", ""))
+        return cls(starts, ends, texts)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def shift(self, offset: float) -> "WordTimings":
+        return WordTimings(self.starts + offset, self.ends + offset, self.words)
+
+    def to_words(self) -> list[dict]:
+        return [{"start": start, "end": end, "text": text}
+                for start, end, text in zip(self.starts.tolist(), self.ends.tolist(), self.words)]
+
+    def word_at(self, t: float) -> Optional[int]:
+        """Index of the word spoken at time t, or None."""
+        index = int(np.searchsorted(self.starts, t, side="right")) - 1
+        if index >= 0 and t < self.ends[index]:
+            return index
+        return None
+
+    def group(self, max_words: Optional[int] = None, max_chars: Optional[int] = None,
+              gap_threshold: Optional[float] = None, max_line_width: Optional[float] = None,
+              measure_text: Optional[Callable[[str], float]] = None, words_per_line: Optional[int] = None) -> CaptionGroups:
+        """
+        Group words into captions.
+
+        Args:
+            max_words: Maximum words per caption.
+            max_chars: Maximum characters per caption (spaces included).
+            gap_threshold: A silence of at least this many seconds before a word starts a new caption.
+            max_line_width: Maximum caption width in pixels, measured with measure_text.
+            measure_text: Returns the rendered width of a string, e.g. PIL ImageFont.getlength.
+            words_per_line: Break the caption text into lines of this many words.
+        """
+        n = len(self.words)
+        if n == 0:
+            empty = np.zeros(0)
+            return CaptionGroups(empty, empty, empty.astype(np.int64), empty.astype(np.int64), [])
+
+        positions = np.arange(n)
+
+        # Hard boundaries from silences, found for all words at once
+        segment_starts = np.zeros(1, dtype=np.int64)
+        if gap_threshold is not None and n > 1:
+            breaks = np.flatnonzero(self.starts[1:] - self.ends[:-1] >= gap_threshold) + 1
+            segment_starts = np.concatenate([segment_starts, breaks])
+        segment_index = np.searchsorted(segment_starts, positions, side="right") - 1
+        segment_ends = np.append(segment_starts[1:], n)[segment_index]
+
+        measure_width = max_line_width is not None and measure_text is not None
+        if not max_chars and not measure_width:
+            # Word-count and gap policies only: fully vectorized
+            rank = positions - segment_starts[segment_index]
+            firsts = np.flatnonzero(rank % max_words == 0) if max_words else segment_starts
+            lasts = np.minimum(np.append(firsts[1:], n), segment_ends[firsts])
+        else:
+            # Cumulative lengths (each word counts one separating space) give O(log n) limits per caption
+            cumulative_chars = np.concatenate([[0], np.cumsum(self.char_lengths + 1)])
+            if measure_width:
+                space_width = measure_text(" ")
+                widths = {word: measure_text(word) for word in set(self.words)}
+                word_widths = np.fromiter((widths[word] + space_width for word in self.words), dtype=np.float64, count=n)
+                cumulative_width = np.concatenate([[0], np.cumsum(word_widths)])
+
+            firsts, lasts = [], []
+            first = 0
+            while first < n:
+                last = int(segment_ends[first])
+                if max_words:
+                    last = min(last, first + max_words)
+                if max_chars:
+                    # +1 because the last word of a caption has no trailing space
+                    last = min(last, int(np.searchsorted(cumulative_chars, cumulative_chars[first] + max_chars + 1, side="right")) - 1)
+                if measure_width:
+                    last = min(last, int(np.searchsorted(cumulative_width, cumulative_width[first] + max_line_width + space_width, side="right")) - 1)
+                last = max(last, first + 1)
+                firsts.append(first)
+                lasts.append(last)
+                first = last
+            firsts = np.asarray(firsts, dtype=np.int64)
+            lasts = np.asarray(lasts, dtype=np.int64)
+        texts = []
+        for first, last in zip(firsts.tolist(), lasts.tolist()):
+            words = self.words[first:last]
+            if words_per_line:
+                texts.append("\n".join(" ".join(words[i:i + words_per_line]) for i in range(0, len(words), words_per_line)))
+            else:
+                texts.append(" ".join(words))
+        return CaptionGroups(self.starts[firsts], self.ends[lasts - 1], firsts, lasts, texts, self)
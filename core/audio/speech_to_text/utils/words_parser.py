@@ -2,26 +2,28 @@
 This ensures that the words are parsed in the same way for all Speech-to-Text services.
 """
 
+from core.audio.speech_to_text.utils.word_timings import WordTimings
+
 # In case OpenAI is used as STT service
-def parse_stt_openai_words(words: list[dict]) -> list[dict]:
+def parse_stt_openai_words(words: list) -> list[dict]:
     """
     Parse the words from the OpenAI response.
     """
 
-    return [{"start": word["start"], "end": word["end"], "text": word["text"]} for word in words]
+    return WordTimings.from_words(words).to_words()
 
 # In case Azure OpenAI is used as STT service
-def parse_stt_azure_openai_words(words: list[dict]) -> list[dict]:
+def parse_stt_azure_openai_words(words: list) -> list[dict]:
     """
     Parse the words from the Azure OpenAI response.
     """
 
-    return [{"start": word["start"], "end": word["end"], "text": word["text"]} for word in words]
+    return WordTimings.from_words(words).to_words()
 
 # In case ElevenLabs is used as STT service
-def parse_stt_elevenlabs_words(words: list[dict]) -> list[dict]:
+def parse_stt_elevenlabs_words(words: list) -> list[dict]:
     """
     Parse the words from the ElevenLabs response.
     """
     # todo: test this
-    return [{"start": word["start"], "end": word["end"], "text": word["text"]} for word in words]
+    return WordTimings.from_words(words).to_words()
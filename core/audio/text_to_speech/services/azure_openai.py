@@ -1,7 +1,8 @@
 from openai import AzureOpenAI
 import os
-import uuid
-from pathlib import Path
+
+from core.utils.workspace import scratch_path
+from core.utils.metrics import track_call
 
 azure_config_interface = {
     "endpoint": str,
@@ -23,21 +24,18 @@ def generate_azure_openai_text_to_speech(api_key: str, text: str, azure_config:
         deployment=azure_config["deployment"]
     )
 
-    # Create tmp directory if it doesn't exist
-    tmp_dir = Path("tmp")
-    tmp_dir.mkdir(exist_ok=True)
-
-    # Generate unique filename
-    output_file = tmp_dir / f"tts_audio_{uuid.uuid4()}.mp3"
+    # Unique file in the job workspace (tmp/ outside of a job)
+    output_file = scratch_path("tts_audio_", ".mp3", fallback_dir="tmp")
     
     # Use streaming response
-    response = client.audio.speech.create(
-        input=text,
-        voice=voice,
-        model="tts-1"
-    )
-    
-    # Save the audio content
-    response.stream_to_file(output_file)
+    with track_call("azure_openai", "tts"):
+        response = client.audio.speech.create(
+            input=text,
+            voice=voice,
+            model="tts-1"
+        )
+
+        # Save the audio content
+        response.stream_to_file(output_file)
     
     return str(output_file)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from elevenlabs import ElevenLabs
-from pathlib import Path
-import uuid
+
+from core.utils.workspace import scratch_path
+from core.utils.metrics import track_call
 
 def generate_elevenlabs_text_to_speech(api_key: str, text: str, voice: str = "Brian", model_id: str = "eleven_multilingual_v2") -> str:
     """
@@ -17,19 +18,21 @@ def generate_elevenlabs_text_to_speech(api_key: str, text: str, voice: str = "Br
     """
     client = ElevenLabs(api_key=api_key)
     
-    audio = client.generate(
-        text=text,
-        voice=voice,
-        model=model_id
-    )
+    with track_call("elevenlabs", "tts"):
+        audio = client.generate(
+            text=text,
+            voice=voice,
+            model=model_id
+        )
+        # generate returns a stream of chunks, read here so the whole download is timed
+        if not isinstance(audio, bytes):
+            audio = b"".join(audio)
 
-    # Generate unique filename
-    tmp_dir = Path("tmp")
-    tmp_dir.mkdir(exist_ok=True)
-    output_file = tmp_dir / f"tts_audio_{uuid.uuid4()}.mp3"
+    # Unique file in the job workspace (tmp/ outside of a job)
+    output_file = scratch_path("tts_audio_", ".mp3", fallback_dir="tmp")
     
     # Save the audio content
     with open(output_file, "wb") as f:
         f.write(audio)
     
-    return str(output_file)
\ No newline at end of file
+    return output_file
\ No newline at end of file
@@ -1,6 +1,7 @@
 from openai import OpenAI
-import uuid
-from pathlib import Path
+
+from core.utils.workspace import scratch_path
+from core.utils.metrics import track_call
 
 def generate_openai_text_to_speech(api_key: str, text: str, voice: str = "echo") -> str:
     if not api_key:
@@ -11,22 +12,19 @@ def generate_openai_text_to_speech(api_key: str, text: str, voice: str = "echo")
         api_key=api_key
     )
 
-    # Create tmp directory if it doesn't exist
-    tmp_dir = Path("tmp")
-    tmp_dir.mkdir(exist_ok=True)
-
-    # Generate unique filename
-    output_file = tmp_dir / f"tts_audio_{uuid.uuid4()}.mp3"
+    # Unique file in the job workspace (tmp/ outside of a job)
+    output_file = scratch_path("tts_audio_", ".mp3", fallback_dir="tmp")
     
     # Use streaming response
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice=voice,
-        input=text,
-        response_format="mp3"
-    )
+    with track_call("openai", "tts"):
+        response = client.audio.speech.create(
+            model="tts-1",
+            voice=voice,
+            input=text,
+            response_format="mp3"
+        )
 
-    # Save the audio content
-    response.stream_to_file(output_file)
+        # Save the audio content
+        response.stream_to_file(output_file)
     
-    return str(output_file)
\ No newline at end of file
+    return output_file
\ No newline at end of file
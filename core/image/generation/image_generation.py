@@ -1,26 +1,34 @@
-from core.image.generation.services.dalle.dalle_generation import generate_with_dalle
-from core.image.generation.services.leonardo.leonardo_generation import generate_with_leonardo
-from core.image.generation.services.pollinations.pollinations_generation import generate_with_pollinations
-
 import os
-from typing import Literal
+import asyncio
+from typing import AsyncIterator, Literal
 import logging
 
-async def generate_image(service: Literal["dalle", "pollinations", "leonardo"], api_key: str = None, prompt: str = "tobey maguire", width: int = 1024, height: int = 1024) -> str:
+async def generate_image(service: Literal["dalle", "pollinations", "leonardo", "auto"], api_key: str = None, prompt: str = "tobey maguire", width: int = 1024, height: int = 1024) -> str:
+    """
+    Generate an image and return its URL. With service "auto", the default ImageRouter picks the
+    provider (see core.image.generation.image_router) and api_key is ignored.
+    """
     logging.info(f"Generating image with service: {service}")
     logging.info(f"Prompt: {prompt}")
     
     try:
+        if service == "auto":
+            from core.image.generation.image_router import get_default_router
+            return await get_default_router().generate(prompt, width, height)
+        # Services are imported when used, so importing this module doesn't load every provider SDK
         if service == "dalle":
-            result = generate_with_dalle(api_key, prompt, width, height)
+            from core.image.generation.services.dalle.dalle_generation import generate_with_dalle
+            result = await asyncio.to_thread(generate_with_dalle, api_key, prompt, height=height, width=width)
             logging.info(f"DALLE result: {result}")
             return result
         elif service == "pollinations":
-            result = await generate_with_pollinations(prompt, width, height)
+            from core.image.generation.services.pollinations.pollinations_generation import generate_with_pollinations
+            result = await generate_with_pollinations(prompt, height=height, width=width)
             logging.info(f"Pollinations result: {result}")
             return result
         elif service == "leonardo":
-            result = generate_with_leonardo(api_key, prompt, width, height)
+            from core.image.generation.services.leonardo.leonardo_generation import generate_with_leonardo
+            result = await asyncio.to_thread(generate_with_leonardo, api_key, prompt, height=height, width=width)
             logging.info(f"Leonardo result: {result}")
             return result
             
@@ -28,3 +36,70 @@ async def generate_image(service: Literal["dalle", "pollinations", "leonardo"],
         logging.error(f"Error in generate_image: {str(e)}")
         logging.error(f"Service: {service}")
         raise
+
+
+async def generate_images_as_completed(prompts: list[str], service: Literal["dalle", "pollinations", "leonardo", "auto"] = "pollinations",
+                                       api_key: str = None, width: int = 1024, height: int = 1024, max_concurrency: int = 8,
+                                       return_exceptions: bool = False) -> AsyncIterator[tuple[int, str]]:
+    """
+    Generate an image per prompt with every request started up front, and yield (index, url) as
+    each one finishes. With return_exceptions, a failed prompt yields (index, exception) instead
+    of raising.
+
+    Leonardo prompts are submitted as parallel jobs (repeated prompts share a job through
+    num_images) and all of them are polled by one LeonardoPoller. DALL·E, Pollinations and "auto"
+    requests run concurrently, max_concurrency at a time.
+    """
+    if service == "leonardo":
+        from core.image.generation.services.leonardo.leonardo_generation import (
+            LeonardoPoller, generate_with_leonardo_async, MAX_IMAGES_PER_GENERATION
+        )
+        poller = LeonardoPoller(api_key)
+        indexes_by_prompt = {}
+        for index, prompt in enumerate(prompts):
+            indexes_by_prompt.setdefault(prompt, []).append(index)
+        jobs = [(indexes[start:start + MAX_IMAGES_PER_GENERATION], prompt)
+                for prompt, indexes in indexes_by_prompt.items()
+                for start in range(0, len(indexes), MAX_IMAGES_PER_GENERATION)]
+
+        async def generate(indexes: list[int], prompt: str) -> list[str]:
+            return await generate_with_leonardo_async(poller, prompt, height=height, width=width, num_images=len(indexes))
+    else:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        jobs = [([index], prompt) for index, prompt in enumerate(prompts)]
+
+        async def generate(indexes: list[int], prompt: str) -> list[str]:
+            async with semaphore:
+                return [await generate_image(service, api_key, prompt, width, height)]
+
+    async def run(indexes: list[int], prompt: str) -> list[tuple[int, str]]:
+        try:
+            return list(zip(indexes, await generate(indexes, prompt)))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return [(index, e) for index in indexes]
+
+    tasks = [asyncio.create_task(run(indexes, prompt)) for indexes, prompt in jobs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for index, result in await next_done:
+                yield index, result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_images(prompts: list[str], service: Literal["dalle", "pollinations", "leonardo", "auto"] = "pollinations",
+                          api_key: str = None, width: int = 1024, height: int = 1024, max_concurrency: int = 8,
+                          return_exceptions: bool = False) -> list[str]:
+    """
+    Generate an image per prompt in one batch (see generate_images_as_completed), so N images take
+    about one generation latency. Returns the URLs in the order of prompts.
+    """
+    logging.info(f"Generating {len(prompts)} images with service: {service}")
+    results = [None] * len(prompts)
+    async for index, result in generate_images_as_completed(prompts, service, api_key, width, height,
+                                                            max_concurrency, return_exceptions):
+        results[index] = result
+    return results
@@ -0,0 +1,246 @@
+"""
+Health-scored routing of image generations across providers.
+
+The router keeps a rolling window of latencies and outcomes per provider and sends every
+request to the provider expected to return an image soonest (median latency, inflated by its
+error rate). When that request runs past the provider's p95 latency, a hedged request goes to
+the runner-up and the first image wins. Providers that fail repeatedly are skipped (circuit
+open) for a cooldown, then get a single trial request. Each provider has its own concurrency
+limit; a saturated provider is only used when every other one is saturated too.
+
+Configured with environment variables:
+    IMAGE_ROUTER_PROVIDERS: Providers to use, in order of preference on equal scores. Defaults to
+                            "pollinations,leonardo,dalle". Providers without an API key are skipped.
+    IMAGE_ROUTER_TIMEOUT: Seconds before a single provider request is abandoned, defaults to 90.
+    OPENAI_API_KEY: API key of DALL·E.
+    LEONARDO_API_KEY: API key of Leonardo.
+"""
+
+import time
+import asyncio
+import logging
+import weakref
+from collections import deque
+from typing import Literal
+
+from core.utils.clients import get_env
+from core.image.generation.image_generation import generate_image
+
+ImageProvider = Literal["dalle", "pollinations", "leonardo"]
+
+DEFAULT_PROVIDERS = ("pollinations", "leonardo", "dalle")
+API_KEY_ENV = {"dalle": "OPENAI_API_KEY", "leonardo": "LEONARDO_API_KEY", "pollinations": None}
+DEFAULT_CONCURRENCY = {"pollinations": 4, "leonardo": 3, "dalle": 5}
+# Expected latencies (seconds) until a provider has enough samples of its own
+PRIOR_LATENCY_SECONDS = {"pollinations": 10.0, "leonardo": 20.0, "dalle": 15.0}
+DEFAULT_TIMEOUT_SECONDS = 90.0
+MIN_SAMPLES = 5
+MIN_HEDGE_DELAY_SECONDS = 2.0
+
+
+class NoImageProviderError(RuntimeError):
+    """Raised when no provider is available, or every provider tried failed."""
+
+
+class ProviderHealth:
+    """
+    Rolling latency and error statistics of a provider, and its circuit breaker.
+
+    Args:
+        prior_latency: Latency assumed until MIN_SAMPLES requests succeeded.
+        window: Number of recent requests kept.
+        failure_threshold: Consecutive failures that open the circuit.
+        cooldown_seconds: Time the circuit stays open before a trial request.
+    """
+
+    def __init__(self, prior_latency: float, window: int = 50, failure_threshold: int = 3, cooldown_seconds: float = 60):
+        self.prior_latency = prior_latency
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.in_flight = 0
+        self._trial_in_flight = False
+
+    def percentile(self, q: float) -> float:
+        if len(self.latencies) < MIN_SAMPLES:
+            return self.prior_latency
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self) -> float:
+        """Expected seconds until an image: median latency over the success rate. Lower is better."""
+        return self.percentile(0.5) / max(1.0 - self.error_rate, 0.05)
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.opened_at is not None
+
+    def available(self) -> bool:
+        """Closed circuit, or open past its cooldown with no trial request running."""
+        if not self.circuit_open:
+            return True
+        return time.monotonic() - self.opened_at >= self.cooldown_seconds and not self._trial_in_flight
+
+    def start(self):
+        """A request was assigned to the provider (running or waiting for a slot)."""
+        self.in_flight += 1
+        if self.circuit_open:
+            self._trial_in_flight = True
+
+    def finish(self):
+        self.in_flight -= 1
+        self._trial_in_flight = False
+
+    def succeeded(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def failed(self):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.circuit_open or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()  # Opened, or reopened by a failed trial
+
+    def abandoned(self, elapsed: float):
+        """A request cancelled because another one won the hedge."""
+        # A stall counts as a latency of at least elapsed, so the p95 (and the hedge delay) adapt to it
+        if elapsed >= self.percentile(0.95):
+            self.latencies.append(elapsed)
+
+
+class ImageRouter:
+    """
+    Routes image generations to the healthiest provider, with hedging and failover.
+
+    Args:
+        providers: Providers in order of preference on equal scores.
+        api_keys: API key per provider, a provider that needs one and has none is skipped.
+        concurrency: Maximum concurrent requests per provider.
+        hedge: Send a second request to the runner-up when the first exceeds its p95 latency.
+        timeout: Seconds before a single provider request is abandoned.
+    """
+
+    def __init__(self, providers: list[ImageProvider] = DEFAULT_PROVIDERS, api_keys: dict = None, concurrency: dict = None,
+                 hedge: bool = True, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        unknown = [provider for provider in providers if provider not in API_KEY_ENV]
+        if unknown:
+            raise ValueError(f"Unknown image providers {unknown}, expected some of {list(API_KEY_ENV)}")
+        api_keys = api_keys or {}
+        self.providers = [provider for provider in providers if not API_KEY_ENV[provider] or api_keys.get(provider)]
+        if not self.providers:
+            raise ValueError(f"None of the image providers {list(providers)} has an API key")
+        self.api_keys = api_keys
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.hedge = hedge
+        self.timeout = timeout
+        self.health = {provider: ProviderHealth(PRIOR_LATENCY_SECONDS[provider]) for provider in self.providers}
+        self._semaphores = weakref.WeakKeyDictionary()  # Event loop -> provider -> Semaphore
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if provider not in semaphores:
+            semaphores[provider] = asyncio.Semaphore(self.concurrency[provider])
+        return semaphores[provider]
+
+    def ranked(self) -> list[str]:
+        """Available providers, best first: free ones before saturated ones, then by score."""
+        available = [provider for provider in self.providers if self.health[provider].available()]
+        return sorted(available, key=lambda provider: (
+            self.health[provider].in_flight >= self.concurrency[provider],
+            self.health[provider].score(),
+            self.providers.index(provider),
+        ))
+
+    async def _request(self, provider: str, prompt: str, width: int, height: int) -> str:
+        health = self.health[provider]
+        start = None
+        try:
+            async with self._semaphore(provider):
+                start = time.monotonic()
+                url = await asyncio.wait_for(generate_image(provider, self.api_keys.get(provider), prompt, width, height),
+                                             self.timeout)
+        except asyncio.CancelledError:
+            health.abandoned(time.monotonic() - start if start is not None else 0.0)
+            raise
+        except Exception:
+            health.failed()
+            raise
+        health.succeeded(time.monotonic() - start)
+        return url
+
+    async def generate(self, prompt: str, width: int = 1024, height: int = 1024) -> str:
+        """Generate an image and return its URL, from whichever provider answers first."""
+        candidates = self.ranked()
+        if not candidates:
+            raise NoImageProviderError(f"Every image provider is unavailable (circuit open): {self.providers}")
+
+        pending, errors = {}, []
+
+        def launch():
+            provider = candidates.pop(0)
+            # Counted from now (not when the task runs or gets a slot), so concurrent calls see the load
+            self.health[provider].start()
+            task = asyncio.create_task(self._request(provider, prompt, width, height))
+            task.add_done_callback(lambda _: self.health[provider].finish())
+            pending[task] = provider
+
+        launch()
+        try:
+            while pending:
+                hedge_delay = None
+                if self.hedge and candidates and len(pending) == 1:
+                    primary = next(iter(pending.values()))
+                    hedge_delay = max(MIN_HEDGE_DELAY_SECONDS, self.health[primary].percentile(0.95))
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logging.info(f"{primary} is past its p95 latency ({hedge_delay:.1f}s), hedging with {candidates[0]}")
+                    launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    logging.warning(f"Image generation with {provider} failed: {task.exception()}")
+                    errors.append(f"{provider}: {task.exception()}")
+                if not pending and candidates:
+                    launch()  # Fail over to the next provider
+            raise NoImageProviderError(f"Every image provider failed: {'; '.join(errors)}")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Health of every provider, e.g. for logs."""
+        return {provider: {"p50": health.percentile(0.5), "p95": health.percentile(0.95), "error_rate": health.error_rate,
+                           "circuit_open": health.circuit_open, "in_flight": health.in_flight}
+                for provider, health in self.health.items()}
+
+
+_default_router = None
+
+
+def get_default_router() -> ImageRouter:
+    """Router configured from the IMAGE_ROUTER_* environment variables and the provider API keys."""
+    global _default_router
+    if _default_router is None:
+        providers = [provider.strip() for provider in get_env("IMAGE_ROUTER_PROVIDERS", ",".join(DEFAULT_PROVIDERS)).split(",")]
+        _default_router = ImageRouter(
+            providers=providers,
+            api_keys={provider: get_env(env) for provider, env in API_KEY_ENV.items() if env},
+            timeout=float(get_env("IMAGE_ROUTER_TIMEOUT", DEFAULT_TIMEOUT_SECONDS)),
+        )
+    return _default_router
+
+
+def set_default_router(router: ImageRouter):
+    global _default_router
+    _default_router = router
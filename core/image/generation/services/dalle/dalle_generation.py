@@ -1,6 +1,8 @@
 import requests
 from openai import OpenAI
 
+from core.utils.metrics import track_call
+
 def generate_with_dalle(api_key: str, prompt: str, height: int = 1024, width: int = 1024) -> str:
     """
     Generate an image using DALL·E API.
@@ -16,12 +18,13 @@ def generate_with_dalle(api_key: str, prompt: str, height: int = 1024, width: in
 
     client = OpenAI(api_key=api_key)
 
-    response = client.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        size=f"{width}x{height}",
-        quality="standard",
-        n=1
-    )
+    with track_call("dalle", "image"):
+        response = client.images.generate(
+            model="dall-e-3",
+            prompt=prompt,
+            size=f"{width}x{height}",
+            quality="standard",
+            n=1
+        )
     url = response.data[0].url
     return url
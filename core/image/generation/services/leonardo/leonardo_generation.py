@@ -1,5 +1,24 @@
+import time
+import asyncio
+import logging
 from leonardo_api import Leonardo
 
+from core.utils.metrics import track_call
+
+LEONARDO_MODEL_ID = "6bef9f1b-29cb-40c7-b9df-32b51c1f67d3"
+MAX_IMAGES_PER_GENERATION = 8
+
+def submit_leonardo_generation(leonardo: Leonardo, prompt: str, height: int = 1024, width: int = 1024, num_images: int = 1) -> str:
+    """Start a generation job of num_images images and return its id, without waiting for it."""
+    response = leonardo.post_generations(
+        prompt=prompt,
+        num_images=num_images,
+        width=width or 1024,
+        height=height or 1024,
+        model_id=LEONARDO_MODEL_ID
+    )
+    return response['sdGenerationJob']['generationId']
+
 def generate_with_leonardo(api_key: str, prompt: str, height: int = 1024, width: int = 1024) -> str:
     """
     Generate an image using Leonardo API. (https://leonardo.ai/)
@@ -18,19 +37,93 @@ def generate_with_leonardo(api_key: str, prompt: str, height: int = 1024, width:
     # Initialize Leonardo client
     leonardo = Leonardo(auth_token=api_key)
     
-    # Generate image
-    response = leonardo.post_generations(
-        prompt=prompt,
-        num_images=1,
-        width=width or 1024,
-        height=height or 1024,
-        model_id="6bef9f1b-29cb-40c7-b9df-32b51c1f67d3"
-    )
-    
-    generation_id = response['sdGenerationJob']['generationId']
-    
-    # Wait for generation to complete and get results
-    result = leonardo.wait_for_image_generation(generation_id=generation_id)
+    with track_call("leonardo", "image"):
+        # Generate image
+        generation_id = submit_leonardo_generation(leonardo, prompt, height, width)
+
+        # Wait for generation to complete and get results (the first image)
+        result = leonardo.wait_for_image_generation(generation_id=generation_id)
     
     # Return the first generated image URL
-    return result[0]['url']
+    return result['url']
+
+
+class LeonardoPoller:
+    """
+    Waits for any number of Leonardo generations from a single polling task, instead of a
+    blocking polling loop per generation.
+
+    Every round checks all pending generations concurrently, then sleeps: the delay starts at
+    initial_delay and grows by backoff up to max_delay (most generations take 10-20 s), and
+    starts over when a new generation is added.
+
+    Args:
+        api_key: API key for Leonardo.
+        initial_delay: Seconds before the first round.
+        max_delay: Longest delay between rounds.
+        backoff: Growth factor of the delay.
+        timeout: Seconds before a generation is given up.
+    """
+
+    def __init__(self, api_key: str, initial_delay: float = 2.0, max_delay: float = 10.0, backoff: float = 1.5,
+                 timeout: float = 180.0):
+        if not api_key:
+            raise ValueError("Leonardo API key is required.")
+        self.leonardo = Leonardo(auth_token=api_key)
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self._pending = {}  # generation id -> (future, deadline)
+        self._delay = initial_delay
+        self._task = None
+
+    async def wait(self, generation_id: str) -> list[dict]:
+        """Generated images (dicts with a "url") of a generation, once it is complete."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[generation_id] = (future, time.monotonic() + self.timeout)
+        self._delay = self.initial_delay
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self._pending:
+            await asyncio.sleep(self._delay)
+            self._delay = min(self._delay * self.backoff, self.max_delay)
+
+            generation_ids = list(self._pending)
+            responses = await asyncio.gather(
+                *(asyncio.to_thread(self.leonardo.get_single_generation, generation_id) for generation_id in generation_ids),
+                return_exceptions=True
+            )
+            for generation_id, response in zip(generation_ids, responses):
+                future, deadline = self._pending[generation_id]
+                if future.done():  # The caller stopped waiting
+                    del self._pending[generation_id]
+                    continue
+                if isinstance(response, Exception):
+                    # Polling errors are retried in the next round, until the deadline
+                    logging.warning(f"Error polling Leonardo generation {generation_id}: {response}")
+                else:
+                    generation = response.get("generations_by_pk") or {}
+                    status = generation.get("status")
+                    if status == "COMPLETE":
+                        future.set_result(generation.get("generated_images", []))
+                    elif status == "FAILED":
+                        future.set_exception(RuntimeError(f"Leonardo generation {generation_id} failed"))
+                if not future.done() and time.monotonic() > deadline:
+                    future.set_exception(TimeoutError(f"Leonardo generation {generation_id} took over {self.timeout} seconds"))
+                if future.done():
+                    del self._pending[generation_id]
+
+
+async def generate_with_leonardo_async(poller: LeonardoPoller, prompt: str, height: int = 1024, width: int = 1024,
+                                       num_images: int = 1) -> list[str]:
+    """Submit a generation of num_images images and wait for it through poller. Returns their URLs."""
+    with track_call("leonardo", "image"):
+        generation_id = await asyncio.to_thread(submit_leonardo_generation, poller.leonardo, prompt, height, width, num_images)
+        images = await poller.wait(generation_id)
+    if len(images) < num_images:
+        raise RuntimeError(f"Leonardo generation {generation_id} returned {len(images)} of {num_images} images")
+    return [image['url'] for image in images[:num_images]]
@@ -1,6 +1,9 @@
 import requests
+import asyncio
 import logging
 
+from core.utils.metrics import track_call
+
 async def generate_with_pollinations(prompt: str, height: int = 1024, width: int = 1024, not_logo: bool = False) -> str:
     """
     Generate an image using Pollinations API. (https://pollinations.ai/)
@@ -26,12 +29,13 @@ async def generate_with_pollinations(prompt: str, height: int = 1024, width: int
             "no_logo": not_logo
         }
 
-        response = requests.post(url, json=payload)
-        
-        if response.status_code == 200:
-            return url
-        else:
-            raise RuntimeError(f"Pollinations API error: {response.text}")
+        with track_call("pollinations", "image"):
+            # Run the blocking request in a worker thread so concurrent generations don't block the event loop
+            response = await asyncio.to_thread(requests.post, url, json=payload)
+
+            if response.status_code != 200:
+                raise RuntimeError(f"Pollinations API error: {response.text}")
+        return url
             
     except Exception as e:
         logging.error(f"Error in generate_with_pollinations: {str(e)}")
@@ -1,5 +1,5 @@
-from openai import OpenAI
-from openai import AzureOpenAI
+from core.utils.llm_cache import cached_chat_completion
+from core.utils.clients import get_openai_client
 from typing import Literal
 import json
 
@@ -15,10 +15,29 @@ def enhance_prompt(service: Literal["openai", "azure_openai"], api_key: str, pro
         except Exception as e:
             raise ValueError(f"Error enhancing prompt with Azure OpenAI: {e}")
 
+def enhance_prompts(service: Literal["openai", "azure_openai"], api_key: str, prompts: list[str], model: str, azure_config: dict = None) -> list[str]:
+    """
+    Enhance several prompts with a single JSON-mode request.
+    Returns the enhanced prompts in the same order as the input prompts.
+    """
+    if not prompts:
+        return []
+    if service == "openai":
+        try:
+            return enhance_prompts_openai(api_key, prompts, model)
+        except Exception as e:
+            raise ValueError(f"Error enhancing prompts with OpenAI: {e}")
+    elif service == "azure_openai":
+        try:
+            return enhance_prompts_azure(api_key, prompts, azure_config, model)
+        except Exception as e:
+            raise ValueError(f"Error enhancing prompts with Azure OpenAI: {e}")
+
 def enhance_prompt_azure(api_key: str, prompt: str, azure_config: dict, model: str = "gpt-35-turbo"):
+    from openai import AzureOpenAI
     client = AzureOpenAI(api_key=api_key, azure_endpoint=azure_config["azure_endpoint"], azure_deployment=azure_config["azure_deployment"], azure_api_version=azure_config["azure_api_version"])
     system_prompt = enhance_system_prompt
-    response = client.chat.completions.create(
+    response = cached_chat_completion(client,
         model=model,
         response_format={"type": "json_object"},
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
@@ -27,9 +46,9 @@ def enhance_prompt_azure(api_key: str, prompt: str, azure_config: dict, model: s
     return response_json["image_prompt"]
 
 def enhance_prompt_openai(api_key: str, prompt: str, model: str = "gpt-3.5-turbo"):
-    client = OpenAI(api_key=api_key)
+    client = get_openai_client(api_key)
     system_prompt = enhance_system_prompt
-    response = client.chat.completions.create(
+    response = cached_chat_completion(client,
         model=model,
         response_format={"type": "json_object"},
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
@@ -37,6 +56,38 @@ def enhance_prompt_openai(api_key: str, prompt: str, model: str = "gpt-3.5-turbo
     response_json = json.loads(response.choices[0].message.content)
     return response_json["image_prompt"]
 
+def enhance_prompts_azure(api_key: str, prompts: list[str], azure_config: dict, model: str = "gpt-35-turbo") -> list[str]:
+    from openai import AzureOpenAI
+    client = AzureOpenAI(api_key=api_key, azure_endpoint=azure_config["azure_endpoint"], azure_deployment=azure_config["azure_deployment"], azure_api_version=azure_config["azure_api_version"])
+    response = cached_chat_completion(client,
+        model=model,
+        response_format={"type": "json_object"},
+        messages=[{"role": "system", "content": enhance_batch_system_prompt}, {"role": "user", "content": _batch_user_prompt(prompts)}]
+    )
+    return _parse_batch_response(response.choices[0].message.content, prompts)
+
+def enhance_prompts_openai(api_key: str, prompts: list[str], model: str = "gpt-3.5-turbo") -> list[str]:
+    client = get_openai_client(api_key)
+    response = cached_chat_completion(client,
+        model=model,
+        response_format={"type": "json_object"},
+        messages=[{"role": "system", "content": enhance_batch_system_prompt}, {"role": "user", "content": _batch_user_prompt(prompts)}]
+    )
+    return _parse_batch_response(response.choices[0].message.content, prompts)
+
+def _batch_user_prompt(prompts: list[str]) -> str:
+    return json.dumps({"scenes": [{"index": i, "text": prompt} for i, prompt in enumerate(prompts)]}, ensure_ascii=False)
+
+def _parse_batch_response(content: str, prompts: list[str]) -> list[str]:
+    response_json = json.loads(content)
+    image_prompts = response_json["image_prompts"]
+    if len(image_prompts) != len(prompts):
+        raise ValueError(f"Expected {len(prompts)} enhanced prompts, got {len(image_prompts)}")
+    # Accept both plain strings and {"index", "image_prompt"} objects, keeping the input order
+    if all(isinstance(item, dict) for item in image_prompts):
+        image_prompts = [item["image_prompt"] for item in sorted(image_prompts, key=lambda item: int(item["index"]))]
+    return [str(item) for item in image_prompts]
+
 enhance_system_prompt = """
     
     You are a specialized prompt generation system for video automation, 
@@ -61,4 +112,19 @@ enhance_system_prompt = """
         "image_prompt": "image prompt here"
     }
 
-    """
\ No newline at end of file
+    """
+
+enhance_batch_system_prompt = enhance_system_prompt.split("**Output Format:**")[0] + """**Input Format:**
+    You will receive a JSON object with a list of scenes, each with an index and its scene text:
+    {
+        "scenes": [{"index": 0, "text": "scene text here"}]
+    }
+
+    **Output Format:**
+    Write one image prompt per scene, in the same order as the input scenes.
+    Return the result as a JSON object structured as follows:
+    {
+        "image_prompts": [{"index": 0, "image_prompt": "image prompt here"}]
+    }
+
+    """
@@ -1,5 +1,5 @@
-from openai import OpenAI
-from openai import AzureOpenAI
+from core.utils.llm_cache import cached_chat_completion
+from core.utils.clients import get_openai_client
 from typing import Literal
 import json
 azure_config_interface = {
@@ -29,12 +29,13 @@ def generate_image_timestamps(service: Literal['openai', 'azure_openai'], api_ke
             raise ValueError(f"Error syncing with script using Azure OpenAI: {e}")
 
 def generate_image_timestamps_azure(api_key: str, script_with_timestamps: str, azure_config: dict, model: str = "gpt-35-turbo"):
+    from openai import AzureOpenAI
     client = AzureOpenAI(api_key=api_key, 
                         azure_endpoint=azure_config["azure_endpoint"], 
                         azure_deployment=azure_config["azure_deployment"], 
                         azure_api_version=azure_config["azure_api_version"])
     system_prompt = images_timestamps_in_stt_system_prompt
-    response = client.chat.completions.create(
+    response = cached_chat_completion(client,
         model=model,
         response_format={"type": "json_object"},
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": script_with_timestamps}]
@@ -43,9 +44,9 @@ def generate_image_timestamps_azure(api_key: str, script_with_timestamps: str, a
     return response_json["images"]
 
 def generate_image_timestamps_openai(api_key: str, script_with_timestamps: str, model: str = "gpt-3.5-turbo"):
-    client = OpenAI(api_key=api_key)
+    client = get_openai_client(api_key)
     system_prompt = images_timestamps_in_stt_system_prompt
-    response = client.chat.completions.create(
+    response = cached_chat_completion(client,
         model=model,
         response_format={"type": "json_object"},
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": script_with_timestamps}]
@@ -1,5 +1,3 @@
-from core.script.services.openai import generate_openai_script
-from core.script.services.azure_openai import generate_azure_openai_script
 from typing import Literal
 
 azure_config_interface = {
@@ -19,11 +17,13 @@ def generate_script(service: Literal["openai", "azure_openai"], api_key: str, pr
 
     if service == "openai":
         try:
+            from core.script.services.openai import generate_openai_script
             return generate_openai_script(api_key, prompt, model)
         except Exception as e:
             raise ValueError(f"Error generating script with OpenAI: {e}")
     elif service == "azure_openai":
         try:
+            from core.script.services.azure_openai import generate_azure_openai_script
             return generate_azure_openai_script(api_key, prompt, model, azure_config)
         except Exception as e:
             raise ValueError(f"Error generating script with Azure OpenAI: {e}")
\ No newline at end of file
@@ -1,5 +1,6 @@
 from openai import AzureOpenAI
 from core.script.utils.script_utils import load_yaml_file
+from core.utils.llm_cache import cached_chat_completion
 import json
 azure_config_interface = {
     "azure_endpoint": str,
@@ -23,7 +24,7 @@ def generate_azure_openai_script(api_key: str, prompt: str, model: str = "gpt-35
                          azure_endpoint=azure_config["azure_endpoint"], 
                          azure_deployment=azure_config["azure_deployment"], 
                          azure_api_version=azure_config["azure_api_version"])
-    response = client.chat.completions.create(
+    response = cached_chat_completion(client,
         model=model,
         response_format={"type": "json_object"},
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
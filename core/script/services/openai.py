@@ -1,5 +1,6 @@
 from openai import OpenAI
 from core.script.utils.script_utils import load_yaml_file
+from core.utils.llm_cache import cached_chat_completion
 import json
 import sys
 import os
@@ -14,7 +15,7 @@ def generate_openai_script(api_key: str, prompt: str, model: str = "gpt-3.5-turb
     
     system_prompt = load_yaml_file(yaml_path)["system_prompt"]
     client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
+    response = cached_chat_completion(client,
         model=model,
         response_format={"type": "json_object"},
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
@@ -0,0 +1,33 @@
+"""
+Lazily built API clients.
+
+Modules used to call load_dotenv() and create their OpenAI client at import time, which made
+every import pay for the openai package and for reading .env. Clients are now built on first
+use and shared: call get_openai_client() where the client is needed, never at module level.
+"""
+
+import os
+from functools import lru_cache
+
+_env_loaded = False
+
+
+def load_env():
+    """Load the .env file once, before the first client or setting that needs it."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_env(name: str, default: str = None) -> str:
+    load_env()
+    return os.getenv(name, default)
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(api_key: str = None):
+    """Shared OpenAI client for api_key (OPENAI_API_KEY when None), built on first use."""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key or get_env("OPENAI_API_KEY"))
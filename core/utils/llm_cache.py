@@ -0,0 +1,166 @@
+"""
+On-disk cache for chat completions.
+
+Every chat completion in MediaChain goes through `cached_chat_completion`, which keys the
+response on a canonical hash of the request (model, messages, response_format and sampling
+params) and the endpoint it was sent to.
+
+The cache is configured with environment variables:
+    LLM_CACHE_MODE: "read_write" (default), "off", "record" (always call and overwrite)
+                    or "replay" (never call the API, fail on a miss).
+    LLM_CACHE_DIR: Cache directory, defaults to ~/.cache/mediachain/llm
+    LLM_CACHE_TTL: Seconds before an entry expires, defaults to 7 days. Replay ignores it.
+    LLM_CACHE_MAX_BYTES: Size limit of the cache directory, defaults to 500 MB.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+from typing import Literal, TYPE_CHECKING
+
+from core.utils.clients import get_env
+from core.utils.metrics import track_call, record_cache_lookup
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion  # Imported when needed, openai is slow to import
+
+CacheMode = Literal["off", "read_write", "record", "replay"]
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mediachain", "llm")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+# Request params that don't change the response
+IGNORED_PARAMS = {"stream", "timeout", "user", "extra_headers"}
+
+
+class LLMCacheMissError(RuntimeError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class LLMCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, mode: CacheMode = "read_write",
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        if mode not in ("off", "read_write", "record", "replay"):
+            raise ValueError(f"Invalid LLM cache mode: {mode}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict) -> str:
+        """Canonical hash of a chat completion request."""
+        request = {key: value for key, value in params.items() if key not in IGNORED_PARAMS}
+        canonical = json.dumps({"endpoint": endpoint, "request": request},
+                               sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> dict | None:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if self.mode != "replay" and time.time() - entry["created_at"] > self.ttl_seconds:
+            return None
+
+        # Touch the entry so eviction drops the least recently used ones first
+        os.utime(path)
+        return entry["response"]
+
+    def set(self, key: str, response: dict, model: str = None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"created_at": time.time(), "model": model, "response": response}, f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+
+_default_cache = None
+
+
+def get_default_cache() -> LLMCache:
+    """Cache configured from the LLM_CACHE_* environment variables."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache(
+            cache_dir=get_env("LLM_CACHE_DIR", DEFAULT_CACHE_DIR),
+            mode=get_env("LLM_CACHE_MODE", "read_write"),
+            ttl_seconds=float(get_env("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_bytes=int(get_env("LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+    return _default_cache
+
+
+def set_default_cache(cache: LLMCache):
+    global _default_cache
+    _default_cache = cache
+
+
+def cached_chat_completion(client, cache: LLMCache = None, **params) -> "ChatCompletion":
+    """
+    Drop-in replacement for client.chat.completions.create(**params) that goes through the cache.
+
+    Args:
+        client: OpenAI or AzureOpenAI client.
+        cache: Cache to use, defaults to the one configured from the environment.
+        **params: Chat completion params.
+
+    Returns:
+        ChatCompletion: The cached or freshly generated completion.
+    """
+    cache = cache or get_default_cache()
+    provider = "azure_openai" if "azure" in type(client).__name__.lower() else "openai"
+    if cache.mode == "off":
+        with track_call(provider, "chat"):
+            return client.chat.completions.create(**params)
+
+    key = cache.make_key(str(client.base_url), params)
+
+    if cache.mode in ("read_write", "replay"):
+        cached = cache.get(key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            logging.info(f"LLM cache hit: {key[:12]}")
+            from openai.types.chat import ChatCompletion
+            return ChatCompletion.model_validate(cached)
+        if cache.mode == "replay":
+            raise LLMCacheMissError(f"No recorded response for request {key} (model: {params.get('model')})")
+
+    with track_call(provider, "chat"):
+        response = client.chat.completions.create(**params)
+    cache.set(key, response.model_dump(mode="json"), model=params.get("model"))
+    return response
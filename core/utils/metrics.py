@@ -0,0 +1,421 @@
+"""
+In-process metrics.
+
+Counters, gauges and histograms are kept in a `Registry`. The recording helpers below
+(`track_call`, `record_download`, `record_cache_lookup`, `record_render`) update the process
+registry, exported in the Prometheus text format, and the registry of the job running in the
+current context, dumped as JSON when the job ends (see `JobMetrics`).
+
+Configured with environment variables:
+    MEDIACHAIN_METRICS_PORT: Serve the process registry on http://<addr>:<port>/metrics, started
+                             by the first job. Off when unset.
+    MEDIACHAIN_METRICS_ADDR: Address the metrics endpoint binds to, defaults to 0.0.0.0.
+    MEDIACHAIN_METRICS_DIR: Directory of the per-job JSON dumps, defaults to ~/.cache/mediachain/metrics
+                            ("off" disables them).
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import resource
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from core.utils.clients import get_env
+
+DEFAULT_METRICS_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mediachain", "metrics")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+FPS_BUCKETS = (1, 2, 5, 10, 15, 24, 30, 60, 120, 240, 480, 960)
+REALTIME_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16)
+BYTES_BUCKETS = tuple(2 ** power * 1024 * 1024 for power in range(6, 15))  # 64 MB to 16 GB
+JOB_SECONDS_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help: str, label_names: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> list[tuple[dict, object]]:
+        """(labels, value) of every label set, a consistent copy."""
+        with self._lock:
+            return [(dict(zip(self.label_names, key)), self._copy(value)) for key, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    """Monotonic total, e.g. requests or bytes."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError(f"Counter {self.name} can only increase, got {amount}")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. jobs in progress."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_max(self, value: float, **labels):
+        """Keep the largest value seen, e.g. a peak."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets, with their count and sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][index] += 1
+                    break
+            state["count"] += 1
+            state["sum"] += value
+
+    def _copy(self, value):
+        # Buckets are stored per bucket, exported cumulative like Prometheus
+        cumulative, total = [], 0
+        for count in value["buckets"]:
+            total += count
+            cumulative.append(total)
+        return {"buckets": dict(zip(self.buckets, cumulative)), "count": value["count"], "sum": value["sum"]}
+
+
+class Registry:
+    """Set of metrics, created on first use by name."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, label_names: tuple, **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, label_names, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind} with labels {metric.label_names}")
+            return metric
+
+    def counter(self, name: str, help: str, label_names: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, label_names)
+
+    def gauge(self, name: str, help: str, label_names: tuple = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, label_names)
+
+    def histogram(self, name: str, help: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, label_names, buckets=buckets)
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def metrics(self) -> list[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in metric.samples():
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for bound, count in value["buckets"].items():
+                    lines.append(f"{metric.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        """JSON-serializable copy of all metrics."""
+        result = {}
+        for metric in self.metrics():
+            samples = []
+            for labels, value in metric.samples():
+                if metric.kind == "histogram":
+                    value = {**value, "buckets": {_format_value(bound): count for bound, count in value["buckets"].items()}}
+                samples.append({"labels": labels, "value": value})
+            result[metric.name] = {"type": metric.kind, "help": metric.help, "samples": samples}
+        return result
+
+
+REGISTRY = Registry()
+_current_job = contextvars.ContextVar("mediachain_job_metrics", default=None)
+
+
+def _registries() -> tuple:
+    job = _current_job.get()
+    return (REGISTRY,) if job is None else (REGISTRY, job.registry)
+
+
+@contextmanager
+def track_call(provider: str, operation: str):
+    """
+    Time a call to an external provider and count it as ok or error:
+
+        with track_call("openai", "tts"):
+            response = client.audio.speech.create(...)
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        for registry in _registries():
+            registry.histogram("mediachain_provider_request_duration_seconds", "Latency of calls to external providers",
+                               ("provider", "operation")).observe(elapsed, provider=provider, operation=operation)
+            registry.counter("mediachain_provider_requests_total", "Calls to external providers by outcome",
+                             ("provider", "operation", "status")).inc(provider=provider, operation=operation, status=status)
+
+
+def record_download(source: str, num_bytes: int):
+    for registry in _registries():
+        registry.counter("mediachain_downloaded_bytes_total", "Bytes downloaded, by source",
+                         ("source",)).inc(num_bytes, source=source)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    for registry in _registries():
+        registry.counter("mediachain_cache_lookups_total", "Cache lookups by result (hit or miss)",
+                         ("cache", "result")).inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_render(renderer: str, frames: int, video_seconds: float, elapsed_seconds: float):
+    """Throughput of a finished render: frames per second, and video seconds encoded per second (realtime factor)."""
+    if elapsed_seconds <= 0:
+        return
+    for registry in _registries():
+        registry.histogram("mediachain_render_frames_per_second", "Frames rendered per second of a render",
+                           ("renderer",), buckets=FPS_BUCKETS).observe(frames / elapsed_seconds, renderer=renderer)
+        registry.histogram("mediachain_encode_speed_realtime", "Seconds of video encoded per second of a render",
+                           ("renderer",), buckets=REALTIME_BUCKETS).observe(video_seconds / elapsed_seconds, renderer=renderer)
+
+
+def summarize(registry: Registry) -> dict:
+    """Cache hit ratios and provider error rates of a registry."""
+    summary = {"cache_hit_ratio": {}, "provider_error_rate": {}}
+    lookups = registry.get("mediachain_cache_lookups_total")
+    if lookups is not None:
+        totals = {}
+        for labels, value in lookups.samples():
+            hits, count = totals.get(labels["cache"], (0, 0))
+            totals[labels["cache"]] = (hits + (value if labels["result"] == "hit" else 0), count + value)
+        summary["cache_hit_ratio"] = {cache: hits / count for cache, (hits, count) in totals.items() if count}
+    requests = registry.get("mediachain_provider_requests_total")
+    if requests is not None:
+        totals = {}
+        for labels, value in requests.samples():
+            key = f"{labels['provider']}/{labels['operation']}"
+            errors, count = totals.get(key, (0, 0))
+            totals[key] = (errors + (value if labels["status"] == "error" else 0), count + value)
+        summary["provider_error_rate"] = {key: errors / count for key, (errors, count) in totals.items() if count}
+    return summary
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak RSS of the process (Linux), so it can be measured per job."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident memory of the process since it started or since the last reset."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024  # Bytes on macOS, KB elsewhere
+
+
+class JobMetrics:
+    """
+    Metrics of one job, used as a context manager around it:
+
+        with JobMetrics(job_id):
+            ...
+
+    Everything recorded in the job's context also goes into its own registry, which is written
+    with the job duration, outcome and peak RSS to <metrics dir>/<job_id>.json when it ends.
+    Peak RSS is the process peak, reset at the start of the job where the OS allows it.
+    """
+
+    def __init__(self, job_id: str, metrics_dir: str = None):
+        self.job_id = job_id
+        self.metrics_dir = metrics_dir or get_env("MEDIACHAIN_METRICS_DIR", DEFAULT_METRICS_DIR)
+        self.registry = Registry()
+        self.dump_path = None
+        self._token = None
+        self._start = None
+
+    def __enter__(self) -> "JobMetrics":
+        maybe_start_metrics_server()
+        self._rss_reset = _reset_peak_rss()
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        self._token = _current_job.set(self)
+        REGISTRY.gauge("mediachain_jobs_in_progress", "Jobs running in this process").inc()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_job.reset(self._token)
+        duration = time.perf_counter() - self._start
+        peak_rss = peak_rss_bytes()
+        status = "ok" if exc_type is None else "error"
+
+        REGISTRY.gauge("mediachain_jobs_in_progress", "Jobs running in this process").dec()
+        REGISTRY.counter("mediachain_jobs_total", "Finished jobs by outcome", ("status",)).inc(status=status)
+        REGISTRY.histogram("mediachain_job_duration_seconds", "Duration of jobs",
+                           buckets=JOB_SECONDS_BUCKETS).observe(duration)
+        REGISTRY.histogram("mediachain_job_peak_rss_bytes", "Peak resident memory of jobs",
+                           buckets=BYTES_BUCKETS).observe(peak_rss)
+
+        if self.metrics_dir != "off":
+            try:
+                self.dump(duration, peak_rss, status)
+            except OSError as e:
+                logging.warning(f"Could not write the metrics of job {self.job_id}: {e}")
+
+    def dump(self, duration: float, peak_rss: int, status: str) -> str:
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        self.dump_path = os.path.join(self.metrics_dir, f"{self.job_id}.json")
+        report = {
+            "job_id": self.job_id,
+            "started_at": self._started_at,
+            "duration_seconds": duration,
+            "status": status,
+            "peak_rss_bytes": peak_rss,
+            "peak_rss_is_per_job": self._rss_reset,
+            **summarize(self.registry),
+            "metrics": self.registry.to_dict(),
+        }
+        with open(self.dump_path, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Metrics of job {self.job_id} written to {self.dump_path}")
+        return self.dump_path
+
+
+def current_job_metrics() -> JobMetrics | None:
+    return _current_job.get()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0", registry: Registry = REGISTRY):
+    """Serve registry on http://addr:port/metrics from a daemon thread. Returns the server (shutdown() stops it)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only needed with the endpoint
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would flood the logs
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"Serving metrics on http://{addr}:{server.server_address[1]}/metrics")
+    return server
+
+
+def maybe_start_metrics_server():
+    """Start the process metrics endpoint once if MEDIACHAIN_METRICS_PORT is set."""
+    global _server
+    port = get_env("MEDIACHAIN_METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = start_metrics_server(int(port), get_env("MEDIACHAIN_METRICS_ADDR", "0.0.0.0"))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not start the metrics endpoint on port {port}: {e}")
+                return None
+        return _server
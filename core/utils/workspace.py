@@ -0,0 +1,262 @@
+"""
+Per-job scratch workspaces.
+
+Every intermediate file of a job (TTS audio, downloaded images, subtitles, temporary renders)
+goes into the job's own directory, which is removed when the job ends, on interpreter exit if
+the job didn't get to it, and by the orphan sweep of the next process if it crashed.
+
+Code that writes intermediates calls `scratch_path`, which returns a path in the active
+workspace or, outside of a job, in the directory it used before workspaces existed.
+The workspace keeps the size of every file it handed out; `check_quota` re-stats them, and is
+called again after the large writers (renders, audio mixes, downloads) so one job can't fill
+the RAM disk between two paths.
+
+Configured with environment variables:
+    MEDIACHAIN_WORKSPACE_ROOT: Parent directory of the job workspaces. Defaults to /dev/shm
+                               (RAM) when it has room for a full quota, else the system temp dir.
+    MEDIACHAIN_WORKSPACE_QUOTA: Size limit of a job workspace in bytes, defaults to 2 GB.
+    MEDIACHAIN_ASSET_CACHE_DIR: Shared cache of reusable assets, defaults to ~/.cache/mediachain/assets
+    MEDIACHAIN_ASSET_CACHE_MAX_BYTES: Size limit of the asset cache, defaults to 1 GB.
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import shutil
+import socket
+import logging
+import tempfile
+import contextvars
+
+from core.utils.clients import get_env
+
+DEFAULT_QUOTA_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_ASSET_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mediachain", "assets")
+DEFAULT_ASSET_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+RAM_DISK = "/dev/shm"
+OWNER_FILE = ".owner"
+ORPHAN_MAX_AGE_SECONDS = 24 * 60 * 60  # For workspaces of other hosts, whose pids can't be checked
+
+_current_workspace = contextvars.ContextVar("mediachain_workspace", default=None)
+_live_workspaces = {}
+_swept_roots = set()
+
+
+class WorkspaceQuotaError(RuntimeError):
+    """Raised when a job workspace is over its quota."""
+
+
+def default_root(quota_bytes: int = DEFAULT_QUOTA_BYTES) -> str:
+    root = get_env("MEDIACHAIN_WORKSPACE_ROOT")
+    if root:
+        return root
+    try:
+        if os.access(RAM_DISK, os.W_OK) and shutil.disk_usage(RAM_DISK).free >= quota_bytes:
+            return os.path.join(RAM_DISK, "mediachain")
+    except OSError:
+        pass
+    return os.path.join(tempfile.gettempdir(), "mediachain")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_orphans(root: str) -> int:
+    """Remove the workspaces under root whose owner process is gone. Returns how many were removed."""
+    removed = 0
+    if not os.path.isdir(root):
+        return removed
+    hostname = socket.gethostname()
+    for entry in os.scandir(root):
+        if not entry.is_dir() or not entry.name.startswith("job_"):
+            continue
+        try:
+            with open(os.path.join(entry.path, OWNER_FILE), "r") as f:
+                owner = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            owner = None
+
+        if owner and owner.get("host") == hostname:
+            orphan = owner.get("pid") != os.getpid() and not _pid_alive(owner.get("pid", 0))
+        else:
+            # No readable owner (killed while starting) or another host: go by age
+            orphan = time.time() - entry.stat().st_mtime > ORPHAN_MAX_AGE_SECONDS
+        if orphan:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logging.info(f"Removed {removed} orphaned workspace(s) from {root}")
+    return removed
+
+
+class Workspace:
+    """
+    Isolated scratch directory of a job, used as a context manager:
+
+        with Workspace() as workspace:
+            path = scratch_path("voice_", ".mp3")  # inside workspace.path
+
+    Args:
+        job_id: Name of the job, a random id when None.
+        root: Parent directory, see default_root.
+        quota_bytes: Size limit of the workspace.
+        cache_dir: Shared cache that promote moves reusable assets into.
+    """
+
+    def __init__(self, job_id: str = None, root: str = None, quota_bytes: int = None, cache_dir: str = None):
+        self.quota_bytes = quota_bytes or int(get_env("MEDIACHAIN_WORKSPACE_QUOTA", DEFAULT_QUOTA_BYTES))
+        self.root = root or default_root(self.quota_bytes)
+        self.cache_dir = cache_dir or get_env("MEDIACHAIN_ASSET_CACHE_DIR", DEFAULT_ASSET_CACHE_DIR)
+        self.job_id = job_id or uuid.uuid4().hex
+        self.path = os.path.join(self.root, f"job_{self.job_id}_{os.getpid()}")
+        self._owner_pid = os.getpid()
+        self._token = None
+        self._sizes = {}  # Last known size of each file handed out by file()
+        self._used_bytes = 0
+
+        if self.root not in _swept_roots:
+            _swept_roots.add(self.root)
+            sweep_orphans(self.root)
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, OWNER_FILE), "w") as f:
+            json.dump({"pid": self._owner_pid, "host": socket.gethostname(), "created_at": time.time()}, f)
+        _live_workspaces[self.path] = self
+        logging.info(f"Workspace for job {self.job_id}: {self.path}")
+
+    def __enter__(self) -> "Workspace":
+        self._token = _current_workspace.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._token is not None:
+            _current_workspace.reset(self._token)
+            self._token = None
+        self.cleanup()
+
+    def usage(self) -> int:
+        """Bytes used by the files handed out by file(): only those are stat'ed, the tree isn't walked."""
+        for path, size in list(self._sizes.items()):
+            try:
+                new_size = os.lstat(path).st_size
+            except FileNotFoundError:
+                new_size = 0
+            self._used_bytes += new_size - size
+            self._sizes[path] = new_size
+        return self._used_bytes
+
+    def check_quota(self, extra_bytes: int = 0):
+        usage = self.usage()
+        if usage + extra_bytes > self.quota_bytes:
+            raise WorkspaceQuotaError(
+                f"Workspace of job {self.job_id} uses {usage} bytes (+{extra_bytes}), over its quota of {self.quota_bytes} bytes"
+            )
+
+    def file(self, prefix: str = "", suffix: str = "", subdir: str = None) -> str:
+        """Unique path for a new file in the workspace. Raises WorkspaceQuotaError when the workspace is full."""
+        self.check_quota()
+        directory = os.path.join(self.path, subdir) if subdir else self.path
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{prefix}{uuid.uuid4().hex}{suffix}")
+        self._sizes[path] = 0
+        return path
+
+    def promote(self, path: str, key: str) -> str:
+        """
+        Move a reusable asset (e.g. a downloaded image) into the shared cache, under key, so it
+        outlives the job. Returns its new path; see cached_asset to look it up.
+        """
+        cached = _asset_path(self.cache_dir, key, os.path.splitext(path)[1])
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp_path = f"{cached}.{uuid.uuid4().hex}.tmp"
+        shutil.move(path, tmp_path)  # Copies when the workspace is on another filesystem (tmpfs)
+        os.replace(tmp_path, cached)
+        self._used_bytes -= self._sizes.pop(path, 0)
+        evict_assets(self.cache_dir)
+        return cached
+
+    def cleanup(self):
+        # Forked workers inherit the workspace, only its owner removes it
+        if os.getpid() != self._owner_pid:
+            return
+        _live_workspaces.pop(self.path, None)
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._sizes = {}
+        self._used_bytes = 0
+
+
+def _asset_path(cache_dir: str, key: str, suffix: str) -> str:
+    return os.path.join(cache_dir, key[:2], f"{key}{suffix}")
+
+
+def cached_asset(key: str, suffix: str, cache_dir: str = None) -> str | None:
+    """Path of an asset promoted under key, or None."""
+    path = _asset_path(cache_dir or get_env("MEDIACHAIN_ASSET_CACHE_DIR", DEFAULT_ASSET_CACHE_DIR), key, suffix)
+    if not os.path.exists(path):
+        return None
+    os.utime(path)  # Touch it so eviction drops the least recently used assets first
+    return path
+
+
+def evict_assets(cache_dir: str, max_bytes: int = None):
+    """Remove least recently used assets until the cache fits in max_bytes."""
+    max_bytes = max_bytes or int(get_env("MEDIACHAIN_ASSET_CACHE_MAX_BYTES", DEFAULT_ASSET_CACHE_MAX_BYTES))
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+def current_workspace() -> Workspace | None:
+    """Workspace of the job running in this context, if any."""
+    return _current_workspace.get()
+
+
+def check_quota():
+    """Check the active workspace against its quota after a large write. Does nothing outside of a job."""
+    workspace = current_workspace()
+    if workspace is not None:
+        workspace.check_quota()
+
+
+def scratch_path(prefix: str = "", suffix: str = "", fallback_dir: str = None) -> str:
+    """
+    Unique path for an intermediate file: in the active workspace, or in fallback_dir
+    (created if needed, the system temp dir when None) outside of a job.
+    """
+    workspace = current_workspace()
+    if workspace is not None:
+        return workspace.file(prefix, suffix)
+    directory = fallback_dir or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{prefix}{uuid.uuid4()}{suffix}")
+
+
+@atexit.register
+def _cleanup_live_workspaces():
+    for workspace in list(_live_workspaces.values()):
+        workspace.cleanup()
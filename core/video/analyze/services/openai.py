@@ -1,25 +1,25 @@
-import cv2
-import base64
 from openai import OpenAI
-import os
+from core.utils.llm_cache import cached_chat_completion
+from core.video.analyze.utils.frame_sampler import sample_frames
+from core.video.analyze.utils.scene_index import build_scene_index
 from typing import List, Dict
+import logging
 
-def _extract_frames(video_path: str) -> List[str]:
-    """Extract and encode frames from video"""
-    video = cv2.VideoCapture(video_path)
-    base64_frames = []
-    
-    while video.isOpened():
-        success, frame = video.read()
-        if not success:
-            break
-        _, buffer = cv2.imencode(".jpg", frame)
-        base64_frames.append(base64.b64encode(buffer).decode("utf-8"))
-    
-    video.release()
-    return base64_frames
+def _extract_frames(video_path: str, frame_interval: int = 60, max_frames: int = None, use_scenes: bool = True) -> List[str]:
+    """
+    Extract and encode frames from video, downscaled to 768px.
+    With use_scenes, one representative frame per scene is sent instead of one every frame_interval frames.
+    """
+    if use_scenes:
+        try:
+            scene_index = build_scene_index(video_path)
+            frame_indices = [scene["representative_frame"] for scene in scene_index["scenes"]]
+            return list(sample_frames(video_path, frame_indices=frame_indices, max_frames=max_frames, max_size=768))
+        except Exception as e:
+            logging.error(f"Error building scene index, sampling every {frame_interval} frames: {e}")
+    return list(sample_frames(video_path, frame_interval=frame_interval, max_frames=max_frames, max_size=768))
 
-def summarize_video(api_key: str, video_path: str, frame_interval: int = 60) -> Dict[str, str]:
+def summarize_video(api_key: str, video_path: str, frame_interval: int = 60, max_frames: int = None, use_scenes: bool = True) -> Dict[str, str]:
     """
     Analyze video frames using GPT-4o's 128k context window
 
@@ -28,11 +28,13 @@ def summarize_video(api_key: str, video_path: str, frame_interval: int = 60) ->
     Args:
         video_path: Path to video file
         frame_interval: Number of frames to skip between analyses
+        max_frames: Maximum number of frames to send
+        use_scenes: Send one representative frame per detected scene instead of a fixed interval
     """
     client = OpenAI(api_key=api_key)
 
     # Extract frames
-    frames = _extract_frames(video_path)
+    frames = _extract_frames(video_path, frame_interval, max_frames, use_scenes)
     print(f"Extracted {len(frames)} frames")
     
     # Prepare messages with all frames at once
@@ -41,13 +43,13 @@ def summarize_video(api_key: str, video_path: str, frame_interval: int = 60) ->
             "role": "user",
             "content": [
                 "These are frames from a video that I want to upload. Generate a compelling description that I can upload along with the video.",
-                *map(lambda x: {"image": x, "resize": 768}, frames[0::frame_interval]),
+                *map(lambda x: {"image": x, "resize": 768}, frames),
             ],
         }
     ]
     
     # Get analysis from GPT-4o
-    response = client.chat.completions.create(
+    response = cached_chat_completion(client,
         model="gpt-4o",
         messages=messages,
         max_tokens=200
@@ -57,19 +59,19 @@ def summarize_video(api_key: str, video_path: str, frame_interval: int = 60) ->
         "summary": response.choices[0].message.content
     }
 
-def generate_video_narration(api_key: str, video_path: str, frame_interval: int = 60) -> Dict[str, str]:
+def generate_video_narration(api_key: str, video_path: str, frame_interval: int = 60, max_frames: int = None, use_scenes: bool = True) -> Dict[str, str]:
     """
     Generate a video narration using GPT-4o
     """
 
     client = OpenAI(api_key=api_key)
-    frames = _extract_frames(video_path)
+    frames = _extract_frames(video_path, frame_interval, max_frames, use_scenes)
     prompt_messages = [
         {
             "role": "user",
             "content": [
                 "These are frames of a video. Create a short voiceover script. Only include the narration.",
-                *map(lambda x: {"image": x, "resize": 768}, frames[0::frame_interval]),
+                *map(lambda x: {"image": x, "resize": 768}, frames),
             ],
         },
     ]
@@ -80,7 +82,7 @@ def generate_video_narration(api_key: str, video_path: str, frame_interval: int
         "max_tokens": 500,
     }
 
-    result = client.chat.completions.create(**params)
+    result = cached_chat_completion(client, **params)
     return {
         "narration": result.choices[0].message.content
     }
\ No newline at end of file
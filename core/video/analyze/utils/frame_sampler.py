@@ -0,0 +1,116 @@
+import cv2
+import base64
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+
+def get_video_info(video_path: str) -> dict:
+    """Read frame count, fps and duration from the container without decoding."""
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"Unable to open video: {video_path}")
+    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+    video.release()
+    return {"frame_count": frame_count, "fps": fps, "duration": frame_count / fps}
+
+
+def select_frame_indices(frame_count: int, fps: float, frame_interval: Optional[int] = None,
+                         seconds_interval: Optional[float] = None, max_frames: Optional[int] = None) -> list[int]:
+    """
+    Choose which frames to sample, by frame interval, by time interval and/or by a max frame count.
+    When max_frames is set, the selected frames are thinned out evenly to fit it.
+    """
+    if seconds_interval:
+        frame_interval = max(1, round(seconds_interval * fps))
+    frame_interval = max(1, int(frame_interval or 1))
+
+    indices = list(range(0, frame_count, frame_interval))
+    if max_frames and len(indices) > max_frames:
+        step = len(indices) / max_frames
+        indices = [indices[int(i * step)] for i in range(max_frames)]
+    return indices
+
+
+def _encode_frame(frame, max_size: int, jpeg_quality: int) -> str:
+    height, width = frame.shape[:2]
+    scale = max_size / max(height, width)
+    if scale < 1:
+        frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return base64.b64encode(buffer).decode("utf-8")
+
+
+def iter_video_frames(video_path: str, indices: list[int]) -> Iterator:
+    """
+    Yield the decoded frames at the given sorted indices.
+
+    Dense samples are read with grab() so skipped frames are never converted,
+    sparse samples seek straight to the frame instead of decoding everything in between.
+    """
+    video = cv2.VideoCapture(video_path)
+    fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+    # Seeking decodes from the previous keyframe, so it only pays off for gaps longer than a few seconds
+    seek_threshold = int(fps * 2)
+    position = 0
+    try:
+        for index in indices:
+            if index - position > seek_threshold:
+                video.set(cv2.CAP_PROP_POS_FRAMES, index)
+                position = index
+            while position < index:
+                if not video.grab():
+                    return
+                position += 1
+            success, frame = video.read()
+            if not success:
+                return
+            position += 1
+            yield frame
+    finally:
+        video.release()
+
+
+def sample_frames(video_path: str, frame_interval: Optional[int] = None, seconds_interval: Optional[float] = None,
+                  max_frames: Optional[int] = None, max_size: int = 768, jpeg_quality: int = 85,
+                  workers: int = 4, frame_indices: Optional[list[int]] = None) -> Iterator[str]:
+    """
+    Stream base64 JPEG frames sampled from a video.
+
+    Only the sampled frames are decoded and encoded. Frames are downscaled to max_size
+    (longest side) before encoding, and encoding runs in a thread pool with a bounded
+    number of frames in flight, so memory doesn't grow with the length of the video.
+
+    Args:
+        video_path: Path to the video file.
+        frame_interval: Sample one frame every frame_interval frames.
+        seconds_interval: Sample one frame every seconds_interval seconds (overrides frame_interval).
+        max_frames: Maximum number of frames to sample, spread evenly over the video.
+        max_size: Longest side of the encoded frames.
+        jpeg_quality: JPEG quality of the encoded frames.
+        workers: Number of encoding threads.
+        frame_indices: Explicit frames to sample (e.g. scene representatives), thinned out to max_frames.
+
+    Yields:
+        str: Base64-encoded JPEG frames, in video order.
+    """
+    info = get_video_info(video_path)
+    if frame_indices is not None:
+        indices = sorted(set(frame_indices))
+        if max_frames and len(indices) > max_frames:
+            step = len(indices) / max_frames
+            indices = [indices[int(i * step)] for i in range(max_frames)]
+    else:
+        indices = select_frame_indices(info["frame_count"], info["fps"], frame_interval, seconds_interval, max_frames)
+    logging.info(f"Sampling {len(indices)} of {info['frame_count']} frames from {video_path}")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for frame in iter_video_frames(video_path, indices):
+            pending.append(executor.submit(_encode_frame, frame, max_size, jpeg_quality))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,163 @@
+"""
+Scene index of a video: hard cuts and one representative frame per scene.
+
+The index is built with a single low resolution decode pass and cached on disk
+per video hash, so the analysis services and the background picker can reuse it. The cache is
+bounded by MEDIACHAIN_SCENE_CACHE_MAX_BYTES, least recently used indexes are evicted first.
+"""
+
+import os
+import cv2
+import json
+import hashlib
+import logging
+import numpy as np
+from typing import Optional
+
+from core.utils.clients import get_env
+from core.utils.workspace import evict_assets
+
+DEFAULT_SCENE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mediachain", "scenes")
+DEFAULT_SCENE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+THUMBNAIL_SIZE = (64, 36)
+HISTOGRAM_BINS = 16
+
+
+def video_hash(video_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a video by its size and its first and last chunks, without reading the whole file."""
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(video_path, "rb") as f:
+        digest.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(size - chunk_size, chunk_size))
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()
+
+
+def read_thumbnails(video_path: str, analysis_fps: float) -> tuple[np.ndarray, np.ndarray, float]:
+    """Decode the video once, keeping small thumbnails at analysis_fps."""
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"Unable to open video: {video_path}")
+    fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, round(fps / analysis_fps))
+
+    thumbnails, frame_indices = [], []
+    index = 0
+    try:
+        while True:
+            if index % step:
+                if not video.grab():
+                    break
+            else:
+                success, frame = video.read()
+                if not success:
+                    break
+                thumbnails.append(cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA))
+                frame_indices.append(index)
+            index += 1
+    finally:
+        video.release()
+
+    if not thumbnails:
+        raise ValueError(f"No frames decoded from video: {video_path}")
+    return np.stack(thumbnails), np.asarray(frame_indices), fps
+
+
+def compute_change_scores(thumbnails: np.ndarray) -> np.ndarray:
+    """
+    Score the change between consecutive thumbnails, in [0, 1].
+    Averages the color histogram distance and the mean absolute pixel difference.
+    """
+    n = len(thumbnails)
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+
+    # Per channel histograms of all frames at once
+    pixel_count = thumbnails.shape[1] * thumbnails.shape[2]
+    bins = (thumbnails.reshape(n, -1, 3) // (256 // HISTOGRAM_BINS)).astype(np.int64)
+    bins += np.arange(3) * HISTOGRAM_BINS
+    bins += (np.arange(n) * 3 * HISTOGRAM_BINS)[:, None, None]
+    histograms = np.bincount(bins.ravel(), minlength=n * 3 * HISTOGRAM_BINS).reshape(n, -1).astype(np.float32)
+    histograms /= pixel_count
+
+    histogram_scores = 0.5 * np.abs(np.diff(histograms, axis=0)).sum(axis=1) / 3
+    pixels = thumbnails.astype(np.int16)
+    pixel_scores = np.abs(np.diff(pixels, axis=0)).mean(axis=(1, 2, 3)) / 255
+    return (0.5 * histogram_scores + 0.5 * pixel_scores).astype(np.float32)
+
+
+def build_scene_index(video_path: str, analysis_fps: float = 5.0, threshold: float = 0.3,
+                      min_scene_seconds: float = 0.5, max_scene_seconds: float = 10.0,
+                      cache_dir: Optional[str] = DEFAULT_SCENE_CACHE_DIR, max_cache_bytes: int = None) -> dict:
+    """
+    Detect hard cuts and pick one representative frame per scene.
+
+    Args:
+        video_path: Path to the video file.
+        analysis_fps: Rate at which frames are analyzed.
+        threshold: Change score above which a cut is detected.
+        min_scene_seconds: Cuts closer than this to the previous one are ignored.
+        max_scene_seconds: Longer scenes are split so every segment gets its own representative frame.
+        cache_dir: Where indexes are cached by video hash, None to disable the cache.
+        max_cache_bytes: Size of the cache, defaults to MEDIACHAIN_SCENE_CACHE_MAX_BYTES (64 MB).
+
+    Returns:
+        dict: fps, duration, cut_times and scenes (start, end, representative_frame, representative_time).
+    """
+    params = {"analysis_fps": analysis_fps, "threshold": threshold,
+              "min_scene_seconds": min_scene_seconds, "max_scene_seconds": max_scene_seconds}
+    cache_path = None
+    if cache_dir:
+        key = hashlib.sha256(json.dumps([video_hash(video_path), params], sort_keys=True).encode()).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{key}.json")
+        if os.path.exists(cache_path):
+            os.utime(cache_path)  # Touch it so eviction drops the least recently used indexes first
+            with open(cache_path, "r") as f:
+                return json.load(f)
+
+    thumbnails, frame_indices, fps = read_thumbnails(video_path, analysis_fps)
+    times = frame_indices / fps
+    scores = compute_change_scores(thumbnails)
+
+    # Cut candidates, dropping those too close to the previous accepted cut
+    cut_positions = []
+    for position in (np.flatnonzero(scores > threshold) + 1):
+        if times[position] - (times[cut_positions[-1]] if cut_positions else 0) >= min_scene_seconds:
+            cut_positions.append(int(position))
+
+    boundaries = [0] + cut_positions + [len(thumbnails)]
+    scenes = []
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        segment_length = max(1, int(max_scene_seconds * analysis_fps))
+        for segment_start in range(start, end, segment_length):
+            segment_end = min(end, segment_start + segment_length)
+            segment = thumbnails[segment_start:segment_end].astype(np.float32)
+            # Most typical frame of the segment: closest to the segment mean
+            distances = np.abs(segment - segment.mean(axis=0)).mean(axis=(1, 2, 3))
+            representative = segment_start + int(np.argmin(distances))
+            scenes.append({
+                "start": float(times[segment_start]),
+                "end": float(times[segment_end]) if segment_end < len(times) else float(times[-1] + 1 / analysis_fps),
+                "representative_frame": int(frame_indices[representative]),
+                "representative_time": float(times[representative]),
+                "is_cut": segment_start == start and start > 0,
+            })
+
+    index = {
+        "fps": float(fps),
+        "duration": float(times[-1] + 1 / analysis_fps),
+        "cut_times": [float(times[position]) for position in cut_positions],
+        "scenes": scenes,
+    }
+    logging.info(f"Scene index of {video_path}: {len(cut_positions)} cuts, {len(scenes)} scenes")
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(index, f)
+        evict_assets(cache_dir, max_cache_bytes or int(get_env("MEDIACHAIN_SCENE_CACHE_MAX_BYTES",
+                                                               DEFAULT_SCENE_CACHE_MAX_BYTES)))
+    return index
@@ -0,0 +1,292 @@
+"""
+Local, model-free visual index of background footage.
+
+Every second of video is described by a compact feature vector (brightness, motion energy
+and a color histogram) plus a 64-bit perceptual hash. Features live in a memory-mapped
+NumPy matrix with a sidecar id table, and window queries ("most dynamic / darkest /
+most similar N seconds") are answered by brute-force vectorized search.
+"""
+
+import io
+import os
+import cv2
+import json
+import logging
+import numpy as np
+from typing import Optional
+
+from core.video.analyze.utils.scene_index import read_thumbnails
+
+HISTOGRAM_BINS = 8
+# Feature layout: [brightness, motion, color histogram (3 x HISTOGRAM_BINS)]
+BRIGHTNESS, MOTION, HISTOGRAM = 0, 1, slice(2, 2 + 3 * HISTOGRAM_BINS)
+FEATURE_DIM = 2 + 3 * HISTOGRAM_BINS
+HASH_BYTES = 8
+
+
+def _difference_hashes(thumbnails: np.ndarray) -> np.ndarray:
+    """64-bit dHash of every thumbnail, packed into HASH_BYTES uint8 per frame."""
+    gray = np.stack([cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (9, 8), interpolation=cv2.INTER_AREA)
+                     for frame in thumbnails]).astype(np.int16)
+    bits = gray[:, :, 1:] > gray[:, :, :-1]
+    return np.packbits(bits.reshape(len(thumbnails), -1), axis=1)
+
+
+def extract_second_features(video_path: str, samples_per_second: int = 4) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute one feature vector and one perceptual hash per second of video.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (seconds, FEATURE_DIM) float32 features and (seconds, HASH_BYTES) uint8 hashes.
+    """
+    thumbnails, frame_indices, fps = read_thumbnails(video_path, samples_per_second)
+    seconds = (frame_indices / fps).astype(np.int64)
+    count = int(seconds[-1]) + 1
+    n = len(thumbnails)
+
+    frames = thumbnails.astype(np.float32) / 255
+    brightness = (frames @ np.array([0.114, 0.587, 0.299], dtype=np.float32)).mean(axis=(1, 2))  # BGR luma
+    motion = np.zeros(n, dtype=np.float32)
+    motion[1:] = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2, 3))
+    motion[0] = motion[1] if n > 1 else 0
+
+    bins = (thumbnails.reshape(n, -1, 3) // (256 // HISTOGRAM_BINS)).astype(np.int64)
+    bins += np.arange(3) * HISTOGRAM_BINS
+    bins += (np.arange(n) * 3 * HISTOGRAM_BINS)[:, None, None]
+    histograms = np.bincount(bins.ravel(), minlength=n * 3 * HISTOGRAM_BINS).reshape(n, -1).astype(np.float32)
+    histograms /= thumbnails.shape[1] * thumbnails.shape[2]
+
+    per_frame = np.concatenate([brightness[:, None], motion[:, None], histograms], axis=1)
+
+    # Average the samples of each second
+    features = np.zeros((count, FEATURE_DIM), dtype=np.float32)
+    np.add.at(features, seconds, per_frame)
+    samples = np.bincount(seconds, minlength=count).astype(np.float32)
+    features /= np.maximum(samples, 1)[:, None]
+
+    # Hash of the first sample of each second
+    first_sample = np.searchsorted(seconds, np.arange(count))
+    hashes = _difference_hashes(thumbnails[np.minimum(first_sample, n - 1)])
+    return features, hashes
+
+
+def _append_rows(path: str, rows: np.ndarray):
+    """
+    Append rows to the .npy file at path in place: the data goes at the end of the file and
+    only the shape in the header is rewritten, so indexing a video doesn't copy the whole index.
+    Falls back to rewriting the file when the new header wouldn't fit in the old one.
+    """
+    if not os.path.exists(path):
+        np.save(path, rows)
+        return
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        header_size = f.tell()
+        if fortran_order or dtype != rows.dtype or shape[1:] != rows.shape[1:]:
+            raise ValueError(f"Cannot append {rows.dtype} rows of shape {rows.shape[1:]} to {path}")
+
+        header = io.BytesIO()
+        write_header = np.lib.format.write_array_header_1_0 if version == (1, 0) else np.lib.format.write_array_header_2_0
+        write_header(header, {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                              "shape": (shape[0] + len(rows),) + shape[1:]})
+        if len(header.getvalue()) != header_size:
+            existing = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            f.seek(0)
+            f.truncate()
+            np.save(f, np.concatenate([existing, rows]))
+            return
+
+        # Data first: if we stop half way the header still describes the old, valid array
+        f.seek(header_size + int(np.prod(shape)) * dtype.itemsize)
+        f.write(np.ascontiguousarray(rows).tobytes())
+        f.truncate()
+        f.flush()
+        f.seek(0)
+        f.write(header.getvalue())
+
+
+class FrameFeatureIndex:
+    """
+    Per-second feature index over a library of videos, stored in index_dir as
+    features.npy / hashes.npy (memory-mapped when queried) and an ids.json sidecar.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.features_path = os.path.join(index_dir, "features.npy")
+        self.hashes_path = os.path.join(index_dir, "hashes.npy")
+        self.ids_path = os.path.join(index_dir, "ids.json")
+        os.makedirs(index_dir, exist_ok=True)
+        self.videos = self._load_ids()
+        self._features = None
+        self._hashes = None
+        self._windows = {}
+
+    def _load_ids(self) -> list[dict]:
+        if not os.path.exists(self.ids_path):
+            return []
+        with open(self.ids_path, "r") as f:
+            return json.load(f)["videos"]
+
+    @property
+    def features(self) -> np.ndarray:
+        if self._features is None:
+            if os.path.exists(self.features_path):
+                self._features = np.load(self.features_path, mmap_mode="r")
+            else:
+                self._features = np.zeros((0, FEATURE_DIM), dtype=np.float32)
+        return self._features
+
+    @property
+    def hashes(self) -> np.ndarray:
+        if self._hashes is None:
+            if os.path.exists(self.hashes_path):
+                self._hashes = np.load(self.hashes_path, mmap_mode="r")
+            else:
+                self._hashes = np.zeros((0, HASH_BYTES), dtype=np.uint8)
+        return self._hashes
+
+    def _save(self, features: np.ndarray, hashes: np.ndarray, videos: list[dict]):
+        # Drop the memory maps before replacing the files they point to
+        self._features = self._hashes = None
+        for path, array in ((self.features_path, features), (self.hashes_path, hashes)):
+            tmp_path = f"{path}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+        self._save_ids(videos)
+
+    def _save_ids(self, videos: list[dict]):
+        tmp_ids_path = f"{self.ids_path}.tmp"
+        with open(tmp_ids_path, "w") as f:
+            json.dump({"feature_dim": FEATURE_DIM, "videos": videos}, f)
+        os.replace(tmp_ids_path, self.ids_path)
+        self.videos = videos
+        self._windows = {}
+
+    def get_video(self, video_id: str) -> Optional[dict]:
+        return next((video for video in self.videos if video["video_id"] == video_id), None)
+
+    def add_video(self, video_path: str, video_id: str = None, samples_per_second: int = 4) -> dict:
+        """Extract the per-second features of a video and append them to the index."""
+        video_id = video_id or os.path.splitext(os.path.basename(video_path))[0]
+        if self.get_video(video_id):
+            self.remove_video(video_id)
+
+        new_features, new_hashes = extract_second_features(video_path, samples_per_second)
+        video = {"video_id": video_id, "path": os.path.abspath(video_path),
+                 "row_start": len(self.features), "row_count": len(new_features)}
+        # Rows are appended in place; the ids table is only written once they are on disk
+        self._features = self._hashes = None
+        _append_rows(self.features_path, new_features)
+        _append_rows(self.hashes_path, new_hashes)
+        self._save_ids(self.videos + [video])
+        logging.info(f"Indexed {len(new_features)} seconds of {video_id}")
+        return video
+
+    def remove_video(self, video_id: str):
+        video = self.get_video(video_id)
+        if video is None:
+            return
+        keep = np.ones(len(self.features), dtype=bool)
+        keep[video["row_start"]:video["row_start"] + video["row_count"]] = False
+        features, hashes = np.asarray(self.features)[keep], np.asarray(self.hashes)[keep]
+
+        videos = []
+        for other in self.videos:
+            if other["video_id"] == video_id:
+                continue
+            if other["row_start"] > video["row_start"]:
+                other = {**other, "row_start": other["row_start"] - video["row_count"]}
+            videos.append(other)
+        self._save(features, hashes, videos)
+
+    def window_features(self, window_seconds: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Mean feature vector of every window of window_seconds seconds (windows never cross videos).
+        Computed once per window length and cached until the index changes.
+
+        Returns:
+            tuple: (windows, FEATURE_DIM) matrix, the index in self.videos and the start second of each row.
+        """
+        window_seconds = max(1, int(window_seconds))
+        if window_seconds not in self._windows:
+            self._windows[window_seconds] = self._compute_window_features(window_seconds)
+        return self._windows[window_seconds]
+
+    def _compute_window_features(self, window_seconds: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        matrices, video_rows, starts = [], [], []
+        features = self.features
+        for video_row, video in enumerate(self.videos):
+            count = video["row_count"] - window_seconds + 1
+            if count <= 0:
+                continue
+            rows = np.asarray(features[video["row_start"]:video["row_start"] + video["row_count"]], dtype=np.float64)
+            cumulative = np.concatenate([np.zeros((1, FEATURE_DIM)), np.cumsum(rows, axis=0)])
+            matrices.append((cumulative[window_seconds:] - cumulative[:count]) / window_seconds)
+            video_rows.append(np.full(count, video_row))
+            starts.append(np.arange(count))
+        if not matrices:
+            return np.zeros((0, FEATURE_DIM)), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(matrices), np.concatenate(video_rows), np.concatenate(starts)
+
+    def _top(self, scores: np.ndarray, video_rows: np.ndarray, starts: np.ndarray, window_seconds: int,
+             top_k: int, largest: bool) -> list[dict]:
+        if len(scores) == 0:
+            return []
+        ranking = -scores if largest else scores
+        top_k = min(top_k, len(scores))
+        order = np.argpartition(ranking, top_k - 1)[:top_k]
+        order = order[np.argsort(ranking[order])]
+        results = []
+        for i in order:
+            video = self.videos[video_rows[i]]
+            results.append({"video_id": video["video_id"], "path": video["path"],
+                            "start": float(starts[i]), "end": float(starts[i] + window_seconds),
+                            "score": float(scores[i])})
+        return results
+
+    def most_dynamic(self, window_seconds: int, top_k: int = 5) -> list[dict]:
+        """Windows with the highest average motion energy."""
+        windows, video_rows, starts = self.window_features(window_seconds)
+        return self._top(windows[:, MOTION], video_rows, starts, window_seconds, top_k, largest=True)
+
+    def darkest(self, window_seconds: int, top_k: int = 5) -> list[dict]:
+        """Windows with the lowest average brightness."""
+        windows, video_rows, starts = self.window_features(window_seconds)
+        return self._top(windows[:, BRIGHTNESS], video_rows, starts, window_seconds, top_k, largest=False)
+
+    def most_similar(self, video_id: str, start: int, window_seconds: int, top_k: int = 5,
+                     exclude_same_video: bool = True) -> list[dict]:
+        """Windows whose average features are closest (L2) to the window of video_id starting at start."""
+        windows, video_rows, starts = self.window_features(window_seconds)
+        video_row = next((i for i, video in enumerate(self.videos) if video["video_id"] == video_id), None)
+        if video_row is None:
+            raise ValueError(f"Video {video_id} is not indexed")
+        matches = np.flatnonzero((video_rows == video_row) & (starts == int(start)))
+        if len(matches) == 0:
+            raise ValueError(f"No {window_seconds}s window at {start}s in {video_id}")
+        distances = np.linalg.norm(windows - windows[matches[0]], axis=1)
+        if exclude_same_video:
+            distances[video_rows == video_row] = np.inf
+        results = self._top(distances, video_rows, starts, window_seconds, top_k, largest=False)
+        return [result for result in results if np.isfinite(result["score"])]
+
+    def near_duplicates(self, video_id: str, second: int, max_distance: int = 6) -> list[dict]:
+        """Seconds of footage whose perceptual hash is within max_distance bits of the given second."""
+        video = self.get_video(video_id)
+        if video is None or not 0 <= second < video["row_count"]:
+            raise ValueError(f"Second {second} of {video_id} is not indexed")
+        hashes = np.asarray(self.hashes)
+        query = hashes[video["row_start"] + int(second)]
+        distances = np.unpackbits(hashes ^ query, axis=1).sum(axis=1)
+        rows = np.flatnonzero(distances <= max_distance)
+
+        results = []
+        for other in self.videos:
+            mask = (rows >= other["row_start"]) & (rows < other["row_start"] + other["row_count"])
+            for row in rows[mask]:
+                results.append({"video_id": other["video_id"], "path": other["path"],
+                                "second": int(row - other["row_start"]), "distance": int(distances[row])})
+        return sorted(results, key=lambda result: result["distance"])
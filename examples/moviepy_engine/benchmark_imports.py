@@ -0,0 +1,69 @@
+"""
+Import time benchmark of the engine entry points.
+
+Every module is imported in a fresh interpreter with `python -X importtime` and its cumulative
+import time (best of a few runs) is checked against its budget. Exits with status 1 when a module
+is over budget, listing the slowest modules it pulled in.
+
+    python examples/moviepy_engine/benchmark_imports.py [--runs 5] [--top 10]
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Module -> budget in milliseconds
+IMPORT_BUDGETS_MS = {
+    "examples.moviepy_engine.reddit_stories.generate_reddit_story": 500,
+    "examples.moviepy_engine.src.json_2_video_engine.json_2_video": 500,
+    "examples.moviepy_engine.src.video_editor": 400,
+    "core.audio.text_to_speech.tts_generation": 50,
+    "core.audio.speech_to_text.stt_generation": 200,
+    "core.image.generation.image_generation": 100,
+    "core.script.script_generation": 50,
+}
+
+
+def measure_import(module: str) -> tuple[float, list[tuple[float, str]]]:
+    """Cumulative import time of module in ms, and the (self ms, name) of every module it imported."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Error importing {module}: {result.stderr.strip().splitlines()[-1]}")
+
+    total_ms, modules = None, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        modules.append((int(self_us) / 1000, name))
+        if name == module:
+            total_ms = int(cumulative_us) / 1000
+    if total_ms is None:
+        raise RuntimeError(f"{module} was not imported, is it already imported by site?")
+    return total_ms, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Imports per module, the fastest one is kept")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules listed for a module over budget")
+    args = parser.parse_args()
+
+    over_budget = False
+    for module, budget_ms in IMPORT_BUDGETS_MS.items():
+        total_ms, modules = min((measure_import(module) for _ in range(args.runs)), key=lambda run: run[0])
+        status = "ok" if total_ms <= budget_ms else "OVER BUDGET"
+        print(f"{total_ms:8.1f} ms / {budget_ms:5d} ms  {status:11s}  {module}")
+        if total_ms > budget_ms:
+            over_budget = True
+            for self_ms, name in sorted(modules, reverse=True)[:args.top]:
+                print(f"{'':12s}{self_ms:8.1f} ms  {name.strip()}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
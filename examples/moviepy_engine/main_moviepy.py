@@ -4,9 +4,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from examples.moviepy_engine.reddit_stories.generate_reddit_story import RedditStoryGenerator
+from core.utils.clients import get_env
 
 async def main():
-    reddit_stories = RedditStoryGenerator(openai_api_key=os.getenv('OPENAI_API_KEY'))
+    reddit_stories = RedditStoryGenerator(openai_api_key=get_env('OPENAI_API_KEY'))
     result = await reddit_stories.generate_video(
         video_path_or_url="video_url",
         video_url="https://www.youtube.com/watch?v=XBIaqOm0RKQ",
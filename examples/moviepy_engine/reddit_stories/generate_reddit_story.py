@@ -1,8 +1,9 @@
 import yaml
 import logging
-from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, TextClip
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.video.VideoClip import ImageClip
 import random
-from openai import OpenAI
 import os
 import re
 
@@ -13,6 +14,11 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 """ TurboReel-Moviepy imports """
 from ..src.video_editor import VideoEditor
 from ..src.captions.caption_handler import CaptionHandler
+from ..src.text_rasterizer import text_clip
+from ..src.compositor import FastCompositeVideoClip
+
+from core.utils.workspace import Workspace
+from core.utils.metrics import JobMetrics
 
 """ MediaChain imports """
 
@@ -22,8 +28,8 @@ from core.script.script_generation import generate_script
 from core.audio.text_to_speech.tts_generation import generate_text_to_speech
 from core.audio.speech_to_text.stt_generation import generate_speech_to_text
 from core.image.utils.image_timestamps import generate_image_timestamps
-# MediaChain Image
-from core.image.generation.image_generation import generate_image
+# MediaChain Video
+from core.video.analyze.utils.scene_index import build_scene_index
 
 class RedditStoryGenerator:
     def __init__(self, openai_api_key: str):
@@ -31,7 +37,7 @@ class RedditStoryGenerator:
         self.caption_handler: CaptionHandler = CaptionHandler()
         self.openai_api_key = openai_api_key
 
-    async def create_reddit_question_clip(self, reddit_question: str, video_height: int = 720) -> tuple[TextClip, str]:
+    async def create_reddit_question_clip(self, reddit_question: str, video_height: int = 720) -> tuple[ImageClip, str]:
         """Create a text clip for the Reddit question and generate its audio."""
         try:
             # Generate audio for the Reddit question
@@ -47,13 +53,13 @@ class RedditStoryGenerator:
             text_height = int(text_width * 0.35)  # 30% of cropped video width
 
             # Create a text clip for the Reddit question
-            reddit_question_text_clip = TextClip(
+            reddit_question_text_clip = text_clip(
                 reddit_question,
-                fontsize=int(video_height * 0.03),  # 2.5% of video height for font size
+                font_size=int(video_height * 0.03),  # 2.5% of video height for font size
                 color='black',
                 bg_color='white',
-                size=(text_width, text_height),  # Allow height to adjust automatically
-                method='caption',
+                width=text_width,
+                height=text_height,
                 align='center'
             ).set_duration(reddit_question_audio_duration)
 
@@ -81,6 +87,20 @@ class RedditStoryGenerator:
         Returns:
             dict: A dictionary with the status of the video generation and a message.
         """
+        try:
+            # Intermediate files (TTS audio, cut video, subtitles, images) live in the job workspace.
+            # Errors are raised through JobMetrics, so the job is recorded as failed.
+            with Workspace() as workspace, JobMetrics(workspace.job_id):
+                output_path = await self._generate_video(video_path_or_url, video_path, video_url, video_topic,
+                                                         captions_settings, add_images)
+        except Exception as e:
+            logging.error(f"Error in video generation: {e}")
+            return {"status": "error", "message": f"Error in video generation: {str(e)}"}
+        return {"status": "success", "message": "Video generated successfully.", "output_path": output_path}
+
+    async def _generate_video(self, video_path_or_url: str, video_path: str, video_url: str, video_topic: str,
+                              captions_settings: dict, add_images: bool) -> str:
+        """Generate the video and return its output path, raising on any failure."""
         clips_to_close = []
         try:
             if not video_path_or_url:
@@ -95,11 +115,14 @@ class RedditStoryGenerator:
             """ Download or getting video """
             video_path: str = video_path if video_path_or_url == 'video_path' else self.video_editor.download_video(video_url)
             if not video_path:
-                logging.error("Failed to download video.")
-                return {"status": "error", "message": "No video path provided."}
-            # Get video dimensions
-            with VideoFileClip(video_path) as video:
-                video_width, video_height = video.w, video.h
+                raise RuntimeError("Failed to download video.")
+            # Get video dimensions from the background library index, probing the file only if it isn't indexed
+            background_entry = self.video_editor.background_library.lookup(video_path)
+            if background_entry:
+                video_width, video_height = background_entry['width'], background_entry['height']
+            else:
+                with VideoFileClip(video_path) as video:
+                    video_width, video_height = video.w, video.h
 
             """ Handle Script Generation and Process """
             # Generate the script or use the provided script
@@ -107,8 +130,7 @@ class RedditStoryGenerator:
             script: dict = generate_script("openai", self.openai_api_key, video_topic, model="gpt-3.5-turbo-0125")
             
             if not script:
-                logging.error("Failed to generate script.")
-                return {"status": "error", "message": "Failed to generate script."}
+                raise RuntimeError("Failed to generate script.")
 
             """ Define video length for each clip (question and story) """
             # Initialize Reddit clips
@@ -119,30 +141,51 @@ class RedditStoryGenerator:
             clips_to_close.append(reddit_question_audio_clip)
             # Initialize Background video
             logging.info(f"Initializing Background video")
-            background_video_clip: VideoFileClip = VideoFileClip(video_path)
-            clips_to_close.append(background_video_clip)
-            background_video_length: float = background_video_clip.duration
+            if background_entry:
+                background_video_length: float = background_entry['duration']
+            else:
+                background_video_clip: VideoFileClip = VideoFileClip(video_path)
+                clips_to_close.append(background_video_clip)
+                background_video_length: float = background_video_clip.duration
             ## Initialize Story Audio
             logging.info(f"Generating story audio for the script: {script}")
             story_audio_path: str = generate_text_to_speech("openai", self.openai_api_key, script, voice="echo")
             if not story_audio_path:
-                logging.error("Failed to generate audio.")
-                return {"status": "error", "message": "Failed to generate audio."}
+                raise RuntimeError("Failed to generate audio.")
 
             story_audio_clip: AudioFileClip = AudioFileClip(story_audio_path)
             clips_to_close.append(story_audio_clip)
             story_audio_length: float = story_audio_clip.duration
         
             # Calculate video times to cut clips
-            max_start_time: float = background_video_length - story_audio_length - reddit_question_audio_duration
-            start_time: float = random.uniform(0, max_start_time)
-            end_time: float = start_time + reddit_question_audio_duration + story_audio_length
-            
-            """ Cut video once """
-            logging.info(f"Cutting video from {start_time} to {end_time}")
-            cut_video_path: str = self.video_editor.cut_video(video_path, start_time, end_time)
-            cut_video_clip = VideoFileClip(cut_video_path)
-            clips_to_close.append(cut_video_clip)
+            window_duration: float = reddit_question_audio_duration + story_audio_length
+            if background_entry:
+                """ Seek straight to a keyframe-aligned window of the pre-cropped proxy """
+                try:
+                    cut_times = build_scene_index(background_entry['proxy_path'] or background_entry['path'])['cut_times']
+                except Exception as e:
+                    logging.error(f"Error building scene index of the background video: {e}")
+                    cut_times = []
+                window_path, start_time = self.video_editor.background_library.pick_window(
+                    background_entry['video_id'], window_duration, avoid_cuts=cut_times
+                )
+                end_time: float = start_time + window_duration
+                logging.info(f"Using background window from {start_time} to {end_time} of {window_path}")
+                cut_video_path = None
+                window_clip = VideoFileClip(window_path)
+                clips_to_close.append(window_clip)
+                cut_video_clip = window_clip.subclip(start_time, end_time)
+            else:
+                max_start_time: float = background_video_length - window_duration
+                start_time: float = random.uniform(0, max_start_time)
+                end_time: float = start_time + window_duration
+
+                """ Cut video once """
+                logging.info(f"Cutting video from {start_time} to {end_time}")
+                cut_video_path: str = self.video_editor.cut_video(video_path, start_time, end_time)
+                # Crop to 9:16 at decode time, so the crops below have nothing left to do
+                cut_video_clip = self.video_editor.load_video_9_16(cut_video_path)
+                clips_to_close.append(cut_video_clip)
 
             """ Handle reddit question video """
             reddit_question_video = cut_video_clip.subclip(0, reddit_question_audio_duration)
@@ -151,7 +194,7 @@ class RedditStoryGenerator:
 
             # Add the text clip to the video
             logging.info(f"Adding text clip to the video")
-            reddit_question_video = CompositeVideoClip([
+            reddit_question_video = FastCompositeVideoClip([
                 reddit_question_video,
                 reddit_question_text_clip.set_position(('center', 'center'))
             ])
@@ -184,7 +227,7 @@ class RedditStoryGenerator:
             logging.info(f"Adding captions to the story video")
             story_video = self.video_editor.add_captions_to_video(story_video, story_subtitles_clips)
             # Combine clips
-            combined_clips = CompositeVideoClip([
+            combined_clips = FastCompositeVideoClip([
                 reddit_question_video,
                 story_video.set_start(reddit_question_audio_duration)
             ])
@@ -193,14 +236,10 @@ class RedditStoryGenerator:
             final_video_output_path = self.video_editor.render_final_video(combined_clips)
             
             # Cleanup: Ensure temporary files are removed
-            self.video_editor.cleanup_files([story_audio_path, cut_video_path, story_subtitles_path, reddit_question_audio_path])
+            self.video_editor.cleanup_files([path for path in [story_audio_path, cut_video_path, story_subtitles_path, reddit_question_audio_path] if path])
             
             logging.info(f"FINAL OUTPUT PATH: {final_video_output_path}")
-            return {"status": "success", "message": "Video generated successfully.", "output_path": final_video_output_path}
-        
-        except Exception as e:
-            logging.error(f"Error in video generation: {e}")
-            return {"status": "error", "message": f"Error in video generation: {str(e)}"}
+            return final_video_output_path
         finally:
             # Close all clips
             for clip in clips_to_close:
@@ -0,0 +1,266 @@
+import logging
+import subprocess as sp
+import numpy as np
+from typing import Literal, Optional
+
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from .ffmpeg_utils import get_ffmpeg_binary
+
+from core.utils.workspace import check_quota
+
+DEFAULT_FPS = 44100
+DEFAULT_BLOCK_SECONDS = 2.0
+
+
+class AudioTrack:
+    """One source (a file, or PCM samples in memory) placed on the timeline, with its volume and fades."""
+
+    def __init__(self, path: Optional[str], start: float, duration: float, source_start: float = 0.0, volume: float = 1.0,
+                 fade_in: float = 0.0, fade_out: float = 0.0, role: Literal["voice", "music", "sfx"] = "sfx",
+                 samples: Optional[np.ndarray] = None, sample_rate: Optional[int] = None):
+        self.path = path
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.start = start
+        self.duration = duration
+        self.source_start = source_start
+        self.volume = volume
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+        self.role = role
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+
+class _TrackDecoder:
+    """Sequential float32 PCM reader of a track, decoding only from source_start onwards."""
+
+    def __init__(self, track: AudioTrack, fps: int, nchannels: int):
+        self.nchannels = nchannels
+        cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error",
+               "-ss", f"{track.source_start:.6f}", "-i", track.path, "-t", f"{track.duration:.6f}",
+               "-vn", "-f", "f32le", "-ac", str(nchannels), "-ar", str(fps), "-"]
+        self.proc = sp.Popen(cmd, stdout=sp.PIPE, stderr=sp.DEVNULL, stdin=sp.DEVNULL)
+
+    def read(self, nframes: int) -> np.ndarray:
+        data = self.proc.stdout.read(nframes * self.nchannels * 4)
+        samples = np.frombuffer(data, dtype=np.float32).reshape(-1, self.nchannels)
+        if len(samples) < nframes:
+            # Source shorter than its slot on the timeline: pad with silence
+            samples = np.concatenate([samples, np.zeros((nframes - len(samples), self.nchannels), dtype=np.float32)])
+        return samples
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.stdout.close()
+        self.proc.wait()
+
+
+def convert_pcm(samples: np.ndarray, sample_rate: int, fps: int, nchannels: int) -> np.ndarray:
+    """Resample (with ffmpeg's resampler, through pipes) and up/down-mix (frames, channels) float32 PCM."""
+    if sample_rate == fps and samples.shape[1] == nchannels:
+        return samples
+    cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error",
+           "-f", "f32le", "-ac", str(samples.shape[1]), "-ar", str(sample_rate), "-i", "-",
+           "-f", "f32le", "-ac", str(nchannels), "-ar", str(fps), "-"]
+    result = sp.run(cmd, input=np.ascontiguousarray(samples).tobytes(), stdout=sp.PIPE, stderr=sp.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"Error converting audio: {result.stderr.decode(errors='ignore')}")
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, nchannels)
+
+
+class _PcmReader:
+    """Sequential reader of an in-memory track, converted once to the mix format."""
+
+    def __init__(self, track: AudioTrack, fps: int, nchannels: int):
+        self.samples = convert_pcm(track.samples, track.sample_rate, fps, nchannels)
+        self.position = int(round(track.source_start * fps))
+        self.nchannels = nchannels
+
+    def read(self, nframes: int) -> np.ndarray:
+        samples = self.samples[self.position:self.position + nframes]
+        self.position += nframes
+        if len(samples) < nframes:
+            samples = np.concatenate([samples, np.zeros((nframes - len(samples), self.nchannels), dtype=np.float32)])
+        return samples
+
+    def close(self):
+        pass
+
+
+class AudioMixer:
+    """
+    Premixes every audio source of a timeline into a single track.
+
+    The mix is rendered once, block by block: each block only decodes the tracks that
+    overlap it, applies vectorized volume/fade envelopes and ducks the music under the
+    voice tracks, then streams the result to ffmpeg. Memory stays at one block per
+    active track, whatever the timeline length.
+    """
+
+    def __init__(self, fps: int = DEFAULT_FPS, nchannels: int = 2, block_seconds: float = DEFAULT_BLOCK_SECONDS):
+        self.fps = fps
+        self.nchannels = nchannels
+        self.block_seconds = block_seconds
+        self.tracks: list[AudioTrack] = []
+
+    def add(self, path: str, start: float, duration: Optional[float] = None, source_start: float = 0.0,
+            volume: float = 1.0, fade_in: float = 0.0, fade_out: float = 0.0,
+            role: Literal["voice", "music", "sfx"] = "sfx") -> Optional[AudioTrack]:
+        """Place a source on the timeline. Sources without an audio stream are skipped."""
+        infos = ffmpeg_parse_infos(path)
+        if not infos.get("audio_found"):
+            logging.info(f"No audio stream in {path}, skipping")
+            return None
+        if duration is None:
+            duration = max(0.0, float(infos["duration"]) - source_start)
+        track = AudioTrack(path, float(start), float(duration), float(source_start), float(volume),
+                           float(fade_in), float(fade_out), role)
+        self.tracks.append(track)
+        return track
+
+    def add_pcm(self, samples: np.ndarray, sample_rate: int, start: float, duration: Optional[float] = None,
+                source_start: float = 0.0, volume: float = 1.0, fade_in: float = 0.0, fade_out: float = 0.0,
+                role: Literal["voice", "music", "sfx"] = "sfx") -> AudioTrack:
+        """Place PCM samples already in memory ((frames,) or (frames, channels) floats in [-1, 1]) on the timeline."""
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        if duration is None:
+            duration = max(0.0, len(samples) / sample_rate - source_start)
+        track = AudioTrack(None, float(start), float(duration), float(source_start), float(volume),
+                           float(fade_in), float(fade_out), role, samples=samples, sample_rate=int(sample_rate))
+        self.tracks.append(track)
+        return track
+
+    @property
+    def duration(self) -> float:
+        return max((track.end for track in self.tracks), default=0.0)
+
+    def _track_gain(self, track: AudioTrack, times: np.ndarray) -> np.ndarray:
+        gain = np.full(len(times), track.volume, dtype=np.float32)
+        if track.fade_in > 0:
+            gain *= np.clip((times - track.start) / track.fade_in, 0, 1)
+        if track.fade_out > 0:
+            gain *= np.clip((track.end - times) / track.fade_out, 0, 1)
+        return gain
+
+    @staticmethod
+    def _duck_amount(voice_intervals: np.ndarray, times: np.ndarray, attack: float, release: float) -> np.ndarray:
+        """How much the music is ducked at every time, in [0, 1], with linear attack/release ramps."""
+        if len(voice_intervals) == 0:
+            return np.zeros(len(times), dtype=np.float32)
+        starts, ends = voice_intervals[:, 0:1], voice_intervals[:, 1:2]
+        ramp_in = (times - (starts - attack)) / max(attack, 1e-6)
+        ramp_out = ((ends + release) - times) / max(release, 1e-6)
+        return np.clip(np.minimum(ramp_in, ramp_out), 0, 1).max(axis=0).astype(np.float32)
+
+    def _mix_blocks(self, duration: Optional[float], roles: Optional[list[str]], duck_music: bool, duck_volume: float,
+                    duck_attack: float, duck_release: float, fps: int, nchannels: int):
+        """Yield the mix block by block. Each block is a view of a reused buffer, valid until the next one."""
+        tracks = [track for track in self.tracks if roles is None or track.role in roles]
+        duration = duration if duration is not None else max((track.end for track in tracks), default=0.0)
+        total_frames = int(round(duration * fps))
+        block_frames = max(1, int(self.block_seconds * fps))
+        voice_intervals = np.array([[track.start, track.end] for track in self.tracks if track.role == "voice"]).reshape(-1, 2)
+
+        decoders: dict[int, _TrackDecoder | _PcmReader] = {}
+        mix = np.zeros((block_frames, nchannels), dtype=np.float32)
+        try:
+            for block_start in range(0, total_frames, block_frames):
+                nframes = min(block_frames, total_frames - block_start)
+                block = mix[:nframes]
+                block.fill(0)
+                times = (block_start + np.arange(nframes)) / fps
+                t0, t1 = times[0], times[-1] + 1 / fps
+
+                duck_gain = None
+                for index, track in enumerate(tracks):
+                    if track.end <= t0 or track.start >= t1:
+                        if index in decoders and track.end <= t0:
+                            decoders.pop(index).close()
+                        continue
+                    if index not in decoders:
+                        reader = _PcmReader if track.samples is not None else _TrackDecoder
+                        decoders[index] = reader(track, fps, nchannels)
+
+                    # Frames of this block covered by the track
+                    first = max(0, int(round((track.start - t0) * fps)))
+                    last = min(nframes, int(round((track.end - t0) * fps)))
+                    if last <= first:
+                        continue
+                    samples = decoders[index].read(last - first)
+                    gain = self._track_gain(track, times[first:last])
+                    if duck_music and track.role == "music":
+                        if duck_gain is None:
+                            duck_gain = 1 - (1 - duck_volume) * self._duck_amount(voice_intervals, times, duck_attack, duck_release)
+                        gain *= duck_gain[first:last]
+                    block[first:last] += samples * gain[:, None]
+
+                np.clip(block, -1, 1, out=block)
+                yield block
+        finally:
+            for decoder in decoders.values():
+                decoder.close()
+
+    def render(self, output_path: str, duration: Optional[float] = None, roles: Optional[list[str]] = None,
+               duck_music: bool = True, duck_volume: float = 0.3, duck_attack: float = 0.15,
+               duck_release: float = 0.4, codec: Optional[str] = None, bitrate: str = "192k",
+               fps: Optional[int] = None, nchannels: Optional[int] = None) -> str:
+        """
+        Render the mix to output_path (PCM WAV for .wav, AAC otherwise).
+
+        Args:
+            output_path: Audio file to write.
+            duration: Length of the track, defaults to the end of the last source.
+            roles: Only mix the tracks with these roles (e.g. ["voice"] for transcription).
+            duck_music: Lower the music to duck_volume while a voice track plays.
+            duck_volume: Music gain under the voice.
+            duck_attack: Seconds to ramp the music down before the voice starts.
+            duck_release: Seconds to ramp the music back up after the voice ends.
+            codec: ffmpeg audio codec, guessed from the extension when None.
+            bitrate: Bitrate of compressed output.
+            fps: Output sample rate, defaults to the mixer's.
+            nchannels: Output channels, defaults to the mixer's.
+        """
+        fps = fps or self.fps
+        nchannels = nchannels or self.nchannels
+
+        if codec is None:
+            codec = "pcm_s16le" if output_path.lower().endswith(".wav") else "aac"
+        cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+               "-f", "f32le", "-ac", str(nchannels), "-ar", str(fps), "-i", "-",
+               "-c:a", codec]
+        if codec != "pcm_s16le":
+            cmd += ["-b:a", bitrate]
+        writer = sp.Popen(cmd + [output_path], stdin=sp.PIPE, stdout=sp.DEVNULL, stderr=sp.PIPE)
+
+        total_frames = 0
+        try:
+            for block in self._mix_blocks(duration, roles, duck_music, duck_volume, duck_attack, duck_release, fps, nchannels):
+                writer.stdin.write(block.tobytes())
+                total_frames += len(block)
+        finally:
+            writer.stdin.close()
+            writer.wait()
+
+        if writer.returncode != 0:
+            raise RuntimeError(f"Error writing audio mix {output_path}: {writer.stderr.read().decode(errors='ignore')}")
+        writer.stderr.close()
+        check_quota()
+        logging.info(f"Rendered {total_frames / fps:.2f}s of audio to {output_path}")
+        return output_path
+
+    def render_pcm(self, duration: Optional[float] = None, roles: Optional[list[str]] = None, duck_music: bool = True,
+                   duck_volume: float = 0.3, duck_attack: float = 0.15, duck_release: float = 0.4,
+                   fps: Optional[int] = None, nchannels: Optional[int] = None) -> np.ndarray:
+        """Render the mix in memory, as (frames, nchannels) float32 PCM. Same arguments as render."""
+        fps = fps or self.fps
+        nchannels = nchannels or self.nchannels
+        blocks = [block.copy() for block in
+                  self._mix_blocks(duration, roles, duck_music, duck_volume, duck_attack, duck_release, fps, nchannels)]
+        return np.concatenate(blocks) if blocks else np.zeros((0, nchannels), dtype=np.float32)
@@ -0,0 +1,221 @@
+import os
+import time
+import random
+import bisect
+import logging
+import sqlite3
+from contextlib import closing
+
+from .ffmpeg_utils import probe_video, extract_keyframes, render_proxy
+
+DEFAULT_QUOTA_BYTES = 10 * 1024 ** 3  # 10 GB
+DEFAULT_TARGET_HEIGHT = 1080
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    proxy_path TEXT,
+    duration REAL NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    fps REAL NOT NULL,
+    has_audio INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS keyframes (
+    video_id TEXT NOT NULL,
+    pts_time REAL NOT NULL,
+    PRIMARY KEY (video_id, pts_time)
+);
+"""
+
+
+class BackgroundLibrary:
+    """
+    SQLite index of the background videos in the downloads directory.
+
+    Each entry stores the probed metadata of the source, a keyframe table of the file
+    we actually read from and an optional pre-rendered 9:16 center-crop proxy.
+    The directory is kept under a disk quota by evicting the least recently used entries.
+    When a feature_index is given, indexed videos are also added to it for window search.
+    """
+
+    def __init__(self, library_dir: str, quota_bytes: int = DEFAULT_QUOTA_BYTES,
+                 target_height: int = DEFAULT_TARGET_HEIGHT, build_proxies: bool = True,
+                 feature_index=None):
+        self.library_dir = os.path.abspath(library_dir)
+        self.proxies_dir = os.path.join(self.library_dir, 'proxies')
+        self.db_path = os.path.join(self.library_dir, 'library.sqlite3')
+        self.quota_bytes = quota_bytes
+        self.target_height = target_height
+        self.build_proxies = build_proxies
+        self.feature_index = feature_index
+
+        os.makedirs(self.proxies_dir, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def register(self, video_path: str, video_id: str = None) -> dict:
+        """
+        Add a video to the library (probe, proxy and keyframes) and enforce the disk quota.
+        Registering an already indexed video only refreshes its last used time.
+        """
+        video_path = os.path.abspath(video_path)
+        video_id = video_id or os.path.splitext(os.path.basename(video_path))[0]
+
+        entry = self.get(video_id)
+        if entry and os.path.exists(entry['path']):
+            entry['last_used_at'] = time.time()
+            with closing(self._connect()) as conn, conn:
+                conn.execute("UPDATE videos SET last_used_at = ? WHERE video_id = ?", (entry['last_used_at'], video_id))
+            return entry
+
+        logging.info(f"Indexing background video {video_id}: {video_path}")
+        infos = probe_video(video_path)
+
+        proxy_path = None
+        if self.build_proxies:
+            target_height = min(self.target_height, infos['height'])
+            target_height -= target_height % 2
+            proxy_path = os.path.join(self.proxies_dir, f"{video_id}_9x16_{target_height}p.mp4")
+            if not os.path.exists(proxy_path):
+                render_proxy(video_path, proxy_path, infos['width'], infos['height'], target_height, infos['fps'])
+
+        keyframes = extract_keyframes(proxy_path or video_path)
+        size_bytes = os.path.getsize(video_path) + (os.path.getsize(proxy_path) if proxy_path else 0)
+        now = time.time()
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM keyframes WHERE video_id = ?", (video_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_id, video_path, proxy_path, infos['duration'], infos['width'], infos['height'],
+                 infos['fps'], int(infos['has_audio']), size_bytes, now, now)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO keyframes VALUES (?, ?)",
+                [(video_id, pts_time) for pts_time in keyframes]
+            )
+
+        if self.feature_index is not None:
+            try:
+                self.feature_index.add_video(proxy_path or video_path, video_id=video_id)
+            except Exception as e:
+                logging.error(f"Error adding {video_id} to the feature index: {e}")
+
+        self.evict(keep=[video_id])
+        return self.get(video_id)
+
+    def get(self, video_id: str) -> dict | None:
+        """Return the indexed entry for video_id, or None if it isn't indexed."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return dict(row) if row else None
+
+    def lookup(self, video_path: str) -> dict | None:
+        """Return the entry whose source or proxy is video_path and mark it as used."""
+        video_path = os.path.abspath(video_path)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT * FROM videos WHERE path = ? OR proxy_path = ?", (video_path, video_path)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE videos SET last_used_at = ? WHERE video_id = ?", (time.time(), row['video_id']))
+        return dict(row)
+
+    def get_keyframes(self, video_id: str) -> list[float]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT pts_time FROM keyframes WHERE video_id = ? ORDER BY pts_time", (video_id,)
+            ).fetchall()
+        return [row['pts_time'] for row in rows]
+
+    def pick_window(self, video_id: str, window_duration: float, rng: random.Random = None,
+                    avoid_cuts: list = None, cut_margin: float = 1.0, attempts: int = 10) -> tuple[str, float]:
+        """
+        Pick a random window of window_duration seconds from an indexed video.
+
+        The start time is snapped back to the closest keyframe so the reader can seek
+        straight to it without decoding anything before the window. With avoid_cuts,
+        windows whose first cut_margin seconds contain a hard cut are re-drawn.
+
+        Returns:
+            tuple[str, float]: Path to read from (the proxy when available) and the window start time.
+        """
+        entry = self.get(video_id)
+        if entry is None:
+            raise ValueError(f"Video {video_id} is not in the background library")
+        if window_duration > entry['duration']:
+            raise ValueError(f"Window of {window_duration:.2f}s is longer than video {video_id} ({entry['duration']:.2f}s)")
+
+        rng = rng or random
+        keyframes = self.get_keyframes(video_id)
+        avoid_cuts = sorted(avoid_cuts or [])
+
+        for _ in range(max(1, attempts)):
+            start_time = rng.uniform(0, entry['duration'] - window_duration)
+            index = bisect.bisect_right(keyframes, start_time) - 1
+            if index >= 0:
+                start_time = keyframes[index]
+
+            # A cut right after the start would flash the previous shot for a few frames
+            cut_index = bisect.bisect_right(avoid_cuts, start_time)
+            if cut_index == len(avoid_cuts) or avoid_cuts[cut_index] > start_time + cut_margin:
+                break
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE videos SET last_used_at = ? WHERE video_id = ?", (time.time(), video_id))
+
+        return entry['proxy_path'] or entry['path'], start_time
+
+    def disk_usage(self) -> int:
+        """Total bytes used by the indexed sources and proxies."""
+        with closing(self._connect()) as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM videos").fetchone()[0]
+        return int(total)
+
+    def remove(self, video_id: str):
+        """Delete a video, its proxy and its index rows."""
+        entry = self.get(video_id)
+        if entry is None:
+            return
+        for path in (entry['path'], entry['proxy_path']):
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+                    logging.info(f"Deleted background file: {path}")
+            except OSError as e:
+                logging.error(f"Error deleting background file {path}: {e}")
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM keyframes WHERE video_id = ?", (video_id,))
+            conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+        if self.feature_index is not None:
+            self.feature_index.remove_video(video_id)
+
+    def evict(self, keep: list = None):
+        """Evict least recently used videos until the library fits in the disk quota."""
+        keep = set(keep or [])
+        usage = self.disk_usage()
+        if usage <= self.quota_bytes:
+            return
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT video_id, size_bytes FROM videos ORDER BY last_used_at ASC").fetchall()
+
+        for row in rows:
+            if usage <= self.quota_bytes:
+                break
+            if row['video_id'] in keep:
+                continue
+            logging.info(f"Evicting background video {row['video_id']} ({row['size_bytes']} bytes)")
+            self.remove(row['video_id'])
+            usage -= row['size_bytes']
@@ -1,12 +1,13 @@
 import os
 import logging
 
+from PIL import ImageColor
+
 from .subtitle_generator import SubtitleGenerator
 from .video_captioner import VideoCaptioner
+from ..text_rasterizer import load_font, FONTS_DIR
 
-# Load environment variables from .env file
-from dotenv import load_dotenv
-load_dotenv()
+from core.utils.workspace import scratch_path
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -18,14 +19,61 @@ class CaptionHandler:
         self.video_captioner = VideoCaptioner()
         self.default_font = "Dacherry.ttf"
 
-    async def process(self, audio_file: str, captions_color="white", shadow_color="cyan", font_size=60, font=None, width=540):
-        subtitles_file = await self.subtitle_generator.generate_subtitles(audio_file)
+    async def process(self, audio_file, captions_color="white", shadow_color="cyan", font_size=60, font=None, width=540,
+                      save_subtitles: bool = False):
+        """
+        Transcribe the audio (a path, or 16 kHz mono PCM in memory) into caption clips.
+        The captions go straight from the transcription to the clips; the SRT file is only
+        written with save_subtitles, and its path returned (None otherwise).
+        """
+        if save_subtitles:
+            subtitles_file = await self.subtitle_generator.generate_subtitles(audio_file)
+            subtitles = subtitles_file
+        else:
+            subtitles_file = None
+            subtitles = await self.subtitle_generator.speech_to_text(audio_file)
         caption_clips = self.video_captioner.generate_captions_to_video(
-            subtitles_file,
+            subtitles,
             font=font,
             captions_color=captions_color,
             shadow_color=shadow_color,
             font_size=font_size,
             width=width
         )
-        return subtitles_file, caption_clips
\ No newline at end of file
+        return subtitles_file, caption_clips
+
+    async def process_ass(self, audio_file, captions_color="white", shadow_color="cyan", font_size=60, font=None,
+                          width=540, height=960, highlight_color=None, karaoke=True) -> str:
+        """
+        Transcribe the audio into a styled ASS subtitle file (same caption grouping and look as process),
+        to burn in with ffmpeg's subtitles filter or to ship as a subtitle track.
+        With karaoke, each word switches to highlight_color when it is spoken.
+        """
+        word_timings = await self.subtitle_generator.transcribe_words(audio_file)
+        caption_groups = self.subtitle_generator.caption_groups(word_timings)
+
+        # libass looks fonts up by family name, in FONTS_DIR when burning in
+        font_path = self.video_captioner.get_font_path(font) if font else self.video_captioner.default_font
+        font_name = load_font(font_path, int(font_size)).getname()[0] if font_path else "Arial"
+        ass = caption_groups.to_ass(
+            width, height,
+            font_name=font_name,
+            font_size=font_size * 1.1,
+            color=ImageColor.getrgb(captions_color),
+            highlight_color=ImageColor.getrgb(highlight_color) if highlight_color else None,
+            outline_color=ImageColor.getrgb(shadow_color),
+            outline_width=font_size / 15,
+            position=0.4,
+            uppercase=True,
+            karaoke=karaoke
+        )
+
+        output_file = scratch_path('subtitles_', '.ass', fallback_dir=os.path.join(self.subtitle_generator.base_dir, 'assets'))
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(ass)
+        logging.info(f"ASS subtitles saved: {output_file}")
+        return output_file
+
+    @property
+    def fonts_dir(self) -> str:
+        return FONTS_DIR
\ No newline at end of file
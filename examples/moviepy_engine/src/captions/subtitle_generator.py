@@ -1,17 +1,25 @@
+import asyncio
 import logging
 import os
 import pysrt
-import uuid
-from openai import OpenAI
+
+from core.audio.speech_to_text.utils.chunking import transcribe_chunked
+from core.audio.speech_to_text.utils.word_timings import WordTimings, CaptionGroups
+from core.utils.workspace import scratch_path
+from core.utils.clients import get_openai_client
+from core.utils.metrics import track_call
 
 from .utils import convert_seconds_to_srt_time
 
 class SubtitleGenerator:
     def __init__(self):
-        self.openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.convert_seconds_to_srt_time = convert_seconds_to_srt_time
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+    @property
+    def openai(self):
+        return get_openai_client()
+
     async def generate_subtitles(self, audio_file: str):
         try:
             subtitles = await self.speech_to_text(audio_file)
@@ -20,9 +28,7 @@ class SubtitleGenerator:
             for index, (start, end, text) in enumerate(subtitles):
                 srt_file.append(pysrt.SubRipItem(index=index + 1, start=start, end=end, text=text))
             
-            unique_id = uuid.uuid4()
-            output_dir = os.path.join(self.base_dir, 'assets')
-            output_file = os.path.join(output_dir, f'subtitles_{unique_id}.srt')
+            output_file = scratch_path('subtitles_', '.srt', fallback_dir=os.path.join(self.base_dir, 'assets'))
             srt_file.save(output_file)
             
             logging.info("Subtitles generated and saved successfully.")
@@ -31,48 +37,42 @@ class SubtitleGenerator:
             logging.error(f"Error generating subtitles: {e}")
             return None
 
+    def _transcribe_file(self, audio_file) -> list[dict]:
+        """Transcribe a path, or a (file name, bytes) upload already in memory."""
+        transcribe = lambda audio: self.openai.audio.transcriptions.create(  # Use OpenAI's transcription method
+            file=audio,
+            model="whisper-1",
+            response_format="verbose_json",
+            timestamp_granularities=["word"]
+        )
+        with track_call("openai", "stt"):
+            if isinstance(audio_file, tuple):
+                transcript = transcribe(audio_file)
+            else:
+                with open(audio_file, "rb") as audio:
+                    transcript = transcribe(audio)
+        return WordTimings.from_words(transcript.words).to_words()
+
+    async def transcribe_words(self, audio_file) -> WordTimings:
+        """
+        Transcribe the audio file (or 16 kHz mono PCM in memory) into word timestamps,
+        in concurrent silence-split chunks when it is long.
+        """
+        words = await asyncio.to_thread(transcribe_chunked, self._transcribe_file, audio_file)
+        return WordTimings.from_words(words)
+
+    def caption_groups(self, word_timings: WordTimings) -> CaptionGroups:
+        # Short captions: 2 words, or fewer when there is a pause of 600 ms or more
+        return word_timings.group(max_words=2, gap_threshold=0.6)
+
+    def _to_subtitles(self, caption_groups) -> list:
+        return [(self.convert_seconds_to_srt_time(start), self.convert_seconds_to_srt_time(end), text)
+                for start, end, text in caption_groups]
+
     async def speech_to_text(self, audio_file: str):
         try:
-            audio_file = open(audio_file, "rb")  # Open the audio file
-            transcript = self.openai.audio.transcriptions.create(  # Use OpenAI's transcription method
-                file=audio_file,
-                model="whisper-1",
-                response_format="verbose_json",
-                timestamp_granularities=["word"]
-            )
-            subtitles = []
-            current_words = []
-            subtitle_start_time = None
-
-            for i, word_info in enumerate(transcript.words):
-                word_start_time = self.convert_seconds_to_srt_time(word_info.start)
-                word_end_time = self.convert_seconds_to_srt_time(word_info.end)
-
-                previous_word_end = self.convert_seconds_to_srt_time(transcript.words[i - 1].end)
-
-                if subtitle_start_time is None:
-                    subtitle_start_time = word_start_time
-
-                current_words.append(word_info.word.strip())
-
-                #check if current subtitle is long enough or if the next word is too long
-                if len(current_words) >= 2 or (i > 0 and word_start_time.ordinal - previous_word_end.ordinal >= 600):
-                    #formatted_text = " ".join(current_words[:1]) + "\n" + " ".join(current_words[1:])
-                    formatted_text = " ".join(current_words)
-                    subtitles.append((subtitle_start_time, word_end_time, formatted_text))
-                    current_words = []
-                    subtitle_start_time = None
-
-            # Handle any remaining word
-            if current_words:
-                # Old multi-line approach (commented out)
-                # formatted_text = " ".join(current_words[:1])
-                # if len(current_words) > 1:
-                #     formatted_text += "\n" + " ".join(current_words[1:])
-                
-                # New single-line approach
-                formatted_text = " ".join(current_words)
-                subtitles.append((subtitle_start_time, word_end_time, formatted_text))
+            word_timings = await self.transcribe_words(audio_file)
+            subtitles = self._to_subtitles(self.caption_groups(word_timings))
 
             logging.info(f"Speech-to-text transcription completed.")
             return subtitles
@@ -88,9 +88,7 @@ class SubtitleGenerator:
             for index, (start, end, text) in enumerate(subtitles):
                 srt_file.append(pysrt.SubRipItem(index=index + 1, start=start, end=end, text=text))
             
-            unique_id = uuid.uuid4()
-            output_dir = os.path.join(self.base_dir, 'assets')
-            output_file = os.path.join(output_dir, f'subtitles_{unique_id}.srt')
+            output_file = scratch_path('subtitles_', '.srt', fallback_dir=os.path.join(self.base_dir, 'assets'))
             srt_file.save(output_file)
             
             logging.info("Subtitles generated and saved successfully.")
@@ -101,41 +99,9 @@ class SubtitleGenerator:
 
     async def speech_to_text_for_translation(self, audio_file):
         try:
-            audio_file = open(audio_file, "rb")  # Open the audio file
-            transcript = self.openai.audio.transcriptions.create(  # Use OpenAI's transcription method
-                file=audio_file,
-                model="whisper-1",
-                response_format="verbose_json",
-                timestamp_granularities=["word"]
-            )
-            subtitles = []
-            current_words = []
-            subtitle_start_time = None
-
-            for i, word_info in enumerate(transcript.words):
-                word_start_time = self.convert_seconds_to_srt_time(word_info.start)
-                word_end_time = self.convert_seconds_to_srt_time(word_info.end)
-
-                previous_word_end = self.convert_seconds_to_srt_time(transcript.words[i - 1].end)
-
-                if subtitle_start_time is None:
-                    subtitle_start_time = word_start_time
-
-                current_words.append(word_info.word.strip())
-
-                #check if current subtitle is long enough or if the next word is too long
-                if len(current_words) >= 8:
-                    formatted_text = " ".join(current_words[:4]) + "\n" + " ".join(current_words[4:])
-                    subtitles.append((subtitle_start_time, word_end_time, formatted_text))
-                    current_words = []
-                    subtitle_start_time = None
-
-            # Handle any remaining word
-            if current_words:
-                formatted_text = " ".join(current_words[:4])
-                if len(current_words) > 4:
-                    formatted_text += "\n" + " ".join(current_words[4:])
-                subtitles.append((subtitle_start_time, word_end_time, formatted_text))
+            word_timings = await self.transcribe_words(audio_file)
+            # Long captions: 8 words on two lines of 4
+            subtitles = self._to_subtitles(word_timings.group(max_words=8, words_per_line=4))
 
             logging.info(f"Speech-to-text transcription completed.")
             return subtitles
@@ -1,8 +1,9 @@
-from moviepy.editor import TextClip, CompositeVideoClip
 import pysrt
 import logging
 import os
 
+from ..text_rasterizer import text_clip
+
 class VideoCaptioner:
     def __init__(self):
         self.default_font = self.get_font_path("Dacherry.ttf")
@@ -29,12 +30,9 @@ class VideoCaptioner:
         #shadow_clip = TextClip(txt, fontsize=fontsize, font=font, color=shadow_color, size=(width, None), method='caption')
         #shadow_clip = shadow_clip.set_position((shadow_offset, shadow_offset))
 
-        # Create the main text
-        text_clip = TextClip(txt, fontsize=fontsize*1.1, font=font, color=color, size=(width*0.8, None), method='caption', stroke_color=shadow_color, stroke_width=fontsize/15)
-        
-        # Composite all layers
-        #return CompositeVideoClip([blur_clip, shadow_clip, text_clip])
-        return CompositeVideoClip([text_clip])
+        # Create the main text, rasterized in-process (cached per text and style)
+        return text_clip(txt, font=font, font_size=fontsize*1.1, color=color, width=width*0.8,
+                         stroke_color=shadow_color, stroke_width=fontsize/15)
 
     """ Call this function to generate the captions to video """
     def generate_captions_to_video(self, 
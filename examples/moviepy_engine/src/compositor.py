@@ -0,0 +1,171 @@
+import numpy as np
+from moviepy.video.VideoClip import VideoClip, ColorClip
+from moviepy.audio.AudioClip import CompositeAudioClip
+
+POSITION_SHORTCUTS = {
+    'center': ['center', 'center'],
+    'left': ['left', 'center'],
+    'right': ['right', 'center'],
+    'top': ['center', 'top'],
+    'bottom': ['center', 'bottom'],
+}
+
+
+def _is_static_frame(clip, frame) -> bool:
+    """A still (ImageClip, ColorClip, rendered text) returns its own img array for every t."""
+    return frame is getattr(clip, 'img', None)
+
+
+class _Sprite:
+    """Premultiplied RGB and 1 - alpha of a layer, in float32, ready to blend."""
+
+    def __init__(self, height: int, width: int, with_alpha: bool):
+        self.premultiplied = np.empty((height, width, 3), dtype=np.float32)
+        self.inverse_alpha = np.empty((height, width, 1), dtype=np.float32) if with_alpha else None
+
+    def fill(self, frame: np.ndarray, alpha: np.ndarray = None):
+        if alpha is None:
+            np.copyto(self.premultiplied, frame, casting='unsafe')
+            return
+        alpha = alpha[:, :, None]
+        np.multiply(frame, alpha, out=self.premultiplied, casting='unsafe')
+        np.subtract(1.0, alpha, out=self.inverse_alpha, casting='unsafe')
+
+
+class FastCompositeVideoClip(VideoClip):
+    """
+    Drop-in, opaque replacement for CompositeVideoClip used by our renderers.
+
+    Frames are composed into a preallocated float32 canvas and returned in a preallocated
+    uint8 buffer (valid until the next get_frame call). Each layer is converted once into
+    a premultiplied-alpha sprite, with its opacity already folded in through the mask, and
+    still layers keep their sprite across frames. Blending is done in place and only over
+    the part of the canvas covered by each layer.
+
+    The leading run of still layers (background, images, text that don't move) is flattened
+    once and reused until the set of active layers or their positions change, so only the
+    dynamic layers above it are blended on every frame. When every layer is still, the
+    previous frame is returned as is.
+    """
+
+    def __init__(self, clips, size=None, bg_color=None, use_bgclip=False):
+        VideoClip.__init__(self)
+        self.size = size or clips[0].size
+        self.bg_color = bg_color if bg_color is not None else (0, 0, 0)
+
+        fpss = [c.fps for c in clips if getattr(c, 'fps', None)]
+        self.fps = max(fpss) if fpss else None
+
+        if use_bgclip:
+            self.bg = clips[0]
+            self.clips = clips[1:]
+        else:
+            self.bg = ColorClip(self.size, color=self.bg_color)
+            self.clips = clips
+
+        ends = [c.end for c in self.clips]
+        if None not in ends:
+            self.duration = max(ends)
+            self.end = self.duration
+
+        audioclips = [c.audio for c in self.clips if c.audio is not None]
+        if audioclips:
+            self.audio = CompositeAudioClip(audioclips)
+
+        width, height = self.size
+        self._canvas = np.zeros((height, width, 3), dtype=np.float32)
+        self._output = np.zeros((height, width, 3), dtype=np.uint8)
+        self._sprites = {}  # id(layer) -> (frame id, mask frame id, _Sprite)
+        self._static_canvas = None
+        self._static_key = None  # Identity of the cached still stack
+        self._frame_key = None  # Identity of the last frame, when it was fully still
+
+        self.make_frame = self._compose
+
+    def playing_clips(self, t: float = 0) -> list:
+        return [c for c in self.clips if c.is_playing(t)]
+
+    def _layer_position(self, clip, t: float) -> tuple[int, int]:
+        """Top left corner of a layer on the canvas, with MoviePy's position semantics."""
+        canvas_width, canvas_height = self.size
+        layer_width, layer_height = clip.size
+        pos = clip.pos(t)
+        pos = list(POSITION_SHORTCUTS[pos]) if isinstance(pos, str) else list(pos)
+        if clip.relative_pos:
+            for i, dim in enumerate((canvas_width, canvas_height)):
+                if not isinstance(pos[i], str):
+                    pos[i] = dim * pos[i]
+        if isinstance(pos[0], str):
+            pos[0] = {'left': 0, 'center': (canvas_width - layer_width) / 2, 'right': canvas_width - layer_width}[pos[0]]
+        if isinstance(pos[1], str):
+            pos[1] = {'top': 0, 'center': (canvas_height - layer_height) / 2, 'bottom': canvas_height - layer_height}[pos[1]]
+        return int(pos[0]), int(pos[1])
+
+    def _layer_state(self, clip, t: float):
+        """Frame, mask, position and stillness of a layer at composite time t."""
+        local_t = t - clip.start
+        frame = clip.get_frame(local_t)
+        mask = clip.mask.get_frame(local_t) if clip.mask is not None else None
+        static = _is_static_frame(clip, frame) and (mask is None or _is_static_frame(clip.mask, mask))
+        return frame, mask, self._layer_position(clip, local_t), static
+
+    def _sprite(self, clip, frame: np.ndarray, mask: np.ndarray, static: bool) -> _Sprite:
+        key = id(clip)
+        cached = self._sprites.get(key)
+        height, width = frame.shape[:2]
+        if cached is not None:
+            frame_id, mask_id, sprite = cached
+            if static and frame_id == id(frame) and mask_id == id(mask):
+                return sprite
+            if sprite.premultiplied.shape[:2] != (height, width) or (sprite.inverse_alpha is None) != (mask is None):
+                sprite = None
+        else:
+            sprite = None
+        sprite = sprite or _Sprite(height, width, mask is not None)
+        sprite.fill(frame, mask)
+        self._sprites[key] = (id(frame) if static else None, id(mask) if static else None, sprite)
+        return sprite
+
+    def _blend(self, sprite: _Sprite, x: int, y: int):
+        """Blend a sprite over the canvas in place, only where they overlap."""
+        canvas_height, canvas_width = self._canvas.shape[:2]
+        sprite_height, sprite_width = sprite.premultiplied.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite_width, canvas_width), min(y + sprite_height, canvas_height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        region = self._canvas[y0:y1, x0:x1]
+        source = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        if sprite.inverse_alpha is None:
+            np.copyto(region, sprite.premultiplied[source])
+        else:
+            region *= sprite.inverse_alpha[source]
+            region += sprite.premultiplied[source]
+
+    def _draw(self, layers: list, states: list):
+        for clip, (frame, mask, (x, y), static) in zip(layers, states):
+            self._blend(self._sprite(clip, frame, mask, static), x, y)
+
+    def _compose(self, t: float) -> np.ndarray:
+        layers = [self.bg] + self.playing_clips(t)
+        states = [self._layer_state(clip, t) for clip in layers]
+        static_count = next((i for i, state in enumerate(states) if not state[3]), len(states))
+        key = tuple((id(clip), position, id(frame), id(mask))
+                    for clip, (frame, mask, position, _) in zip(layers[:static_count], states[:static_count]))
+
+        if static_count == len(layers) and key == self._frame_key:
+            return self._output
+
+        if key == self._static_key:
+            np.copyto(self._canvas, self._static_canvas)
+        else:
+            self._draw(layers[:static_count], states[:static_count])
+            if self._static_canvas is None:
+                self._static_canvas = np.empty_like(self._canvas)
+            np.copyto(self._static_canvas, self._canvas)
+            self._static_key = key
+        self._draw(layers[static_count:], states[static_count:])
+
+        np.copyto(self._output, self._canvas, casting='unsafe')
+        self._frame_key = key if static_count == len(layers) else None
+        return self._output
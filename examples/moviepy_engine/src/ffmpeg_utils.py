@@ -0,0 +1,120 @@
+import re
+import logging
+import subprocess as sp
+
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+
+def get_ffmpeg_binary() -> str:
+    """Return the ffmpeg binary MoviePy is configured to use."""
+    return get_setting("FFMPEG_BINARY")
+
+
+def run_ffmpeg(args: list) -> sp.CompletedProcess:
+    """Run ffmpeg with the given arguments and raise if it fails."""
+    cmd = [get_ffmpeg_binary(), "-hide_banner"] + [str(arg) for arg in args]
+    result = sp.run(cmd, stdout=sp.PIPE, stderr=sp.PIPE, stdin=sp.DEVNULL)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.decode(errors='ignore')[-1000:]}")
+    return result
+
+
+def probe_video(video_path: str) -> dict:
+    """Probe duration, resolution, fps and audio presence of a video file."""
+    infos = ffmpeg_parse_infos(video_path)
+    width, height = infos["video_size"]
+    return {
+        "duration": float(infos["duration"]),
+        "width": int(width),
+        "height": int(height),
+        "fps": float(infos["video_fps"]),
+        "has_audio": bool(infos["audio_found"]),
+    }
+
+
+def extract_keyframes(video_path: str) -> list[float]:
+    """
+    Return the sorted presentation times (seconds) of the keyframes in a video.
+    Only keyframes are decoded, so this is much cheaper than a full decode.
+    """
+    result = run_ffmpeg([
+        "-skip_frame", "nokey",
+        "-i", video_path,
+        "-an",
+        "-vf", "showinfo",
+        "-f", "null", "-"
+    ])
+    stderr = result.stderr.decode(errors="ignore")
+    keyframes = sorted({float(match) for match in re.findall(r"pts_time:\s*([0-9.]+)", stderr)})
+    logging.info(f"Found {len(keyframes)} keyframes in {video_path}")
+    return keyframes
+
+
+def center_crop_9_16_box(width: int, height: int) -> tuple[int, int, int, int]:
+    """Return the (x, y, width, height) of the centered 9:16 crop of a frame."""
+    target_width = int(height * 9 / 16)
+    if target_width >= width:
+        return 0, 0, width, height
+    return (width - target_width) // 2, 0, target_width, height
+
+
+def crop_scale_filter(width: int, height: int, target_height: int) -> str:
+    """Build the ffmpeg filter that center-crops to 9:16 and scales to target_height."""
+    x, y, crop_width, crop_height = center_crop_9_16_box(width, height)
+    return f"crop={crop_width}:{crop_height}:{x}:{y},scale=-2:{target_height}"
+
+
+def render_proxy(video_path: str, output_path: str, width: int, height: int, target_height: int, fps: float) -> str:
+    """
+    Pre-render a 9:16 center-crop proxy of a video at target_height.
+    A keyframe is forced every second so later seeks land close to the requested time.
+    """
+    run_ffmpeg([
+        "-y",
+        "-i", video_path,
+        "-vf", crop_scale_filter(width, height, target_height),
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-crf", "20",
+        "-pix_fmt", "yuv420p",
+        "-g", max(1, round(fps)),
+        "-c:a", "aac",
+        "-b:a", "128k",
+        output_path
+    ])
+    logging.info(f"Proxy rendered: {output_path}")
+    return output_path
+
+
+def mux_audio(video_path: str, audio_path: str, output_path: str, subtitle_path: str = None) -> str:
+    """
+    Replace the audio of a video with audio_path, copying the video stream as is.
+    With subtitle_path, the subtitles are added as a soft (selectable) subtitle track.
+    """
+    audio_codec = "aac" if audio_path.lower().endswith(".wav") else "copy"
+    args = ["-y", "-i", video_path, "-i", audio_path]
+    maps = ["-map", "0:v:0", "-map", "1:a:0"]
+    if subtitle_path:
+        args += ["-i", subtitle_path]
+        maps += ["-map", "2:s:0", "-c:s", "mov_text"]
+    run_ffmpeg(args + maps + [
+        "-c:v", "copy",
+        "-c:a", audio_codec,
+        "-movflags", "+faststart",
+        output_path
+    ])
+    logging.info(f"Audio muxed: {output_path}")
+    return output_path
+
+
+def subtitles_filter(subtitle_path: str, fonts_dir: str = None) -> str:
+    """Build the ffmpeg filter that burns an ASS/SRT file into the video with libass."""
+    def escape(path):
+        # Filter arguments: escape backslashes, colons and quotes
+        return path.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+    vf = f"subtitles=filename='{escape(subtitle_path)}'"
+    if fonts_dir:
+        vf += f":fontsdir='{escape(fonts_dir)}'"
+    return vf
+
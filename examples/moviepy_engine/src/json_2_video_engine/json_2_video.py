@@ -1,18 +1,33 @@
 import json
 import os
 import logging
-import uuid
 import math
 
-from moviepy.editor import VideoFileClip, ImageClip, AudioFileClip, TextClip, CompositeVideoClip, CompositeAudioClip, ColorClip, concatenate_audioclips
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.video.VideoClip import ImageClip, ColorClip
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from moviepy.video.fx.resize import resize
+from moviepy.video.fx.rotate import rotate
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from .utils.llm_calls import generate_voice
+from .utils.llm_calls import generate_voice, generate_voice_pcm
+from .utils.json_validation import parse_time_reference
 from .utils.images_generation import search_pexels_images, search_pixabay_images, download_image, generate_image_pollinations
 
 from ..captions.caption_handler import CaptionHandler
+from ..video_readers import CroppedVideoFileClip
+from ..audio_mixer import AudioMixer
+from ..text_rasterizer import text_clip
+from ..ffmpeg_utils import mux_audio, subtitles_filter
+from ..parallel_renderer import render_parallel
+from ..compositor import FastCompositeVideoClip
+from ..ken_burns import KenBurnsClip
+
+from core.utils.workspace import Workspace, scratch_path
+from core.utils.metrics import JobMetrics
+from core.audio.speech_to_text.utils.preprocess import STT_SAMPLE_RATE
 
 class PyJson2Video:
 
@@ -21,22 +36,25 @@ class PyJson2Video:
         self.output_video_path = output_video_path
         self.data = None
         self.video_clips = []
-        self.audio_clips = []
+        self.audio_mixer = AudioMixer()  # Every audio source is premixed once, outside the frame loop
         self.caption_handler = CaptionHandler()
-        self.temp_files = []  # Add this to track all temporary files
+        self.temp_files = []  # Temporary files given in the JSON (is_temp), the job intermediates live in its workspace
 
     async def convert(self):
         try:
-            self._load_json()
-            await self.parse_script()
-            self.parse_videos()
-            await self.parse_images()
-            self.parse_audio()
-            self.parse_text()
-            
-            extra_args = self.parse_extra_args()
-            
-            return await self._create_final_clip(extra_args)
+            # Every intermediate file of the job goes to its scratch workspace, removed on exit
+            job_id = os.path.splitext(os.path.basename(self.output_video_path))[0]
+            with Workspace(job_id=job_id), JobMetrics(job_id):
+                self._load_json()
+                await self.parse_script()
+                self.parse_videos()
+                await self.parse_images()
+                self.parse_audio()
+                self.parse_text()
+
+                extra_args = self.parse_extra_args()
+
+                return await self._create_final_clip(extra_args)
         except Exception as e:
             logger.error(f"An error occurred during conversion: {str(e)}")
             raise
@@ -76,9 +94,9 @@ class PyJson2Video:
                 if not video['video_path'].lower().endswith('.mp4'):
                     raise ValueError(f"Invalid video format. Only MP4 files are supported: {video['video_path']}")
                 
-                clip = VideoFileClip(video['video_path'])
+                # Scale at decode time instead of resizing every frame; the audio goes to the mixer
+                clip = CroppedVideoFileClip(video['video_path'], target_height=int(resolution['height']), audio=False)
                 clip = clip.subclip(float(video['start_time']), float(video['end_time']))
-                clip = clip.resize(height=int(resolution['height']))
                 
                 # Handle position
                 position = video.get('position', [50, 50])  # Default to center if not specified
@@ -97,13 +115,13 @@ class PyJson2Video:
                     clip = clip.set_position('center')
                 
                 clip = clip.set_opacity(float(video['opacity']))
-                clip = clip.volumex(float(video['volume']))
-
 
                 start_time = self._get_time(video, 'start_time')
                 end_time = self._get_time(video, 'end_time')
 
                 clip = clip.set_start(start_time).set_duration(end_time - start_time)
+                self.audio_mixer.add(video['video_path'], start_time, duration=end_time - start_time,
+                                     source_start=float(video['start_time']), volume=float(video['volume']))
 
                 self.video_clips.append(clip)
                 logger.info(f"Video {video.get('video_path')} added to video clips, start time: {start_time}, end time: {end_time}")
@@ -138,15 +156,11 @@ class PyJson2Video:
                     
                     if image_urls:
                         image_source = download_image(image_urls[0])
-                        if image_source:
-                            self.temp_files.append(image_source)  # Track downloaded image
                     else:
                         logger.error(f"No images found for prompt: {query}")
                         continue
                 elif source_type == 'url':
                     image_source = download_image(image['source_content'])
-                    if image_source:
-                        self.temp_files.append(image_source)  # Track downloaded image
 
                 # Create and process the image clip
                 clip = ImageClip(image_source)
@@ -167,10 +181,25 @@ class PyJson2Video:
                 height_ratio = (target_height / clip.h) * 1.1  # 10% zoom
                 scale_factor = min(width_ratio, height_ratio)
 
+                start_time = self._get_time(image, 'start_time')
+                end_time = self._get_time(image, 'end_time')
+
                 # Resize the clip with zoom
                 new_width = math.ceil(clip.w * scale_factor)
                 new_height = math.ceil(clip.h * scale_factor)
-                clip = clip.resize(width=new_width, height=new_height)
+                ken_burns = image.get('ken_burns')
+                if ken_burns:
+                    # Zoom/pan over the image, scaled once instead of on every frame
+                    clip = KenBurnsClip(
+                        clip.img, (new_width, new_height), end_time - start_time,
+                        zoom_start=float(ken_burns.get('zoom_start', 1.0)),
+                        zoom_end=float(ken_burns.get('zoom_end', 1.2)),
+                        pan_start=[float(value) / 100 for value in ken_burns.get('pan_start', [50, 50])],
+                        pan_end=[float(value) / 100 for value in ken_burns.get('pan_end', [50, 50])],
+                        easing=ken_burns.get('easing', 'linear')
+                    )
+                else:
+                    clip = resize(clip, width=new_width, height=new_height)
                 
                 # Handle position
                 position = image.get('position', [50, 50]) # Default to center if not specified
@@ -190,11 +219,8 @@ class PyJson2Video:
 
                 clip = clip.set_opacity(float(image.get('opacity', 1.0)))
                 if 'rotation' in image:
-                    clip = clip.rotate(float(image.get('rotation', 0)))
-                
-                start_time = self._get_time(image, 'start_time')
-                end_time = self._get_time(image, 'end_time')
-                
+                    clip = rotate(clip, float(image.get('rotation', 0)))
+
                 clip = clip.set_start(start_time).set_duration(end_time - start_time)
 
                 self.video_clips.append(clip)
@@ -210,17 +236,14 @@ class PyJson2Video:
                 if audio.get('is_temp', False):
                     self.temp_files.append(audio['audio_path'])
                 
-                clip = AudioFileClip(audio['audio_path'])
-                #clip = clip.subclip(float(audio['start_time']), float(audio['end_time']))
-                clip = clip.volumex(float(audio['volume']))
-
                 start_time = self._get_time(audio, 'start_time')
                 end_time = self._get_time(audio, 'end_time')
-                
-                clip = clip.set_start(start_time).set_duration(end_time - start_time)
-                
-                self.audio_clips.append(clip)
-                logger.info(f"Audio {audio.get('audio_path')} added to audio clips, start time: {start_time}, end time: {end_time}")
+
+                # Background audio is music: ducked under the narration
+                self.audio_mixer.add(audio['audio_path'], start_time, duration=end_time - start_time,
+                                     volume=float(audio['volume']), fade_in=float(audio.get('fade_in', 0)),
+                                     fade_out=float(audio.get('fade_out', 0)), role=audio.get('role', 'music'))
+                logger.info(f"Audio {audio.get('audio_path')} added to the audio mix, start time: {start_time}, end time: {end_time}")
             except Exception as e:
                 logger.error(f"Error processing audio {audio.get('audio_path')}: {str(e)}")
                 raise
@@ -230,13 +253,21 @@ class PyJson2Video:
         max_width, max_height = resolution['width'], resolution['height']
 
         last_end_time = 0  # Keep track of the last end time
+        # Voices stay in memory as PCM unless intermediate files are requested (for debugging)
+        write_intermediates = self.data.get('extra_args', {}).get('write_intermediates', False)
 
         for index, script in enumerate(self.data.get('script', [])):
             try:
-                audio_path = await generate_voice(script['text'])
-                self.temp_files.append(audio_path)  # Track generated voice audio
-                script_clip = AudioFileClip(audio_path)
+                if write_intermediates:
+                    audio_path = await generate_voice(script['text'])
+                    # Read from the file header, the mixer decodes the voice once when the mix is rendered
+                    clip_duration = float(ffmpeg_parse_infos(audio_path)['duration'])
+                else:
+                    audio_path = None
+                    samples, sample_rate = await generate_voice_pcm(script['text'])
+                    clip_duration = len(samples) / sample_rate
                 
+
                 # Determine start time based on the previous end_time script item
                 if index > 0:
                     start_time = self._get_time(self.data['script'][index-1], 'end_time')
@@ -247,7 +278,6 @@ class PyJson2Video:
                 voice_start_time = start_time + script.get('voice_start_time', 0)
                 post_pause_duration = script.get('post_pause_duration', 0)
 
-                clip_duration = script_clip.duration
                 end_time = voice_start_time + clip_duration + post_pause_duration
                 voice_end_time = voice_start_time + clip_duration
                 
@@ -257,11 +287,11 @@ class PyJson2Video:
                 self.data['script'][index]['voice_end_time'] = voice_end_time
                 self.data['script'][index]['end_time'] = end_time
 
-                # Set the clip's start time and duration
-                script_clip = script_clip.set_start(voice_start_time).set_duration(clip_duration)
-
-                self.audio_clips.append(script_clip)
-                logger.info(f"Audio {audio_path} added to audio clips, start time: {start_time}, end time: {end_time}")
+                if write_intermediates:
+                    self.audio_mixer.add(audio_path, voice_start_time, duration=clip_duration, role="voice")
+                else:
+                    self.audio_mixer.add_pcm(samples, sample_rate, voice_start_time, duration=clip_duration, role="voice")
+                logger.info(f"Voice {audio_path or 'PCM'} added to the audio mix, start time: {start_time}, end time: {end_time}")
                 # Update the last end time
                 last_end_time = end_time
 
@@ -270,7 +300,7 @@ class PyJson2Video:
                 raise
 
         # After processing all scripts, update the total duration of the video
-        self.total_duration = max(clip.end for clip in self.audio_clips + self.video_clips)
+        self.total_duration = max([clip.end for clip in self.video_clips] + [self.audio_mixer.duration])
 
     def parse_text(self):
         resolution = self.data.get('extra_args', {}).get('resolution', {'width': 1920, 'height': 1080})
@@ -287,20 +317,17 @@ class PyJson2Video:
                 shadow_color = text.get('shadow_color', 'black')
                 shadow_offset = fontsize / 15
 
-                clip = TextClip(
+                # Text and its shadow in a single in-process rasterization
+                composite_clip = text_clip(
                     content,
-                    size=size,
-                    fontsize=fontsize,
+                    width=size[0],
+                    font_size=fontsize,
                     font=font,
                     color=color,
-                    method='caption',
-                    align='center'
+                    align='center',
+                    shadow_color=shadow_color,
+                    shadow_offset=shadow_offset
                 )
-                shadow_clip = TextClip(content, fontsize=fontsize, font=font, color=shadow_color, size=size, method='caption')
-                shadow_clip = shadow_clip.set_position((shadow_offset, shadow_offset))
-                
-                # Composite all layers
-                composite_clip = CompositeVideoClip([shadow_clip, clip])
                 
                 # Handle position
                 position = text.get('position', [50, 50])  # Default to center if not specified
@@ -310,7 +337,7 @@ class PyJson2Video:
                     rel_y = position[1] / 100 * max_height
                         
                     # Adjust position to center the text
-                    center_x = rel_x - clip.w / 2
+                    center_x = rel_x - composite_clip.w / 2
                     center_y = rel_y - composite_clip.h / 2
                         
                     composite_clip = composite_clip.set_position((center_x, center_y))
@@ -338,7 +365,6 @@ class PyJson2Video:
             raise
 
     async def _create_final_clip(self, extra_args:dict) -> str:
-        temp_files = []  # Track temporary files for cleanup
         try:
             resolution = extra_args.get('resolution', {'width': 1920, 'height': 1080})
             background_color = extra_args.get('background_color', [249, 249, 249])
@@ -354,8 +380,8 @@ class PyJson2Video:
             # Create a blank background clip if no video clips exist
             if not self.video_clips:
                 logger.warning("No video clips found, creating blank background clip")
-                # Calculate duration from audio clips or use default
-                duration = max([clip.end for clip in self.audio_clips]) if self.audio_clips else 10
+                # Calculate duration from the audio mix or use default
+                duration = self.audio_mixer.duration or 10
                 blank_clip = ColorClip(
                     size=(resolution['width'], resolution['height']),
                     color=background_color,
@@ -364,50 +390,75 @@ class PyJson2Video:
                 self.video_clips.append(blank_clip)
             
             # Process captions for all script audio clips
+            # mode: 'layers' (composited clips), 'burn' (ASS burned in by the encoder) or 'soft' (subtitle track)
+            captions_mode = captions_settings.get('mode', 'layers')
+            ffmpeg_params = None
+            soft_subtitles_path = None
             if captions_settings.get('enabled', False):
-                script_audio_clips = [clip for clip in self.audio_clips if hasattr(clip, 'filename')]
-                if script_audio_clips:
-                    # Concatenate all audio clips
-                    final_audio = concatenate_audioclips(script_audio_clips)
-                    
-                    # Save the concatenated audio temporarily
-                    temp_audio_path = os.path.join(os.path.dirname(__file__), 'assets', f"temp_combined_audio_{uuid.uuid4()}.wav")
-                    temp_files.append(temp_audio_path)  # Track for cleanup
-                    final_audio.write_audiofile(temp_audio_path)
-                    
+                if any(track.role == "voice" for track in self.audio_mixer.tracks):
+                    # Narration only, at its timeline position, at the 16 kHz mono the transcription uses.
+                    # Passed to the transcription in memory, as a WAV file only when debugging.
+                    if extra_args.get('write_intermediates', False):
+                        voice_audio = scratch_path("temp_combined_audio_", ".wav")
+                        self.audio_mixer.render(voice_audio, roles=["voice"], fps=STT_SAMPLE_RATE, nchannels=1)
+                    else:
+                        voice_audio = self.audio_mixer.render_pcm(roles=["voice"], fps=STT_SAMPLE_RATE, nchannels=1)[:, 0]
+
                     # Generate captions
-                    subtitles_path, subtitle_clips = await self.caption_handler.process(
-                        temp_audio_path,
-                        captions_settings.get('color', 'white'),
-                        captions_settings.get('background_color', 'black'),
-                        captions_settings.get('font_size', resolution['height'] * 0.05),
-                        captions_settings.get('font', 'LEMONMILK-Bold.otf'),
-                        resolution['width']
-                    )
-                    if subtitles_path:
-                        temp_files.append(subtitles_path)  # Track for cleanup
-                    
-                    self.video_clips.extend(subtitle_clips)
+                    if captions_mode == 'layers':
+                        subtitles_path, subtitle_clips = await self.caption_handler.process(
+                            voice_audio,
+                            captions_settings.get('color', 'white'),
+                            captions_settings.get('background_color', 'black'),
+                            captions_settings.get('font_size', resolution['height'] * 0.05),
+                            captions_settings.get('font', 'LEMONMILK-Bold.otf'),
+                            resolution['width'],
+                            save_subtitles=extra_args.get('write_intermediates', False)
+                        )
+                        self.video_clips.extend(subtitle_clips)
+                    elif captions_mode == 'burn':
+                        subtitles_path = await self.caption_handler.process_ass(
+                            voice_audio,
+                            captions_settings.get('color', 'white'),
+                            captions_settings.get('background_color', 'black'),
+                            captions_settings.get('font_size', resolution['height'] * 0.05),
+                            captions_settings.get('font', 'LEMONMILK-Bold.otf'),
+                            resolution['width'],
+                            resolution['height'],
+                            highlight_color=captions_settings.get('highlight_color'),
+                            karaoke=captions_settings.get('karaoke', True)
+                        )
+                        ffmpeg_params = ['-vf', subtitles_filter(subtitles_path, self.caption_handler.fonts_dir)]
+                    elif captions_mode == 'soft':
+                        subtitles_path = await self.caption_handler.subtitle_generator.generate_subtitles(voice_audio)
+                        soft_subtitles_path = subtitles_path
+                    else:
+                        raise ValueError(f"Invalid captions mode: {captions_mode}")
             
-            final_clip = CompositeVideoClip(
+            final_clip = FastCompositeVideoClip(
                 self.video_clips,
                 size=(resolution['width'], resolution['height']),
                 bg_color=background_color
             )
             
-            # Add audio to the final clip
-            if self.audio_clips:
-                final_audio = CompositeAudioClip(self.audio_clips)
-                final_clip = final_clip.set_audio(final_audio)
-            
-            # Write the final video file
-            final_clip.write_videofile(
-                self.output_video_path,
+            # Write the video only, then mux the premixed audio track
+            has_audio = bool(self.audio_mixer.tracks)
+            video_only_path = scratch_path("temp_video_", ".mp4") if has_audio else self.output_video_path
+            render_parallel(
+                final_clip,
+                video_only_path,
                 fps=30,
                 codec='libx264',
                 preset='veryfast',
-                audio_codec='aac'
+                ffmpeg_params=ffmpeg_params,
+                audio=False,
+                # Slideshow-style timelines repeat most frames: encode them once, as a VFR stream
+                drop_duplicates=extra_args.get('drop_duplicate_frames', False)
             )
+            if has_audio:
+                mix_path = scratch_path("temp_mix_", ".m4a")
+                self.audio_mixer.render(mix_path, duration=final_clip.duration)
+                mux_audio(video_only_path, mix_path, self.output_video_path, subtitle_path=soft_subtitles_path)
 
             # Close all clips to free up resources
             final_clip.close()
@@ -417,22 +468,11 @@ class PyJson2Video:
             # Close all source clips
             for clip in self.video_clips:
                 clip.close()
-            for clip in self.audio_clips:
-                clip.close()
 
             return self.output_video_path
         except Exception as e:
             logger.error(f"Error creating final clip: {str(e)}")
             raise
-        finally:
-            # Clean up all temporary files
-            for temp_file in temp_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
-                        logger.debug(f"Removed temporary file: {temp_file}")
-                except OSError as e:
-                    logger.warning(f"Failed to remove temporary file {temp_file}: {e}")
     
     def _get_time(self, asset, time_key: str) -> float:
         time_value = asset.get(time_key)
@@ -441,11 +481,11 @@ class PyJson2Video:
             return float(time_value)
 
         if isinstance(time_value, str):
-            time_parts = time_value.split('.')
-            if len(time_parts) != 2:
+            time_reference = parse_time_reference(time_value)
+            if time_reference is None:
                 raise ValueError(f"Invalid {time_key}: {time_value}")
 
-            time_id, time_type = time_parts
+            time_id, time_type = time_reference
             item = next((item for item in self.data.get('script', []) if item['_id'] == time_id), None)
             if item:
                 if time_type == 'voice_start_time':
@@ -0,0 +1,126 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.audio_mixer import AudioMixer
+from src.ffmpeg_utils import run_ffmpeg
+from core.utils.workspace import Workspace, WorkspaceQuotaError, scratch_path
+
+FPS = 1000
+VOICE_LEVEL = 0.5
+MUSIC_LEVEL = 0.4
+
+
+def constant_wav(path, level, duration):
+    """Mono float WAV at FPS whose every sample is level, so mixes can be checked exactly."""
+    run_ffmpeg(["-y", "-f", "lavfi", "-i", f"aevalsrc={level}:s={FPS}:d={duration}", "-c:a", "pcm_f32le", path])
+    return path
+
+
+def read_wav(path):
+    result = run_ffmpeg(["-i", path, "-f", "f32le", "-ac", "1", "-ar", FPS, "-"])
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def render_mix(mixer, tmp_path, **kwargs):
+    path = str(tmp_path / "mix.wav")
+    mixer.render(path, codec="pcm_f32le", nchannels=1, **kwargs)
+    return read_wav(path)
+
+
+def expected_music_gain(times, voice_start=1.0, voice_end=2.0, duck_volume=0.3, attack=0.2, release=0.4):
+    """Music gain: ramps down to duck_volume over attack before the voice, back up over release after it."""
+    ramp_in = np.clip((times - (voice_start - attack)) / attack, 0, 1)
+    ramp_out = np.clip(((voice_end + release) - times) / release, 0, 1)
+    return 1 - (1 - duck_volume) * np.minimum(ramp_in, ramp_out)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return constant_wav(str(tmp_path / "music.wav"), MUSIC_LEVEL, 3), constant_wav(str(tmp_path / "voice.wav"), VOICE_LEVEL, 1)
+
+
+def make_mixer(sources, block_seconds):
+    music_path, voice_path = sources
+    mixer = AudioMixer(fps=FPS, nchannels=1, block_seconds=block_seconds)
+    mixer.add(music_path, start=0, role="music")
+    mixer.add(voice_path, start=1.0, role="voice")
+    return mixer
+
+
+@pytest.mark.parametrize("block_seconds", [0.25, 0.333, 10])
+def test_voice_and_ducked_music(sources, tmp_path, block_seconds):
+    mix = render_mix(make_mixer(sources, block_seconds), tmp_path, duck_volume=0.3, duck_attack=0.2, duck_release=0.4)
+    times = np.arange(3 * FPS) / FPS
+    voice = np.where((times >= 1.0) & (times < 2.0), VOICE_LEVEL, 0)
+    expected = voice + MUSIC_LEVEL * expected_music_gain(times)
+
+    assert len(mix) == 3 * FPS
+    np.testing.assert_allclose(mix, expected, atol=1e-5)
+    # Full volume far from the voice, ducked gain under it
+    assert mix[int(0.5 * FPS)] == pytest.approx(MUSIC_LEVEL)
+    assert mix[int(1.5 * FPS)] == pytest.approx(VOICE_LEVEL + 0.3 * MUSIC_LEVEL)
+    assert mix[int(2.2 * FPS)] == pytest.approx(MUSIC_LEVEL * 0.65)  # Half way through the release
+    assert mix[int(2.5 * FPS)] == pytest.approx(MUSIC_LEVEL)
+
+
+def test_roles_and_no_ducking(sources, tmp_path):
+    mixer = make_mixer(sources, 0.25)
+    voice_only = render_mix(mixer, tmp_path, roles=["voice"])
+    assert voice_only[int(0.5 * FPS)] == 0
+    assert voice_only[int(1.5 * FPS)] == pytest.approx(VOICE_LEVEL)
+
+    unducked = render_mix(mixer, tmp_path, duck_music=False)
+    assert unducked[int(1.5 * FPS)] == pytest.approx(VOICE_LEVEL + MUSIC_LEVEL)
+
+
+def test_volume_fades_and_duration(tmp_path):
+    mixer = AudioMixer(fps=FPS, nchannels=1, block_seconds=0.3)
+    mixer.add(constant_wav(str(tmp_path / "ones.wav"), 1, 2), start=0.5, volume=0.5, fade_in=0.5, fade_out=0.5)
+    assert mixer.duration == pytest.approx(2.5)
+
+    mix = render_mix(mixer, tmp_path)
+    assert mix[int(0.25 * FPS)] == 0  # Before the track
+    assert mix[int(0.75 * FPS)] == pytest.approx(0.25)  # Half way through the fade in
+    assert mix[int(1.5 * FPS)] == pytest.approx(0.5)
+    assert mix[int(2.25 * FPS)] == pytest.approx(0.25, abs=1e-3)  # Half way through the fade out
+
+
+def test_file_track_from_source_start(tmp_path):
+    # A source whose level steps from 0.2 to 0.6 at 1s
+    path = str(tmp_path / "steps.wav")
+    run_ffmpeg(["-y", "-f", "lavfi", "-i", f"aevalsrc='if(lt(t,1),0.2,0.6)':s={FPS}:d=2", "-c:a", "pcm_f32le", path])
+
+    mixer = AudioMixer(fps=FPS, nchannels=1, block_seconds=0.25)
+    track = mixer.add(path, start=0.5, source_start=1.0)
+    assert track.duration == pytest.approx(1.0)
+
+    mix = render_mix(mixer, tmp_path)
+    assert len(mix) == int(1.5 * FPS)
+    assert np.all(mix[:int(0.5 * FPS)] == 0)
+    np.testing.assert_allclose(mix[int(0.5 * FPS) + 5:-5], 0.6, atol=1e-3)
+
+
+def test_render_checks_the_workspace_quota(sources, tmp_path):
+    # 3s of float PCM at FPS is 12 KB: over a 10 KB quota once written
+    with Workspace(root=str(tmp_path / "workspaces"), quota_bytes=10000):
+        with pytest.raises(WorkspaceQuotaError):
+            make_mixer(sources, 0.25).render(scratch_path("mix_", ".wav"), codec="pcm_f32le", nchannels=1)
+
+
+def test_render_pcm_with_voice_in_memory(sources):
+    music_path, _ = sources
+    mixer = AudioMixer(fps=FPS, nchannels=1, block_seconds=0.25)
+    mixer.add(music_path, start=0, role="music")
+    mixer.add_pcm(np.full(FPS, VOICE_LEVEL), FPS, start=1.0, role="voice")
+
+    mix = mixer.render_pcm(duck_volume=0.3, duck_attack=0.2, duck_release=0.4)
+    times = np.arange(3 * FPS) / FPS
+    voice = np.where((times >= 1.0) & (times < 2.0), VOICE_LEVEL, 0)
+    assert mix.shape == (3 * FPS, 1)
+    np.testing.assert_allclose(mix[:, 0], voice + MUSIC_LEVEL * expected_music_gain(times), atol=1e-5)
+    assert mix[int(1.5 * FPS), 0] == pytest.approx(VOICE_LEVEL + 0.3 * MUSIC_LEVEL)
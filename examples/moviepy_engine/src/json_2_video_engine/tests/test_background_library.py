@@ -0,0 +1,81 @@
+import sys
+import os
+import random
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.background_library import BackgroundLibrary
+from src.ffmpeg_utils import run_ffmpeg
+
+
+def make_video(path, duration=4, size="320x240", fps=10):
+    """Test pattern video with a keyframe every 10 frames."""
+    run_ffmpeg(["-y", "-f", "lavfi", "-i", f"testsrc=duration={duration}:size={size}:rate={fps}",
+                "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-g", 10, path])
+    return path
+
+
+def make_library(tmp_path, **kwargs):
+    return BackgroundLibrary(str(tmp_path / "library"), **kwargs)
+
+
+def test_register_builds_proxy_and_keyframes(tmp_path):
+    video_path = make_video(str(tmp_path / "clip.mp4"))
+    library = make_library(tmp_path)
+    entry = library.register(video_path)
+
+    assert entry["video_id"] == "clip"
+    assert entry["duration"] == pytest.approx(4, abs=0.2)
+    assert (entry["width"], entry["height"]) == (320, 240)
+    assert entry["proxy_path"].endswith("clip_9x16_240p.mp4") and os.path.exists(entry["proxy_path"])
+    # The proxy has a keyframe every second
+    assert library.get_keyframes("clip") == pytest.approx([0, 1, 2, 3], abs=0.05)
+    assert library.lookup(entry["proxy_path"])["video_id"] == "clip"
+
+
+def test_register_again_refreshes_last_used(tmp_path):
+    video_path = make_video(str(tmp_path / "clip.mp4"))
+    library = make_library(tmp_path, build_proxies=False)
+    first = library.register(video_path)
+    second = library.register(video_path)
+    assert second["added_at"] == first["added_at"]
+    assert library.get("clip")["last_used_at"] > first["last_used_at"]
+
+
+def test_pick_window_snaps_to_keyframes(tmp_path):
+    video_path = make_video(str(tmp_path / "clip.mp4"))
+    library = make_library(tmp_path)
+    entry = library.register(video_path)
+    keyframes = library.get_keyframes("clip")
+
+    rng = random.Random(0)
+    for _ in range(20):
+        path, start_time = library.pick_window("clip", 1.5, rng=rng)
+        assert path == entry["proxy_path"]
+        assert start_time in keyframes
+        assert start_time + 1.5 <= entry["duration"]
+
+    # Cuts right after every keyframe but the first one: only a window starting at 0 is left
+    _, start_time = library.pick_window("clip", 1.5, rng=random.Random(1), avoid_cuts=[1.2, 2.2, 3.2], attempts=50)
+    assert start_time == 0
+
+    with pytest.raises(ValueError):
+        library.pick_window("clip", 10)
+
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    paths = [make_video(str(tmp_path / f"clip{i}.mp4")) for i in range(3)]
+    size = os.path.getsize(paths[0])
+    library = make_library(tmp_path, build_proxies=False, quota_bytes=int(size * 2.5))
+
+    library.register(paths[0])
+    library.register(paths[1])
+    library.register(paths[0])  # clip0 used again: clip1 is now the least recently used
+    library.register(paths[2])
+
+    assert library.get("clip1") is None and not os.path.exists(paths[1])
+    assert library.get("clip0") is not None and library.get("clip2") is not None
+    assert library.get_keyframes("clip1") == []
+    assert library.disk_usage() <= library.quota_bytes
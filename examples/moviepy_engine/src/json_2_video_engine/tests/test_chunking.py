@@ -0,0 +1,73 @@
+import sys
+import os
+import numpy as np
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../../')))
+
+from core.audio.speech_to_text.utils.chunking import find_split_points, merge_chunk_words, transcribe_chunked
+
+SAMPLE_RATE = 16000
+
+
+def word(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_merge_offsets_words():
+    merged = merge_chunk_words([[word(0.5, 1.0, "a")], [word(0.5, 1.0, "b")]], [0.0, 9.5], [0.0, 10.0, float("inf")])
+    assert merged == [word(0.5, 1.0, "a"), word(10.0, 10.5, "b")]
+
+
+def test_merge_keeps_overlap_words_once():
+    # Chunks split at 10s with 0.5s of overlap: "boundary" (9.8-10.1) is heard by both chunks
+    first = [word(9.0, 9.6, "before"), word(9.8, 10.1, "boundary"), word(10.2, 10.4, "after")]
+    second = [word(0.3, 0.6, "boundary"), word(0.7, 0.9, "after"), word(1.0, 1.5, "next")]
+    merged = merge_chunk_words([first, second], [0.0, 9.5], [0.0, 10.0, float("inf")])
+    assert [w["text"] for w in merged] == ["before", "boundary", "after", "next"]
+    # Each word comes from the chunk that holds its midpoint
+    assert merged[1] == word(9.8, 10.1, "boundary")
+    assert merged[2] == word(10.2, 10.4, "after")
+
+
+def test_merge_sorts_words_and_keeps_extra_fields():
+    first = [{"start": 1.0, "end": 2.0, "text": "b", "confidence": 0.9}, word(0.0, 0.5, "a")]
+    merged = merge_chunk_words([first], [0.0], [0.0, float("inf")])
+    assert [w["text"] for w in merged] == ["a", "b"]
+    assert merged[1]["confidence"] == 0.9
+
+
+def test_split_points_land_in_silences():
+    # Noise with a 0.5s silence centered at 55s, chunked every 60s over 100s
+    samples = np.random.default_rng(0).uniform(-0.5, 0.5, 100 * SAMPLE_RATE).astype(np.float32)
+    samples[int(54.75 * SAMPLE_RATE):int(55.25 * SAMPLE_RATE)] = 0
+    split_points = find_split_points(samples, SAMPLE_RATE, chunk_seconds=60, search_seconds=10)
+    assert len(split_points) == 1
+    assert abs(split_points[0] - 55.0) < 0.3
+
+
+def test_transcribe_chunked_merges_chunks():
+    samples = np.random.default_rng(0).uniform(-0.5, 0.5, 130 * SAMPLE_RATE).astype(np.float32)
+    uploads = []
+
+    def transcribe(upload):
+        uploads.append(upload)
+        # Every chunk hears a word 1s after its start
+        return [word(1.0, 1.4, f"chunk{len(uploads)}")]
+
+    words = transcribe_chunked(transcribe, samples, chunk_seconds=60, max_workers=1)
+    assert len(uploads) == 3
+    assert all(name.startswith(f"chunk_{i}_") for i, (name, _) in enumerate(uploads))
+    assert [w["text"] for w in words] == ["chunk1", "chunk2", "chunk3"]
+    assert words[0]["start"] == 1.0
+    # Split in the 10s before each 60s boundary, chunks start 0.5s (overlap) before their split
+    assert 50.5 <= words[1]["start"] <= 60.5
+    assert words[1]["start"] + 50 <= words[2]["start"] <= words[1]["start"] + 60
+
+
+def test_short_audio_is_sent_whole():
+    samples = np.zeros(5 * SAMPLE_RATE, dtype=np.float32)
+    uploads = []
+    words = transcribe_chunked(lambda upload: uploads.append(upload) or [word(0.0, 1.0, "whole")], samples)
+    assert len(uploads) == 1
+    assert words == [word(0.0, 1.0, "whole")]
@@ -0,0 +1,74 @@
+import sys
+import os
+import numpy as np
+from moviepy.video.VideoClip import VideoClip, ImageClip, ColorClip
+from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.compositor import FastCompositeVideoClip
+
+SIZE = (64, 48)
+TIMES = [0, 0.25, 0.5, 0.75, 1.0, 1.5, 1.99]
+
+
+def gradient_image(width, height, seed):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def moving_clip():
+    """A clip whose frames change over time, like a video layer."""
+    base = gradient_image(24, 16, 3)
+    clip = VideoClip(lambda t: np.roll(base, int(t * 10), axis=1), duration=2)
+    return clip.set_position(lambda t: (int(-8 + 40 * t), int(5 + 10 * t)))
+
+
+def layers():
+    background = ImageClip(gradient_image(*SIZE, 0)).set_duration(2)
+    # Partly off-canvas, with an opacity mask
+    overlay = ImageClip(gradient_image(30, 20, 1)).set_duration(2).set_position((50, -6)).set_opacity(0.6)
+    # Only plays in the middle of the composite
+    late = ColorClip((10, 10), color=(200, 30, 90)).set_duration(0.8).set_start(0.6).set_position(("center", "bottom"))
+    # Per-pixel transparency
+    alpha = np.linspace(0, 1, 20 * 12).reshape(12, 20)
+    masked = ImageClip(gradient_image(20, 12, 2)).set_duration(2).set_position((0.1, 0.5), relative=True)
+    masked = masked.set_mask(ImageClip(alpha, ismask=True).set_duration(2))
+    return [background, overlay, moving_clip(), late, masked]
+
+
+def assert_same_frames(fast, reference):
+    for t in TIMES:
+        expected = reference.get_frame(t).astype(np.int16)
+        actual = fast.get_frame(t).astype(np.int16)
+        assert actual.shape == expected.shape
+        # Blending order of floating point operations differs, rounding to uint8 may differ by one
+        assert np.abs(actual - expected).max() <= 1, f"frames differ at t={t}"
+
+
+def test_matches_composite_video_clip():
+    assert_same_frames(FastCompositeVideoClip(layers()), CompositeVideoClip(layers()))
+
+
+def test_matches_with_background_color():
+    clips = layers()[1:]
+    assert_same_frames(FastCompositeVideoClip(clips, size=SIZE, bg_color=(10, 20, 30)),
+                       CompositeVideoClip(layers()[1:], size=SIZE, bg_color=(10, 20, 30)))
+
+
+def test_matches_with_bgclip():
+    assert_same_frames(FastCompositeVideoClip(layers(), use_bgclip=True), CompositeVideoClip(layers(), use_bgclip=True))
+
+
+def test_still_frames_are_reused():
+    still = FastCompositeVideoClip([ImageClip(gradient_image(*SIZE, 0)).set_duration(2),
+                                    ImageClip(gradient_image(8, 8, 1)).set_duration(2).set_position((4, 4))])
+    first = still.get_frame(0).copy()
+    assert still.get_frame(1) is still.get_frame(1.5)
+    assert np.array_equal(still.get_frame(1), first)
+
+
+def test_duration_and_size():
+    fast = FastCompositeVideoClip(layers())
+    assert fast.duration == 2
+    assert fast.size == SIZE
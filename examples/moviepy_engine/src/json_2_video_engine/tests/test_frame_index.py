@@ -0,0 +1,128 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../../')))
+
+from core.video.embeddings import frame_index
+from core.video.embeddings.frame_index import FrameFeatureIndex, FEATURE_DIM, HASH_BYTES, BRIGHTNESS, MOTION, _append_rows
+
+
+def synthetic_video(seconds, motion, brightness=0.5, hash_byte=0):
+    """Per-second features and hashes of a fake video with the given motion per second."""
+    features = np.zeros((seconds, FEATURE_DIM), dtype=np.float32)
+    features[:, BRIGHTNESS] = brightness
+    features[:, MOTION] = motion
+    hashes = np.full((seconds, HASH_BYTES), hash_byte, dtype=np.uint8)
+    return features, hashes
+
+
+@pytest.fixture
+def videos(monkeypatch):
+    """Videos by path, served to the index instead of decoding files."""
+    videos = {}
+    monkeypatch.setattr(frame_index, "extract_second_features", lambda path, samples_per_second=4: videos[path])
+    return videos
+
+
+def test_windows_never_cross_videos(tmp_path, videos):
+    videos["a.mp4"] = synthetic_video(3, motion=[0, 0, 1])
+    videos["b.mp4"] = synthetic_video(3, motion=[1, 0, 0])
+    index = FrameFeatureIndex(str(tmp_path / "features"))
+    index.add_video("a.mp4")
+    index.add_video("b.mp4")
+
+    windows, video_rows, starts = index.window_features(2)
+    assert video_rows.tolist() == [0, 0, 1, 1]
+    assert starts.tolist() == [0, 1, 0, 1]
+    # The end of a and the start of b are the most dynamic seconds, but never in the same window
+    assert windows[:, MOTION].tolist() == [0, 0.5, 0.5, 0]
+    assert len(index.window_features(4)[0]) == 0
+
+    best = index.most_dynamic(2, top_k=2)
+    assert {(result["video_id"], result["start"]) for result in best} == {("a", 1), ("b", 0)}
+
+
+def test_add_video_appends_rows(tmp_path, videos):
+    index_dir = str(tmp_path / "features")
+    index = FrameFeatureIndex(index_dir)
+    for i in range(12):
+        videos[f"{i}.mp4"] = synthetic_video(i + 1, motion=i, hash_byte=i)
+        index.add_video(f"{i}.mp4")
+
+    reloaded = FrameFeatureIndex(index_dir)
+    assert len(reloaded.features) == len(reloaded.hashes) == sum(range(1, 13))
+    for i, video in enumerate(reloaded.videos):
+        rows = slice(video["row_start"], video["row_start"] + video["row_count"])
+        assert video["row_count"] == i + 1
+        assert np.all(reloaded.features[rows, MOTION] == i) and np.all(reloaded.hashes[rows] == i)
+
+
+def test_append_rows_keeps_a_valid_npy(tmp_path):
+    path = str(tmp_path / "rows.npy")
+    _append_rows(path, np.zeros((9, 2), dtype=np.float32))
+    _append_rows(path, np.ones((10 ** 6, 2), dtype=np.float32))
+    rows = np.load(path)
+    assert rows.shape == (10 ** 6 + 9, 2)
+    assert rows[:9].sum() == 0 and rows[9:].min() == 1
+
+    with pytest.raises(ValueError):
+        _append_rows(path, np.zeros((1, 3), dtype=np.float32))
+
+
+def test_remove_video_shifts_rows(tmp_path, videos):
+    videos["a.mp4"] = synthetic_video(2, motion=1)
+    videos["b.mp4"] = synthetic_video(3, motion=2)
+    videos["c.mp4"] = synthetic_video(4, motion=3)
+    index = FrameFeatureIndex(str(tmp_path / "features"))
+    for path in ("a.mp4", "b.mp4", "c.mp4"):
+        index.add_video(path)
+    assert len(index.window_features(2)[0]) == 1 + 2 + 3
+
+    index.remove_video("b")
+    assert [(video["video_id"], video["row_start"], video["row_count"]) for video in index.videos] == [("a", 0, 2), ("c", 2, 4)]
+    assert index.features[:, MOTION].tolist() == [1, 1, 3, 3, 3, 3]
+    # Cached windows are dropped with the rows they came from
+    assert len(index.window_features(2)[0]) == 1 + 3
+
+    # Re-adding a video replaces its rows
+    videos["a.mp4"] = synthetic_video(3, motion=4)
+    index.add_video("a.mp4")
+    assert [(video["video_id"], video["row_start"]) for video in index.videos] == [("c", 0), ("a", 4)]
+    assert index.features[:, MOTION].tolist() == [3, 3, 3, 3, 4, 4, 4]
+
+
+def test_most_similar(tmp_path, videos):
+    videos["a.mp4"] = synthetic_video(2, motion=0, brightness=0.1)
+    videos["b.mp4"] = synthetic_video(2, motion=0, brightness=0.15)
+    videos["c.mp4"] = synthetic_video(2, motion=0, brightness=0.9)
+    index = FrameFeatureIndex(str(tmp_path / "features"))
+    for path in ("a.mp4", "b.mp4", "c.mp4"):
+        index.add_video(path)
+
+    results = index.most_similar("a", 0, 2)
+    assert [result["video_id"] for result in results] == ["b", "c"]
+    with pytest.raises(ValueError):
+        index.most_similar("missing", 0, 2)
+    with pytest.raises(ValueError):
+        index.most_similar("a", 1, 2)
+
+
+def test_near_duplicates(tmp_path, videos):
+    videos["a.mp4"] = synthetic_video(2, motion=0, hash_byte=0b00000000)
+    videos["b.mp4"] = synthetic_video(3, motion=0, hash_byte=0b00000001)  # 8 bits away from a
+    videos["c.mp4"] = synthetic_video(1, motion=0, hash_byte=0b11111111)  # 64 bits away from a
+    index = FrameFeatureIndex(str(tmp_path / "features"))
+    for path in ("a.mp4", "b.mp4", "c.mp4"):
+        index.add_video(path)
+
+    assert [(result["video_id"], result["second"], result["distance"]) for result in index.near_duplicates("a", 1)] == [
+        ("a", 0, 0), ("a", 1, 0)]
+    results = index.near_duplicates("a", 1, max_distance=8)
+    assert [(result["video_id"], result["distance"]) for result in results] == [("a", 0)] * 2 + [("b", 8)] * 3
+    assert [result["second"] for result in results if result["video_id"] == "b"] == [0, 1, 2]
+
+    with pytest.raises(ValueError):
+        index.near_duplicates("a", 2)
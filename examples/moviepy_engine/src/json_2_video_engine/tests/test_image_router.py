@@ -0,0 +1,192 @@
+import sys
+import os
+import time
+import asyncio
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../../')))
+
+from core.image.generation import image_router
+from core.image.generation.image_router import ImageRouter, NoImageProviderError, ProviderHealth
+
+
+class FakeProviders:
+    """Replaces generate_image: each provider fails, or answers after a delay."""
+
+    def __init__(self, delays: dict = None, failing: set = ()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.calls = []
+
+    async def __call__(self, provider, api_key, prompt, width, height):
+        self.calls.append(provider)
+        await asyncio.sleep(self.delays.get(provider, 0))
+        if provider in self.failing:
+            raise RuntimeError(f"{provider} is down")
+        return f"https://{provider}/{prompt}.png"
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    fake = FakeProviders()
+    monkeypatch.setattr(image_router, "generate_image", fake)
+    monkeypatch.setattr(image_router, "MIN_HEDGE_DELAY_SECONDS", 0.05)
+    return fake
+
+
+def make_router(**kwargs) -> ImageRouter:
+    kwargs.setdefault("hedge", False)
+    return ImageRouter(providers=["pollinations", "leonardo", "dalle"], api_keys={"leonardo": "key", "dalle": "key"}, **kwargs)
+
+
+def test_providers_without_api_key_are_skipped():
+    router = ImageRouter(providers=["pollinations", "leonardo", "dalle"], api_keys={"dalle": "key"})
+    assert router.providers == ["pollinations", "dalle"]
+    with pytest.raises(ValueError):
+        ImageRouter(providers=["leonardo"])
+    with pytest.raises(ValueError):
+        ImageRouter(providers=["midjourney"])
+
+
+def test_uses_the_preferred_provider(providers):
+    router = make_router()
+    assert asyncio.run(router.generate("cat")) == "https://pollinations/cat.png"
+    assert providers.calls == ["pollinations"]
+    assert router.health["pollinations"].outcomes[-1] is True
+
+
+def test_ranks_by_latency_and_error_rate():
+    router = make_router()
+    for latency in (8, 8, 8, 8, 8):
+        router.health["pollinations"].succeeded(latency)
+    for latency in (3, 3, 3, 3, 3):
+        router.health["leonardo"].succeeded(latency)
+    assert router.ranked()[0] == "leonardo"
+
+    # Three failures out of eight: 3 / (5 / 8) = 4.8 seconds expected, still better than 8
+    for _ in range(3):
+        router.health["leonardo"].failed()
+    router.health["leonardo"].consecutive_failures = 0
+    router.health["leonardo"].opened_at = None
+    assert router.ranked()[0] == "leonardo"
+    assert router.health["leonardo"].score() == pytest.approx(4.8)
+
+
+def test_saturated_providers_come_last():
+    router = make_router(concurrency={"pollinations": 1})
+    router.health["pollinations"].start()
+    assert router.ranked()[-1] == "pollinations"
+    router.health["pollinations"].finish()
+    assert router.ranked()[0] == "pollinations"
+
+
+def test_fails_over_to_the_next_provider(providers):
+    providers.failing = {"pollinations"}
+    router = make_router()
+    # Equal error rates: dalle's prior latency is lower than leonardo's
+    assert asyncio.run(router.generate("cat")) == "https://dalle/cat.png"
+    assert providers.calls == ["pollinations", "dalle"]
+    assert router.health["pollinations"].outcomes[-1] is False
+
+    # The failure is in pollinations' score now
+    providers.calls.clear()
+    asyncio.run(router.generate("dog"))
+    assert providers.calls == ["dalle"]
+
+
+def test_raises_when_every_provider_fails(providers):
+    providers.failing = {"pollinations", "leonardo", "dalle"}
+    with pytest.raises(NoImageProviderError, match="pollinations is down"):
+        asyncio.run(make_router().generate("cat"))
+    assert providers.calls == ["pollinations", "dalle", "leonardo"]
+
+
+def test_hedges_a_slow_request(providers):
+    providers.delays = {"pollinations": 1.0}
+    router = make_router(hedge=True)
+    for provider in router.providers:
+        router.health[provider].prior_latency = 0.01  # p95 until samples, so the hedge delay is MIN_HEDGE_DELAY_SECONDS
+
+    started = time.monotonic()
+    assert asyncio.run(router.generate("cat")) == "https://leonardo/cat.png"
+    assert time.monotonic() - started < 0.5
+    assert providers.calls == ["pollinations", "leonardo"]
+    # The slow request was cancelled: no failure recorded, its stall counts as a latency
+    assert list(router.health["pollinations"].outcomes) == []
+    assert len(router.health["pollinations"].latencies) == 1
+    assert router.health["pollinations"].in_flight == 0
+
+
+def test_no_hedge_when_the_primary_answers_in_time(providers):
+    providers.delays = {"pollinations": 0.01}
+    router = make_router(hedge=True)
+    assert asyncio.run(router.generate("cat")) == "https://pollinations/cat.png"
+    assert providers.calls == ["pollinations"]
+
+
+def test_circuit_opens_after_consecutive_failures(providers):
+    providers.failing = {"pollinations"}
+    router = ImageRouter(providers=["pollinations"], hedge=False)
+    for _ in range(3):
+        with pytest.raises(NoImageProviderError, match="pollinations is down"):
+            asyncio.run(router.generate("cat"))
+    assert router.health["pollinations"].circuit_open
+    assert router.ranked() == []
+
+    providers.calls.clear()
+    with pytest.raises(NoImageProviderError, match="circuit open"):
+        asyncio.run(router.generate("cat"))
+    assert providers.calls == []
+
+    # Cooldown over: the trial request closes the circuit again
+    providers.failing.clear()
+    router.health["pollinations"].opened_at -= router.health["pollinations"].cooldown_seconds
+    assert asyncio.run(router.generate("cat")) == "https://pollinations/cat.png"
+    assert not router.health["pollinations"].circuit_open
+
+
+def test_circuit_trial_request():
+    health = ProviderHealth(prior_latency=1, failure_threshold=2, cooldown_seconds=60)
+    health.failed()
+    assert not health.circuit_open
+    health.failed()
+    assert health.circuit_open and not health.available()
+
+    health.opened_at -= 60  # Cooldown over: one trial request
+    assert health.available()
+    health.start()
+    assert not health.available()  # Only one trial at a time
+    health.failed()
+    health.finish()
+    assert health.circuit_open and not health.available()  # Failed trial reopens the circuit
+
+    health.opened_at -= 60
+    health.start()
+    health.succeeded(0.5)
+    health.finish()
+    assert not health.circuit_open and health.available()
+    assert health.consecutive_failures == 0
+
+
+def test_every_circuit_open(providers):
+    router = make_router()
+    for health in router.health.values():
+        for _ in range(3):
+            health.failed()
+    with pytest.raises(NoImageProviderError, match="circuit open"):
+        asyncio.run(router.generate("cat"))
+    assert providers.calls == []
+
+
+def test_concurrency_limit_under_gather(providers):
+    providers.delays = {"pollinations": 0.05, "leonardo": 0.05, "dalle": 0.05}
+    router = make_router(concurrency={"pollinations": 2, "leonardo": 2, "dalle": 2})
+
+    async def generate_all():
+        return await asyncio.gather(*(router.generate(f"cat{i}") for i in range(6)))
+
+    urls = asyncio.run(generate_all())
+    assert len(urls) == 6
+    assert sorted(providers.calls) == ["dalle", "dalle", "leonardo", "leonardo", "pollinations", "pollinations"]
+    assert all(health.in_flight == 0 for health in router.health.values())
@@ -0,0 +1,117 @@
+import sys
+import os
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.json_2_video_engine.utils.json_validation import parse_time_reference, validate_and_repair_video_json
+
+
+def make_video_json(**overrides):
+    data = {
+        "script": [
+            {"_id": "intro", "text": "one two three four"},
+            {"_id": "outro", "text": "five six seven eight"},
+        ],
+        "images": [
+            {"image_id": "img_1", "source_type": "prompt", "source_content": "A lighthouse",
+             "start_time": "intro.start_time", "end_time": "intro.end_time"},
+            {"image_id": "img_2", "source_type": "url", "source_content": "https://example.com/a.jpg",
+             "start_time": 0, "end_time": 2},
+        ],
+        "extra_args": {"resolution": {"width": 1080, "height": 1920}},
+    }
+    data.update(overrides)
+    return data
+
+
+def validate(data, **kwargs):
+    kwargs.setdefault("min_script_words", 1)
+    kwargs.setdefault("min_images", 0)
+    return validate_and_repair_video_json(data, **kwargs)
+
+
+def test_valid_json_is_unchanged():
+    data = make_video_json()
+    repaired, errors = validate(data)
+    assert errors == []
+    assert repaired == data
+    assert repaired is not data
+
+
+def test_parse_time_reference():
+    assert parse_time_reference("intro.end_time") == ("intro", "end_time")
+    assert parse_time_reference('["intro"].voice_start_time') == ("intro", "voice_start_time")
+    assert parse_time_reference("not a reference") is None
+
+
+def test_repairs_time_references_and_numbers():
+    data = make_video_json()
+    data["images"][0]["start_time"] = ' ["intro"] . start_time'
+    data["images"][1]["end_time"] = "2.5"
+    repaired, errors = validate(data)
+    assert errors == []
+    assert repaired["images"][0]["start_time"] == "intro.start_time"
+    assert repaired["images"][1]["end_time"] == 2.5
+
+
+def test_fills_missing_and_duplicated_ids():
+    data = make_video_json(script=[{"text": "one two"}, {"_id": "a", "text": "three"}, {"_id": "a", "text": "four"}])
+    data["images"][0].pop("image_id")
+    data["images"][0]["start_time"] = 0
+    data["images"][0]["end_time"] = 1
+    repaired, errors = validate(data)
+    assert errors == []
+    assert [script["_id"] for script in repaired["script"]] == ["scene_1", "a", "a_3"]
+    assert repaired["images"][0]["image_id"] == "img_1"
+
+
+def test_normalizes_source_type():
+    data = make_video_json()
+    data["images"][0]["source_type"] = " Prompt "
+    data["images"][1]["source_type"] = None
+    repaired, errors = validate(data)
+    assert errors == []
+    assert [image["source_type"] for image in repaired["images"]] == ["prompt", "prompt"]
+
+
+def test_path_must_be_an_element_to_include():
+    data = make_video_json()
+    data["images"][0].update(source_type="path", source_content="/tmp/logo.png")
+    _, errors = validate(data)
+    assert errors == ["images[0]: path '/tmp/logo.png' is not in elements_to_include"]
+
+    _, errors = validate(data, elements_to_include=[{"path": "/tmp/logo.png"}])
+    assert errors == []
+
+
+def test_reports_what_cant_be_repaired():
+    data = make_video_json()
+    data["images"][0]["source_type"] = "stock"
+    data["images"][0]["start_time"] = "missing.start_time"
+    data["images"][0]["end_time"] = "intro.middle_time"
+    _, errors = validate(data)
+    assert errors[:3] == [
+        "images[0]: source_type must be one of ('prompt', 'path', 'url'), got 'stock'",
+        "images[0].start_time: reference to unknown script id 'missing'",
+        "images[0].end_time: unknown time type 'middle_time'",
+    ]
+
+
+def test_missing_extra_args_come_from_the_reference():
+    data = make_video_json(extra_args=None)
+    repaired, errors = validate(data, reference_json={"extra_args": {"resolution": {"width": 1920, "height": 1080}}})
+    assert errors == []
+    assert repaired["extra_args"] == {"resolution": {"width": 1920, "height": 1080}}
+
+
+def test_minimum_script_words_and_images():
+    _, errors = validate(make_video_json(), min_script_words=10, min_images=3)
+    assert errors == ["script: 8 words, at least 10 required", "images: 2 images, at least 3 required"]
+
+
+def test_schema_errors():
+    data = make_video_json(script=[])
+    data["images"] = []
+    _, errors = validate(data)
+    assert len(errors) == 1 and errors[0].startswith("script: List should have at least 1 item")
@@ -0,0 +1,74 @@
+import sys
+import os
+import cv2
+import numpy as np
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.ken_burns import KenBurnsClip
+
+SIZE = (200, 100)
+
+
+def gradient_image(width, height):
+    """Red grows with x, green with y: any crop or stretch shows in the channel ranges."""
+    x = np.linspace(0, 255, width)[None, :].repeat(height, axis=0)
+    y = np.linspace(0, 255, height)[:, None].repeat(width, axis=1)
+    return np.stack([x, y, np.full_like(x, 128)], axis=-1).astype(np.uint8)
+
+
+def expected_view(image, left, top, view_width, view_height):
+    """The part of the image in view, resized to the layer."""
+    view = image[top:top + view_height, left:left + view_width]
+    return cv2.resize(view, SIZE, interpolation=cv2.INTER_AREA)
+
+
+def assert_close(frame, expected):
+    difference = np.abs(frame.astype(np.int16) - expected.astype(np.int16))
+    # Lanczos pre-scale + bilinear crop against a single area resize: only rounding-level differences
+    assert difference.mean() < 1.0
+    assert difference.max() <= 4
+
+
+def test_zoom_and_pan_frames():
+    image = gradient_image(400, 200)
+    clip = KenBurnsClip(image, SIZE, duration=4, zoom_start=1.0, zoom_end=2.0, pan_start=(0.5, 0.5), pan_end=(0.25, 0.25))
+
+    assert clip.get_frame(0).shape == (100, 200, 3)
+    assert_close(clip.get_frame(0), expected_view(image, 0, 0, 400, 200))
+    # Zoom 2 centered at a quarter of the image: its top left quarter
+    assert_close(clip.get_frame(4), expected_view(image, 0, 0, 200, 100))
+
+
+def test_pan_is_clamped_inside_the_image():
+    image = gradient_image(400, 200)
+    clip = KenBurnsClip(image, SIZE, duration=2, zoom_start=2.0, zoom_end=2.0, pan_start=(1.0, 1.0), pan_end=(1.0, 1.0))
+    assert_close(clip.get_frame(1), expected_view(image, 200, 100, 200, 100))
+
+
+def test_other_aspect_is_center_cropped_not_stretched():
+    image = gradient_image(400, 400)
+    clip = KenBurnsClip(image, SIZE, duration=2, zoom_start=1.0, zoom_end=1.0)
+    frame = clip.get_frame(0)
+    assert_close(frame, expected_view(image, 0, 100, 400, 200))
+    # The green (y) range is that of the middle half of the image, not the full one
+    assert frame[0, :, 1].mean() == pytest.approx(64, abs=3)
+    assert frame[-1, :, 1].mean() == pytest.approx(191, abs=3)
+
+
+def test_easing_midpoint():
+    image = gradient_image(400, 200)
+    linear = KenBurnsClip(image, SIZE, duration=2, zoom_start=1.0, zoom_end=2.0)
+    eased = KenBurnsClip(image, SIZE, duration=2, zoom_start=1.0, zoom_end=2.0, easing="ease_in_out")
+    assert linear._view(0.5)[0] == pytest.approx(1.25)
+    assert eased._view(0.5)[0] == pytest.approx(1 + 0.15625)
+    assert eased._view(1.0)[0] == pytest.approx(1.5)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        KenBurnsClip(gradient_image(40, 20), SIZE, duration=1, zoom_start=0.5)
+    with pytest.raises(ValueError):
+        KenBurnsClip(gradient_image(40, 20), SIZE, duration=1, easing="bounce")
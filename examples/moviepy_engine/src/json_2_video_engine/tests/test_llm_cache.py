@@ -0,0 +1,125 @@
+import sys
+import os
+import json
+import time
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../../')))
+
+from openai.types.chat import ChatCompletion
+
+from core.utils.llm_cache import LLMCache, LLMCacheMissError, cached_chat_completion
+
+PARAMS = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Hello"}], "temperature": 0}
+
+
+def completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    })
+
+
+class FakeClient:
+    """Stands in for an OpenAI client: counts the chat completions it creates."""
+
+    base_url = "https://api.openai.com/v1/"
+
+    def __init__(self, content: str = "Hi!"):
+        self.content = content
+        self.calls = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, **params):
+        self.calls.append(params)
+        return completion(self.content)
+
+
+def make_cache(tmp_path, **kwargs) -> LLMCache:
+    return LLMCache(cache_dir=str(tmp_path / "llm"), **kwargs)
+
+
+def age_entry(cache: LLMCache, key: str, seconds: float):
+    path = cache._path(key)
+    with open(path) as f:
+        entry = json.load(f)
+    entry["created_at"] -= seconds
+    with open(path, "w") as f:
+        json.dump(entry, f)
+
+
+def test_make_key_is_canonical():
+    key = LLMCache.make_key("https://api.openai.com/v1/", PARAMS)
+    assert key == LLMCache.make_key("https://api.openai.com/v1/", dict(reversed(list(PARAMS.items()))))
+    assert key == LLMCache.make_key("https://api.openai.com/v1/", {
+        **PARAMS, "stream": False, "timeout": 30, "user": "someone", "extra_headers": {"X-Request": "1"}})
+    assert key != LLMCache.make_key("https://api.openai.com/v1/", {**PARAMS, "temperature": 0.7})
+    assert key != LLMCache.make_key("https://example.openai.azure.com/", PARAMS)
+
+
+def test_read_write_hit_does_not_call_the_client(tmp_path):
+    cache, client = make_cache(tmp_path), FakeClient()
+    first = cached_chat_completion(client, cache=cache, **PARAMS)
+    second = cached_chat_completion(client, cache=cache, **PARAMS)
+    assert len(client.calls) == 1
+    assert isinstance(second, ChatCompletion)
+    assert second.choices[0].message.content == first.choices[0].message.content == "Hi!"
+
+
+def test_expired_entry_is_a_miss_except_in_replay(tmp_path):
+    cache, client = make_cache(tmp_path, ttl_seconds=60), FakeClient()
+    cached_chat_completion(client, cache=cache, **PARAMS)
+    key = cache.make_key(client.base_url, PARAMS)
+    age_entry(cache, key, 120)
+
+    assert cache.get(key) is None
+    assert make_cache(tmp_path, ttl_seconds=60, mode="replay").get(key) is not None
+
+    cached_chat_completion(client, cache=cache, **PARAMS)
+    assert len(client.calls) == 2
+
+
+def test_replay_raises_on_a_miss(tmp_path):
+    client = FakeClient()
+    cached_chat_completion(client, cache=make_cache(tmp_path, mode="record"), **PARAMS)
+
+    replay = make_cache(tmp_path, mode="replay")
+    assert cached_chat_completion(client, cache=replay, **PARAMS).choices[0].message.content == "Hi!"
+    with pytest.raises(LLMCacheMissError):
+        cached_chat_completion(client, cache=replay, **{**PARAMS, "temperature": 1})
+    assert len(client.calls) == 1
+
+
+def test_record_overwrites_the_entry(tmp_path):
+    cached_chat_completion(FakeClient("old"), cache=make_cache(tmp_path), **PARAMS)
+    record_client = FakeClient("new")
+    cached_chat_completion(record_client, cache=make_cache(tmp_path, mode="record"), **PARAMS)
+    assert len(record_client.calls) == 1
+
+    client = FakeClient()
+    assert cached_chat_completion(client, cache=make_cache(tmp_path), **PARAMS).choices[0].message.content == "new"
+    assert client.calls == []
+
+
+def test_off_always_calls_and_writes_nothing(tmp_path):
+    cache, client = make_cache(tmp_path, mode="off"), FakeClient()
+    cached_chat_completion(client, cache=cache, **PARAMS)
+    cached_chat_completion(client, cache=cache, **PARAMS)
+    assert len(client.calls) == 2
+    assert not os.path.exists(cache.cache_dir)
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = make_cache(tmp_path)
+    keys = [cache.make_key("endpoint", {"n": n}) for n in range(4)]
+    for n, key in enumerate(keys):
+        cache.set(key, {"n": n, "padding": "x" * 1000})
+        os.utime(cache._path(key), (time.time() - 100 + n, time.time() - 100 + n))
+    assert cache.get(keys[0]) is not None  # Touched: now the most recently used
+    # Room for two entries (sizes differ by a byte or so with the created_at digits)
+    cache.max_bytes = os.path.getsize(cache._path(keys[0])) + os.path.getsize(cache._path(keys[3]))
+    cache.evict()
+
+    assert [cache.get(key) is not None for key in keys] == [True, False, False, True]
@@ -0,0 +1,67 @@
+import sys
+import os
+import numpy as np
+import pytest
+from collections import namedtuple
+from moviepy.video.VideoClip import VideoClip
+from moviepy.video.io.VideoFileClip import VideoFileClip
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src import parallel_renderer
+from src.parallel_renderer import render_parallel, drop_duplicate_frames_params
+
+FPS = 10
+FRAMES = 30
+SIZE = (32, 24)
+
+
+def numbered_clip():
+    """Solid gray frames whose level encodes the frame index, so order survives lossy encoding."""
+    def make_frame(t):
+        return np.full((SIZE[1], SIZE[0], 3), 8 * int(round(t * FPS)), dtype=np.uint8)
+    return VideoClip(make_frame, duration=FRAMES / FPS)
+
+
+def frame_indices(video_path):
+    with VideoFileClip(video_path, audio=False) as video:
+        return [int(round(frame.mean() / 8)) for frame in video.iter_frames(fps=FPS)]
+
+
+@pytest.mark.parametrize("workers, batch_frames, ring_frames", [(3, 2, None), (2, 4, 3), (4, 1, 4)])
+def test_frames_are_written_in_order(tmp_path, workers, batch_frames, ring_frames):
+    output_path = str(tmp_path / "out.mp4")
+    render_parallel(numbered_clip(), output_path, fps=FPS, workers=workers, batch_frames=batch_frames,
+                    ring_frames=ring_frames, audio=False, ffmpeg_params=["-qp", "0"])
+    assert frame_indices(output_path) == list(range(FRAMES))
+
+
+def test_falls_back_to_a_single_process(tmp_path, monkeypatch):
+    Usage = namedtuple("Usage", "total used free")
+    monkeypatch.setattr(parallel_renderer.shutil, "disk_usage", lambda path: Usage(0, 0, 1024))  # Full /dev/shm
+    started = []
+    monkeypatch.setattr(parallel_renderer.shared_memory, "SharedMemory", lambda **kwargs: started.append(kwargs))
+
+    output_path = str(tmp_path / "out.mp4")
+    render_parallel(numbered_clip(), output_path, fps=FPS, workers=3, audio=False, ffmpeg_params=["-qp", "0"])
+    assert started == []
+    assert frame_indices(output_path) == list(range(FRAMES))
+
+
+def test_ring_fits_in_shared_memory(monkeypatch):
+    Usage = namedtuple("Usage", "total used free")
+    frame_bytes = 1920 * 1080 * 3
+    monkeypatch.setattr(parallel_renderer.shutil, "disk_usage", lambda path: Usage(0, 0, 64 * 1024 * 1024))
+    assert parallel_renderer._fit_ring_frames(10, 4, frame_bytes) == 10
+    assert parallel_renderer._fit_ring_frames(20, 4, frame_bytes) == 0  # 124 MB don't fit in 64 MB
+    assert parallel_renderer._fit_ring_frames(3, 4, frame_bytes) == 0  # Less than a frame per worker
+
+    monkeypatch.setattr(parallel_renderer.shutil, "disk_usage", lambda path: Usage(0, 0, 1 << 40))
+    assert parallel_renderer._fit_ring_frames(1000, 4, frame_bytes) == parallel_renderer.MAX_RING_BYTES // frame_bytes
+
+
+def test_drop_duplicate_frames_params():
+    assert drop_duplicate_frames_params(None, 30) == ["-vf", "mpdecimate=hi=0:lo=0:frac=0:max=30", "-vsync", "vfr"]
+    assert drop_duplicate_frames_params(["-vf", "subtitles=a.srt", "-crf", "20"], 24) == [
+        "-vf", "subtitles=a.srt,mpdecimate=hi=0:lo=0:frac=0:max=24", "-crf", "20", "-vsync", "vfr"]
@@ -0,0 +1,89 @@
+import sys
+import os
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../../')))
+
+from core.audio.speech_to_text.utils.word_timings import WordTimings
+
+WORDS = [
+    {"start": 0.0, "end": 0.4, "text": " Hello"},
+    {"start": 0.5, "end": 0.9, "text": "big"},
+    {"start": 1.0, "end": 1.3, "text": "world"},
+    {"start": 3.0, "end": 3.5, "text": "again"},
+    {"start": 3.6, "end": 4.25, "text": "friend"},
+]
+
+
+def test_group_by_words_and_gaps():
+    groups = WordTimings.from_words(WORDS).group(max_words=2, gap_threshold=1.0)
+    assert list(groups) == [(0.0, 0.9, "Hello big"), (1.0, 1.3, "world"), (3.0, 4.25, "again friend")]
+    assert groups.first_word.tolist() == [0, 2, 3]
+    assert groups.last_word.tolist() == [2, 3, 5]
+
+
+def test_group_by_chars():
+    groups = WordTimings.from_words(WORDS).group(max_chars=9)
+    assert [text for _, _, text in groups] == ["Hello big", "world", "again", "friend"]
+
+
+def test_group_by_width_keeps_one_word_per_caption_at_least():
+    groups = WordTimings.from_words(WORDS).group(max_line_width=1, measure_text=len)
+    assert [text for _, _, text in groups] == ["Hello", "big", "world", "again", "friend"]
+
+
+def test_words_per_line():
+    groups = WordTimings.from_words(WORDS).group(max_words=3, words_per_line=2)
+    assert [text for _, _, text in groups] == ["Hello big\nworld", "again friend"]
+
+
+def test_group_at():
+    groups = WordTimings.from_words(WORDS).group(max_words=2, gap_threshold=1.0)
+    assert groups.group_at(0.45) == 0  # Between two words of the same caption
+    assert groups.group_at(2.0) is None
+    assert groups.group_at(4.0) == 2
+
+
+def test_empty():
+    groups = WordTimings.from_words([]).group(max_words=2)
+    assert len(groups) == 0
+    assert groups.to_srt() == ""
+
+
+def test_to_srt():
+    groups = WordTimings.from_words(WORDS).group(max_words=2, gap_threshold=1.0)
+    assert groups.to_srt() == (
+        "1\n00:00:00,000 --> 00:00:00,900\nHello big\n\n"
+        "2\n00:00:01,000 --> 00:00:01,300\nworld\n\n"
+        "3\n00:00:03,000 --> 00:00:04,250\nagain friend\n"
+    )
+
+
+def test_to_vtt():
+    groups = WordTimings.from_words(WORDS).group(max_words=2, gap_threshold=1.0)
+    assert groups.to_vtt() == (
+        "WEBVTT\n\n"
+        "00:00:00.000 --> 00:00:00.900\nHello big\n\n"
+        "00:00:01.000 --> 00:00:01.300\nworld\n\n"
+        "00:00:03.000 --> 00:00:04.250\nagain friend\n"
+    )
+
+
+def test_to_ass_karaoke():
+    groups = WordTimings.from_words(WORDS).group(max_words=2, gap_threshold=1.0)
+    ass = groups.to_ass(1080, 1920, color="#FFFFFF", highlight_color="#FFFF00")
+    assert "PlayResX: 1080\nPlayResY: 1920" in ass
+    # Karaoke: the primary (spoken) color is the highlight, the secondary the plain color
+    assert "Style: Caption,Arial,60,&H0000FFFF,&H00FFFFFF,&H00000000," in ass
+    dialogues = [line for line in ass.splitlines() if line.startswith("Dialogue:")]
+    assert dialogues == [
+        "Dialogue: 0,0:00:00.00,0:00:00.90,Caption,,0,0,0,,{\\an8\\pos(540,768)}{\\k50}HELLO {\\k40}BIG",
+        "Dialogue: 0,0:00:01.00,0:00:01.30,Caption,,0,0,0,,{\\an8\\pos(540,768)}{\\k30}WORLD",
+        "Dialogue: 0,0:00:03.00,0:00:04.25,Caption,,0,0,0,,{\\an8\\pos(540,768)}{\\k60}AGAIN {\\k65}FRIEND",
+    ]
+
+
+def test_to_ass_without_karaoke():
+    groups = WordTimings.from_words(WORDS).group(max_words=3, words_per_line=2)
+    ass = groups.to_ass(1080, 1920, karaoke=False, uppercase=False)
+    assert ass.splitlines()[-2] == "Dialogue: 0,0:00:00.00,0:00:01.30,Caption,,0,0,0,,{\\an8\\pos(540,768)}Hello big\\Nworld"
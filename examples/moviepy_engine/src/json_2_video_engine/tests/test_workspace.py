@@ -0,0 +1,110 @@
+import sys
+import os
+import json
+import time
+import socket
+import subprocess
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../../')))
+
+from core.utils.workspace import (Workspace, WorkspaceQuotaError, OWNER_FILE, ORPHAN_MAX_AGE_SECONDS,
+                                  scratch_path, check_quota, cached_asset, evict_assets, sweep_orphans)
+
+
+def write(path, size):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def make_workspace(tmp_path, **kwargs):
+    return Workspace(root=str(tmp_path / "workspaces"), cache_dir=str(tmp_path / "assets"), **kwargs)
+
+
+def make_job_dir(root, name, owner=None, age=0):
+    """A job directory as another process would have left it, last modified age seconds ago."""
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    if owner is not None:
+        with open(os.path.join(path, OWNER_FILE), "w") as f:
+            json.dump(owner, f)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_quota_counts_writes_after_the_path_is_handed_out(tmp_path):
+    with make_workspace(tmp_path, quota_bytes=1000) as workspace:
+        first = write(scratch_path("a_", ".bin"), 600)
+        assert workspace.usage() == 600
+        check_quota()
+
+        # The path is handed out under the quota, the write that follows goes over it
+        write(scratch_path("b_", ".bin"), 600)
+        with pytest.raises(WorkspaceQuotaError):
+            check_quota()
+        with pytest.raises(WorkspaceQuotaError):
+            scratch_path("c_", ".bin")
+
+        os.remove(first)
+        assert workspace.usage() == 600
+        check_quota()
+    assert not os.path.exists(workspace.path)
+    assert workspace.usage() == 0
+
+    check_quota()  # Outside of a job: nothing to check
+
+
+def test_promote_and_cached_asset(tmp_path):
+    with make_workspace(tmp_path, quota_bytes=1000) as workspace:
+        path = write(workspace.file("image_", ".jpg"), 800)
+        assert workspace.usage() == 800
+
+        cached = workspace.promote(path, "ab12")
+        assert not os.path.exists(path) and os.path.getsize(cached) == 800
+        assert workspace.usage() == 0
+        assert cached_asset("ab12", ".jpg", cache_dir=workspace.cache_dir) == cached
+    # Promoted assets outlive the job
+    assert os.path.exists(cached)
+    assert cached_asset("cd34", ".jpg", cache_dir=workspace.cache_dir) is None
+
+
+def test_evict_assets_drops_least_recently_used(tmp_path):
+    with make_workspace(tmp_path) as workspace:
+        cached = []
+        for n, key in enumerate(["aa", "bb", "cc"]):
+            cached.append(workspace.promote(write(workspace.file(suffix=".jpg"), 100), key))
+            os.utime(cached[-1], (time.time() - 100 + n, time.time() - 100 + n))
+
+    assert cached_asset("aa", ".jpg", cache_dir=workspace.cache_dir)  # Touched: now the most recently used
+    evict_assets(workspace.cache_dir, max_bytes=200)
+    assert [os.path.exists(path) for path in cached] == [True, False, True]
+
+
+def test_sweep_orphans(tmp_path):
+    root = str(tmp_path / "workspaces")
+    hostname = socket.gethostname()
+    live = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    try:
+        kept = [
+            make_job_dir(root, "job_live", {"pid": live.pid, "host": hostname}),
+            make_job_dir(root, "job_self", {"pid": os.getpid(), "host": hostname}),
+            make_job_dir(root, "job_foreign_recent", {"pid": dead.pid, "host": "elsewhere"}, age=60),
+            make_job_dir(root, "job_no_owner_recent", age=60),
+            make_job_dir(root, "other_dir", age=2 * ORPHAN_MAX_AGE_SECONDS),
+        ]
+        removed = [
+            make_job_dir(root, "job_dead", {"pid": dead.pid, "host": hostname}),
+            make_job_dir(root, "job_foreign_old", {"pid": live.pid, "host": "elsewhere"}, age=2 * ORPHAN_MAX_AGE_SECONDS),
+            make_job_dir(root, "job_no_owner_old", age=2 * ORPHAN_MAX_AGE_SECONDS),
+        ]
+        assert sweep_orphans(root) == len(removed)
+        assert all(os.path.exists(path) for path in kept)
+        assert not any(os.path.exists(path) for path in removed)
+    finally:
+        live.kill()
+        live.wait()
@@ -1,26 +1,46 @@
 import os
-import uuid
+import hashlib
 import logging
-from dotenv import load_dotenv
-from openai import OpenAI
 import requests
+from PIL import Image
 
-# Load environment variables from .env file
-load_dotenv()
-
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-pexels_api_key = os.getenv("PEXELS_API_KEY")
-pixabay_api_key = os.getenv("PIXABAY_API_KEY") or ''
+from core.utils.workspace import scratch_path, current_workspace, cached_asset, check_quota
+from core.utils.clients import get_env
+from core.utils.metrics import track_call, record_download, record_cache_lookup
 
 def download_image(image_url):
+    # Images are shared between jobs through the asset cache, keyed by URL
+    cache_key = hashlib.sha256(image_url.encode("utf-8")).hexdigest()
+    cached_path = cached_asset(cache_key, ".jpg")
+    record_cache_lookup("assets", cached_path is not None)
+    if cached_path:
+        logging.info(f"Using cached image: {cached_path}")
+        return cached_path
+
     response = requests.get(image_url, timeout=15)
-    #save the image to the assets folder
+    record_download("image", len(response.content))
+    # Never write (and cache) an error page as an image
+    response.raise_for_status()
+    content_type = response.headers.get("Content-Type", "")
+    if not content_type.startswith("image/"):
+        raise ValueError(f"Expected an image from {image_url}, got Content-Type {content_type!r}")
+
+    #save the image to the job workspace (assets folder outside of a job)
     assets_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'images')
-    os.makedirs(assets_dir, exist_ok=True)
-    image_path = os.path.join(assets_dir, f"{uuid.uuid4()}.jpg")
+    image_path = scratch_path("image_", ".jpg", fallback_dir=assets_dir)
     with open(image_path, 'wb') as f:
         f.write(response.content)
-    
+    check_quota()
+    try:
+        with Image.open(image_path) as image:
+            image.verify()
+    except Exception as e:
+        os.remove(image_path)
+        raise ValueError(f"Downloaded file from {image_url} is not a valid image: {e}")
+
+    workspace = current_workspace()
+    if workspace is not None:
+        image_path = workspace.promote(image_path, cache_key)
     logging.info(f"Downloaded image to: {image_path}")
     return image_path
 
@@ -60,7 +80,8 @@ def generate_image_pollinations(query, width=540, height=960, model=None, seed=N
         generate_url = f"https://image.pollinations.ai/prompt/{encoded_query}"
 
         full_url = requests.Request('GET', generate_url, params=params).prepare().url
-        response = requests.get(full_url, timeout=timeout)
+        with track_call("pollinations", "image"):
+            response = requests.get(full_url, timeout=timeout)
         
         if response.status_code == 200:
             # Validate URL before returning
@@ -81,7 +102,7 @@ def search_pexels_images(query):
     search_url = "https://api.pexels.com/v1/search"
 
     headers = {
-        'Authorization': pexels_api_key
+        'Authorization': get_env("PEXELS_API_KEY")
     }
     
     params = {
@@ -90,8 +111,9 @@ def search_pexels_images(query):
     }
     
     try:
-        response = requests.get(search_url, headers=headers, params=params)
-        response.raise_for_status()  # Raise an error for bad responses
+        with track_call("pexels", "search"):
+            response = requests.get(search_url, headers=headers, params=params)
+            response.raise_for_status()  # Raise an error for bad responses
     except requests.exceptions.HTTPError as e:
         logging.error(f"HTTP error occurred: {e}")  # Log the error
         return []  # Return an empty list on error
@@ -108,15 +130,16 @@ def search_pixabay_images(query):
     search_url = "https://pixabay.com/api/"
     
     params = {
-        'key': pixabay_api_key,
+        'key': get_env("PIXABAY_API_KEY") or '',
         'q': query,
         'image_type': 'all',
         'per_page': 3
     }
         
     try:
-        response = requests.get(search_url, params=params)
-        response.raise_for_status()  # Raise an error for bad responses
+        with track_call("pixabay", "search"):
+            response = requests.get(search_url, params=params)
+            response.raise_for_status()  # Raise an error for bad responses
     except requests.exceptions.HTTPError as e:
         logging.error(f"HTTP error occurred: {e}")  # Log the error
         return []  # Return an empty list on error
@@ -1,13 +1,10 @@
 import json
 import os
 import logging
-from openai import OpenAI
+from core.utils.llm_cache import cached_chat_completion
+from core.utils.clients import get_openai_client
+from .json_validation import validate_and_repair_video_json
 
-from dotenv import load_dotenv
-
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 reference_json_path = os.path.join(os.path.dirname(__file__), '..', 'json_templates', 'json2video_storytelling.json')
 
 def json_raw_generation(reference_json: dict, instructions: str, elements_to_include: list = None):
@@ -33,7 +30,7 @@ def json_raw_generation(reference_json: dict, instructions: str, elements_to_inc
             {"role": "user", "content": f"Please generate a similar JSON structure based on the following instructions:\n\n{instructions}"}
         ]
 
-    response = client.chat.completions.create(
+    response = cached_chat_completion(get_openai_client(),
         model="gpt-3.5-turbo-0125",
         messages=messages,
         max_tokens=2000,
@@ -66,7 +63,7 @@ def json_verification(reference_json: dict, generated_json: dict, elements_to_in
     JSON structure to verify:\n{json.dumps(parsed_json, indent=2)}
     """
 
-    verification = client.chat.completions.create(
+    verification = cached_chat_completion(get_openai_client(),
         model="gpt-3.5-turbo-0125",
         messages=[
             {"role": "system", "content": f"You are an AI assistant specialized in verifying JSON structures for a video creation engine that uses a static JSON structure(images, text, script). \n {instructions}"},
@@ -87,7 +84,17 @@ def generate_json_for_video(instructions: str, elements_to_include: list = None)
         reference_json = json.load(file)
 
     generated_json = json_raw_generation(reference_json, instructions, elements_to_include)
-    verified_json = json_verification(reference_json, generated_json, elements_to_include)
+
+    # Validate and repair locally, the LLM verification only runs when local repair fails
+    repaired_json, errors = validate_and_repair_video_json(generated_json, reference_json, elements_to_include)
+    if not errors:
+        return repaired_json
+
+    logging.info("Local repair failed, verifying the JSON with the LLM")
+    verified_json = json_verification(reference_json, repaired_json, elements_to_include)
+    verified_json, errors = validate_and_repair_video_json(verified_json, reference_json, elements_to_include)
+    if errors:
+        logging.warning(f"Verified JSON still has issues: {errors}")
 
     return verified_json
 
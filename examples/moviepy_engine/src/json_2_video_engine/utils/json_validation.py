@@ -0,0 +1,196 @@
+"""
+Local validation and repair of JSON2Video structures.
+
+This replaces the LLM verification round trip whenever the generated JSON is valid
+or only has trivial issues that can be fixed in place.
+"""
+
+import re
+import copy
+import logging
+from typing import Literal, Optional, Union, get_args
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+TIME_REFERENCE_TYPES = ("start_time", "end_time", "voice_start_time", "voice_end_time")
+SourceType = Literal["prompt", "path", "url"]
+SOURCE_TYPES = get_args(SourceType)
+
+# Matches script_id.start_time as well as the ["script_id"].start_time form used in the prompts
+TIME_REFERENCE_PATTERN = re.compile(r'^\s*\[?\s*["\']?([\w\-]+)["\']?\s*\]?\s*\.\s*(\w+)\s*$')
+
+TimeValue = Union[float, str]
+
+
+class ScriptItem(BaseModel):
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+    id: str = Field(alias="_id", min_length=1)
+    text: str = Field(min_length=1)
+    voice_start_time: float = 0
+    post_pause_duration: float = 0
+
+
+class KenBurns(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    zoom_start: float = Field(default=1.0, ge=1)
+    zoom_end: float = Field(default=1.2, ge=1)
+    pan_start: list[float] = Field(default=[50, 50], min_length=2, max_length=2)
+    pan_end: list[float] = Field(default=[50, 50], min_length=2, max_length=2)
+    easing: Literal["linear", "ease_in_out"] = "linear"
+
+
+class ImageItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    image_id: str = Field(min_length=1)
+    source_type: SourceType
+    source_content: str = Field(min_length=1)
+    start_time: TimeValue
+    end_time: TimeValue
+    ken_burns: Optional[KenBurns] = None
+
+
+class TextItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    content: str = Field(min_length=1)
+    start_time: TimeValue
+    end_time: TimeValue
+
+
+class VideoItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    video_path: str = Field(min_length=1)
+    start_time: TimeValue
+    end_time: TimeValue
+    opacity: float = 1.0
+    volume: float = 1.0
+
+
+class AudioItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    audio_path: str = Field(min_length=1)
+    start_time: TimeValue
+    end_time: TimeValue
+    volume: float = 1.0
+
+
+class Json2VideoSpec(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    script: list[ScriptItem] = Field(min_length=1)
+    images: list[ImageItem] = []
+    text: list[TextItem] = []
+    videos: list[VideoItem] = []
+    audio: list[AudioItem] = []
+    extra_args: dict = {}
+
+
+def parse_time_reference(value: str) -> Optional[tuple[str, str]]:
+    """Split a 'script_id.time_type' reference into (script_id, time_type), or None if it isn't one."""
+    match = TIME_REFERENCE_PATTERN.match(value)
+    if not match:
+        return None
+    return match.group(1), match.group(2)
+
+
+def _repair_time(value, script_ids: set, location: str, errors: list):
+    """Normalize a start/end time and record an error if it can't be resolved."""
+    if isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, str):
+        errors.append(f"{location}: invalid time {value!r}")
+        return value
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    reference = parse_time_reference(value)
+    if reference is None:
+        errors.append(f"{location}: invalid time reference {value!r}")
+        return value
+
+    script_id, time_type = reference
+    if script_id not in script_ids:
+        errors.append(f"{location}: reference to unknown script id {script_id!r}")
+    if time_type not in TIME_REFERENCE_TYPES:
+        errors.append(f"{location}: unknown time type {time_type!r}")
+    return f"{script_id}.{time_type}"
+
+
+def validate_and_repair_video_json(generated_json: dict, reference_json: dict = None, elements_to_include: list = None,
+                                   min_script_words: int = 120, min_images: int = 3) -> tuple[dict, list[str]]:
+    """
+    Validate a generated JSON2Video structure and fix trivial issues in place.
+
+    Checks the required sections, element fields, source_type rules, time reference targets,
+    minimum script length and number of images.
+
+    Args:
+        generated_json (dict): JSON structure generated by the LLM.
+        reference_json (dict): Reference template, used to fill in missing extra_args.
+        elements_to_include (list): Elements the user provided, the only valid targets of source_type 'path'.
+        min_script_words (int): Minimum number of words in the whole script.
+        min_images (int): Minimum number of images.
+
+    Returns:
+        tuple[dict, list[str]]: The repaired JSON and the issues that couldn't be repaired.
+    """
+    data = copy.deepcopy(generated_json) if isinstance(generated_json, dict) else {}
+    errors = []
+    allowed_paths = {element.get("path") for element in (elements_to_include or []) if isinstance(element, dict)}
+
+    if not isinstance(data.get("extra_args"), dict):
+        data["extra_args"] = copy.deepcopy((reference_json or {}).get("extra_args", {}))
+
+    # Script ids: fill in missing ones and de-duplicate
+    script_ids = set()
+    for index, script in enumerate(data.get("script") or []):
+        if not isinstance(script, dict):
+            continue
+        script_id = str(script.get("_id") or f"scene_{index + 1}")
+        while script_id in script_ids:
+            script_id = f"{script_id}_{index + 1}"
+        script["_id"] = script_id
+        script_ids.add(script_id)
+
+    for index, image in enumerate(data.get("images") or []):
+        if not isinstance(image, dict):
+            continue
+        image.setdefault("image_id", f"img_{index + 1}")
+        source_type = str(image.get("source_type") or "prompt").strip().lower()
+        image["source_type"] = source_type
+        if source_type not in SOURCE_TYPES:
+            errors.append(f"images[{index}]: source_type must be one of {SOURCE_TYPES}, got {source_type!r}")
+        elif source_type == "path" and image.get("source_content") not in allowed_paths:
+            errors.append(f"images[{index}]: path {image.get('source_content')!r} is not in elements_to_include")
+
+    for section in ("images", "text", "videos", "audio"):
+        for index, item in enumerate(data.get(section) or []):
+            if not isinstance(item, dict):
+                continue
+            for time_key in ("start_time", "end_time"):
+                if time_key in item:
+                    item[time_key] = _repair_time(item[time_key], script_ids, f"{section}[{index}].{time_key}", errors)
+
+    try:
+        spec = Json2VideoSpec.model_validate(data)
+    except ValidationError as e:
+        errors.extend(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+        return data, errors
+
+    script_words = sum(len(script.text.split()) for script in spec.script)
+    if script_words < min_script_words:
+        errors.append(f"script: {script_words} words, at least {min_script_words} required")
+    if len(spec.images) < min_images:
+        errors.append(f"images: {len(spec.images)} images, at least {min_images} required")
+
+    if errors:
+        logging.info(f"Local JSON validation found {len(errors)} issue(s): {errors}")
+    return data, errors
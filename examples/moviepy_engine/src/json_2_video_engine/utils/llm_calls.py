@@ -1,28 +1,44 @@
 import os
-import uuid
 import logging
-from dotenv import load_dotenv
-from openai import OpenAI
+import numpy as np
 
-# Load environment variables from .env file
-load_dotenv()
+from core.utils.workspace import scratch_path
+from core.utils.clients import get_openai_client
+from core.utils.metrics import track_call
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI TTS "pcm" responses are raw 24 kHz 16-bit mono
+TTS_PCM_SAMPLE_RATE = 24000
 
 async def generate_voice(script):
     try:
-        unique_id = uuid.uuid4()
         assets_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'audios')
-        os.makedirs(assets_dir, exist_ok=True)
-        speech_file_path = os.path.join(assets_dir, f"voice_{unique_id}.mp3")
+        speech_file_path = scratch_path("voice_", ".mp3", fallback_dir=assets_dir)
         
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="echo",
-            input=script
-        )
-        response.stream_to_file(speech_file_path)
+        with track_call("openai", "tts"):
+            response = get_openai_client().audio.speech.create(
+                model="tts-1",
+                voice="echo",
+                input=script
+            )
+            response.stream_to_file(speech_file_path)
         logging.info("Voice generated successfully.")
         return speech_file_path
     except Exception as e:
         logging.error(f"Error generating voice: {e}")
+
+async def generate_voice_pcm(script) -> tuple[np.ndarray, int]:
+    """Generate the voice as float32 PCM in memory: no file, and no MP3 to decode again."""
+    try:
+        with track_call("openai", "tts"):
+            response = get_openai_client().audio.speech.create(
+                model="tts-1",
+                voice="echo",
+                input=script,
+                response_format="pcm"
+            )
+        samples = np.frombuffer(response.content, dtype="<i2").astype(np.float32) / 32768
+        logging.info("Voice generated successfully.")
+        return samples, TTS_PCM_SAMPLE_RATE
+    except Exception as e:
+        logging.error(f"Error generating voice: {e}")
+        raise
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+from typing import Literal, Union
+from PIL import Image
+from moviepy.video.VideoClip import VideoClip
+
+EASINGS = {
+    "linear": lambda p: p,
+    "ease_in_out": lambda p: p * p * (3 - 2 * p),
+}
+
+
+def _crop_to_aspect(picture: Image.Image, aspect: float) -> Image.Image:
+    """Largest centered crop of picture with the given width / height ratio."""
+    width, height = picture.size
+    crop_width, crop_height = min(width, round(height * aspect)), min(height, round(width / aspect))
+    if (crop_width, crop_height) == (width, height):
+        return picture
+    left, top = (width - crop_width) // 2, (height - crop_height) // 2
+    return picture.crop((left, top, left + crop_width, top + crop_height))
+
+
+class KenBurnsClip(VideoClip):
+    """
+    Zoom and pan over a still image without resizing it on every frame.
+
+    The image is center-cropped to the aspect ratio of the layer (never stretched) and scaled
+    once, with Lanczos, to the layer size times the largest zoom. Each frame is then a sub-pixel
+    bilinear crop of that buffer (one affine warp), which only ever shrinks it by max_zoom / zoom,
+    so frames cost about as much as a copy of the layer.
+
+    Args:
+        image: Image path or (height, width, 3|4) array.
+        size: (width, height) of the layer.
+        duration: Clip duration in seconds.
+        zoom_start: Zoom at the start, 1.0 shows the whole image.
+        zoom_end: Zoom at the end.
+        pan_start: (x, y) center of the view at the start, as fractions of the cropped image (0.5, 0.5 is the center).
+        pan_end: (x, y) center of the view at the end.
+        easing: Motion curve between start and end.
+    """
+
+    def __init__(self, image: Union[str, np.ndarray], size: tuple, duration: float, zoom_start: float = 1.0,
+                 zoom_end: float = 1.2, pan_start: tuple = (0.5, 0.5), pan_end: tuple = (0.5, 0.5),
+                 easing: Literal["linear", "ease_in_out"] = "linear"):
+        if min(zoom_start, zoom_end) < 1:
+            raise ValueError(f"Ken Burns zoom must be at least 1.0, got {zoom_start} and {zoom_end}")
+        if easing not in EASINGS:
+            raise ValueError(f"Unknown easing {easing!r}, expected one of {list(EASINGS)}")
+        VideoClip.__init__(self, duration=duration)
+        width, height = int(size[0]), int(size[1])
+        self.size = (width, height)
+        self.zoom_start, self.zoom_end = float(zoom_start), float(zoom_end)
+        self.pan_start, self.pan_end = tuple(pan_start), tuple(pan_end)
+        self.easing = EASINGS[easing]
+        self.max_zoom = max(self.zoom_start, self.zoom_end)
+
+        picture = Image.open(image) if isinstance(image, str) else Image.fromarray(np.asarray(image))
+        picture = _crop_to_aspect(picture.convert("RGB"), width / height).resize(
+            (max(1, round(width * self.max_zoom)), max(1, round(height * self.max_zoom))), Image.LANCZOS
+        )
+        self._source = np.asarray(picture)
+        self._output = np.empty((height, width, 3), dtype=np.uint8)
+
+        self.make_frame = self._make_frame
+
+    def _view(self, t: float) -> tuple[float, float, float]:
+        """Zoom and view center (in source pixels) at time t."""
+        progress = self.easing(min(max(t / self.duration, 0.0), 1.0)) if self.duration else 0.0
+        zoom = self.zoom_start + (self.zoom_end - self.zoom_start) * progress
+        pan_x, pan_y = (start + (end - start) * progress for start, end in zip(self.pan_start, self.pan_end))
+
+        source_height, source_width = self._source.shape[:2]
+        view_width, view_height = source_width / zoom, source_height / zoom
+        # Keep the view inside the image
+        center_x = min(max(pan_x * source_width, view_width / 2), source_width - view_width / 2)
+        center_y = min(max(pan_y * source_height, view_height / 2), source_height - view_height / 2)
+        return zoom, center_x, center_y
+
+    def _make_frame(self, t: float) -> np.ndarray:
+        zoom, center_x, center_y = self._view(t)
+        width, height = self.size
+        scale = self.max_zoom / zoom  # Source pixels per output pixel
+        # Output pixel centers mapped onto the pre-scaled source
+        offset_x = center_x - width * scale / 2 + 0.5 * scale - 0.5
+        offset_y = center_y - height * scale / 2 + 0.5 * scale - 0.5
+        matrix = np.array([[scale, 0, offset_x], [0, scale, offset_y]], dtype=np.float64)
+        cv2.warpAffine(self._source, matrix, (width, height), dst=self._output,
+                       flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+        return self._output
@@ -0,0 +1,226 @@
+import os
+import gc
+import time
+import shutil
+import logging
+import traceback
+import subprocess as sp
+import multiprocessing as mp
+import numpy as np
+from multiprocessing import shared_memory
+
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+
+from .ffmpeg_utils import get_ffmpeg_binary, mux_audio
+
+from core.utils.workspace import scratch_path, check_quota
+from core.utils.metrics import record_render
+
+DEFAULT_BATCH_FRAMES = 8
+MAX_DEFAULT_WORKERS = 8
+MAX_RING_BYTES = 512 * 1024 * 1024
+SHARED_MEMORY_DIR = "/dev/shm"
+WAIT_TIMEOUT = 0.5
+
+
+def _reset_readers():
+    """
+    Forked workers share the parent's decoder pipes: drop them (without closing, the
+    parent still reads from them) so every reader opens its own ffmpeg process on first use.
+    The type is checked with type() rather than isinstance(): lazy module proxies (e.g. openai's
+    optional pandas) override __class__ and would import or raise on the check.
+    """
+    for obj in gc.get_objects():
+        if issubclass(type(obj), FFMPEG_VideoReader):
+            obj.proc = None
+
+
+def _render_worker(clip, worker_index: int, workers: int, batch_frames: int, times: np.ndarray,
+                   ring: np.ndarray, ready, written, abort, condition):
+    try:
+        _reset_readers()
+        ring_frames = len(ring)
+        batch_start = worker_index * batch_frames
+        while batch_start < len(times):
+            for index in range(batch_start, min(batch_start + batch_frames, len(times))):
+                slot = index % ring_frames
+                # Wait until the writer has streamed the frame that used this slot
+                with condition:
+                    while written.value <= index - ring_frames:
+                        if abort.value:
+                            return
+                        condition.wait(WAIT_TIMEOUT)
+                np.copyto(ring[slot], clip.get_frame(times[index]), casting="unsafe")
+                with condition:
+                    ready[slot] = index
+                    condition.notify_all()
+            batch_start += workers * batch_frames
+    except Exception:
+        logging.error(f"Render worker {worker_index} failed:\n{traceback.format_exc()}")
+        with condition:
+            abort.value = 1
+            condition.notify_all()
+        os._exit(1)
+
+
+def _encoder_command(output_path: str, size: tuple, fps: float, codec: str, preset: str, ffmpeg_params: list = None) -> list:
+    cmd = [get_ffmpeg_binary(), "-y", "-loglevel", "error",
+           "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{size[0]}x{size[1]}", "-pix_fmt", "rgb24",
+           "-r", f"{fps:.02f}", "-an", "-i", "-",
+           "-vcodec", codec, "-preset", preset]
+    if ffmpeg_params:
+        cmd += ffmpeg_params
+    if codec == "libx264" and size[0] % 2 == 0 and size[1] % 2 == 0:
+        cmd += ["-pix_fmt", "yuv420p"]
+    return cmd + [output_path]
+
+
+def drop_duplicate_frames_params(ffmpeg_params: list, fps: float) -> list:
+    """
+    Encoder parameters that drop repeated frames and keep the timestamps of the others,
+    writing a variable frame rate stream. At least one frame per second is kept so seeking
+    stays cheap. The filter runs after any existing -vf (e.g. burned-in subtitles).
+
+    Only exact repeats are dropped: with zero thresholds, any pixel difference in any 8x8 block
+    keeps the frame, so slow pans, fades and low-motion footage are never decimated.
+    """
+    params = list(ffmpeg_params or [])
+    decimate = f"mpdecimate=hi=0:lo=0:frac=0:max={max(1, int(fps))}"
+    if "-vf" in params:
+        index = params.index("-vf") + 1
+        params[index] = f"{params[index]},{decimate}"
+    else:
+        params += ["-vf", decimate]
+    return params + ["-vsync", "vfr"]
+
+
+def _fit_ring_frames(ring_frames: int, workers: int, frame_bytes: int) -> int:
+    """
+    Ring size capped at MAX_RING_BYTES, or 0 when it can't hold a frame per worker or doesn't fit
+    in the free shared memory (containers often have a 64 MB /dev/shm, and running out of it
+    kills the workers with SIGBUS instead of raising).
+    """
+    ring_frames = min(ring_frames, MAX_RING_BYTES // frame_bytes)
+    if ring_frames < workers:
+        return 0
+    try:
+        free_bytes = shutil.disk_usage(SHARED_MEMORY_DIR).free
+    except OSError:
+        return ring_frames  # No /dev/shm: shared memory isn't backed by a size-limited tmpfs
+    return ring_frames if ring_frames * frame_bytes <= free_bytes else 0
+
+
+def render_parallel(clip, output_path: str, fps: float = 30, workers: int = None, batch_frames: int = DEFAULT_BATCH_FRAMES,
+                    ring_frames: int = None, codec: str = "libx264", preset: str = "veryfast", ffmpeg_params: list = None,
+                    audio: bool = True, audio_codec: str = "aac", audio_bitrate: str = "128k",
+                    drop_duplicates: bool = False) -> str:
+    """
+    Render a clip with several worker processes feeding a single ffmpeg encoder.
+
+    Workers are forked with a copy of the clip and render interleaved batches of
+    batch_frames frames into a shared memory ring of ring_frames slots; this process
+    streams the slots in order to the encoder, so frames are never pickled and the
+    output is a single encode with no segment boundaries.
+
+    Args:
+        clip: The composed clip to render.
+        output_path: Video file to write.
+        fps: Output frame rate.
+        workers: Number of render processes, defaults to the CPU count up to MAX_DEFAULT_WORKERS.
+        batch_frames: Consecutive frames rendered by one worker (keeps each worker's decoders sequential).
+        ring_frames: Frames held in shared memory, defaults to (workers + 1) * batch_frames and capped
+            at MAX_RING_BYTES. When the ring doesn't fit in /dev/shm, the clip is rendered in a single process.
+        codec: ffmpeg video codec.
+        preset: Encoder preset.
+        ffmpeg_params: Extra encoder parameters (e.g. a subtitles filter).
+        audio: Write the clip's audio and mux it into the output.
+        audio_codec: Audio codec of the muxed track.
+        audio_bitrate: Audio bitrate of the muxed track.
+        drop_duplicates: Write a variable frame rate stream without the repeated frames. Still frames
+            cost almost nothing to compose with FastCompositeVideoClip, and are then not encoded at all.
+    """
+    if drop_duplicates:
+        ffmpeg_params = drop_duplicate_frames_params(ffmpeg_params, fps)
+    started = time.perf_counter()
+    times = np.arange(0, clip.duration, 1.0 / fps)
+    workers = workers or min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+    width, height = clip.size
+    frame_bytes = width * height * 3
+    ring_frames = _fit_ring_frames(ring_frames or (workers + 1) * batch_frames, workers, frame_bytes)
+    if workers <= 1 or "fork" not in mp.get_all_start_methods() or not ring_frames:
+        logging.info("Parallel rendering unavailable (single CPU, no fork or not enough shared memory), "
+                     "rendering in a single process")
+        clip.write_videofile(output_path, fps=fps, codec=codec, preset=preset, ffmpeg_params=ffmpeg_params,
+                             audio=audio and clip.audio is not None, audio_codec=audio_codec, audio_bitrate=audio_bitrate)
+        check_quota()
+        record_render("serial", len(times), clip.duration, time.perf_counter() - started)
+        return output_path
+
+    with_audio = audio and clip.audio is not None
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    video_path = scratch_path("render_video_", ".mp4", fallback_dir=output_dir) if with_audio else output_path
+
+    context = mp.get_context("fork")
+    memory = shared_memory.SharedMemory(create=True, size=ring_frames * frame_bytes)
+    ring = np.ndarray((ring_frames, height, width, 3), dtype=np.uint8, buffer=memory.buf)
+    ready = context.Array("q", [-1] * ring_frames, lock=False)
+    written = context.Value("q", 0, lock=False)
+    abort = context.Value("b", 0, lock=False)
+    condition = context.Condition()
+
+    logging.info(f"Rendering {len(times)} frames with {workers} processes")
+    processes = [context.Process(target=_render_worker, daemon=True,
+                                 args=(clip, index, workers, batch_frames, times, ring, ready, written, abort, condition))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+
+    encoder = sp.Popen(_encoder_command(video_path, (width, height), fps, codec, preset, ffmpeg_params),
+                       stdin=sp.PIPE, stdout=sp.DEVNULL, stderr=sp.PIPE)
+    try:
+        for index in range(len(times)):
+            slot = index % ring_frames
+            with condition:
+                while ready[slot] != index:
+                    if abort.value or any(process.exitcode not in (None, 0) for process in processes):
+                        raise RuntimeError("A render worker failed")
+                    condition.wait(WAIT_TIMEOUT)
+            encoder.stdin.write(memory.buf[slot * frame_bytes:(slot + 1) * frame_bytes])
+            with condition:
+                written.value = index + 1
+                condition.notify_all()
+    except BaseException:
+        with condition:
+            abort.value = 1
+            condition.notify_all()
+        raise
+    finally:
+        encoder.stdin.close()
+        encoder.wait()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        del ring
+        memory.close()
+        memory.unlink()
+
+    if encoder.returncode != 0:
+        raise RuntimeError(f"Error encoding {video_path}: {encoder.stderr.read().decode(errors='ignore')}")
+    encoder.stderr.close()
+    check_quota()
+
+    if with_audio:
+        audio_path = scratch_path("render_audio_", ".m4a", fallback_dir=output_dir)
+        try:
+            clip.audio.write_audiofile(audio_path, fps=44100, codec=audio_codec, bitrate=audio_bitrate, logger=None)
+            check_quota()
+            mux_audio(video_path, audio_path, output_path)
+        finally:
+            for path in (video_path, audio_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    record_render("parallel", len(times), clip.duration, time.perf_counter() - started)
+    logging.info(f"Rendered {output_path}")
+    return output_path
@@ -0,0 +1,136 @@
+import os
+import logging
+import numpy as np
+from functools import lru_cache
+from typing import Literal, Optional
+
+from PIL import Image, ImageDraw, ImageFont, ImageColor
+from moviepy.video.VideoClip import ImageClip
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "captions", "fonts")
+TEXT_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=64)
+def load_font(font: Optional[str], font_size: int) -> ImageFont.FreeTypeFont:
+    """
+    Load a font once per (font, size). font can be a path, a file in the captions fonts
+    directory or a system font name; unknown fonts fall back to Pillow's default font.
+    """
+    candidates = []
+    if font:
+        candidates = [font, os.path.join(FONTS_DIR, font)]
+        if not os.path.splitext(font)[1]:
+            candidates += [f"{font}.ttf", os.path.join(FONTS_DIR, f"{font}.ttf"), os.path.join(FONTS_DIR, f"{font}.otf")]
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, font_size)
+        except OSError:
+            continue
+    if font:
+        logging.warning(f"Font {font} not found. Using default font.")
+    return ImageFont.load_default(font_size)
+
+
+def _to_rgba(color) -> Optional[tuple]:
+    if color is None or color == "transparent":
+        return None
+    if isinstance(color, str):
+        color = ImageColor.getrgb(color)
+    color = tuple(int(c) for c in color)
+    return color if len(color) == 4 else color + (255,)
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: Optional[float]) -> list[str]:
+    """Greedy word wrap to max_width pixels, keeping explicit line breaks."""
+    lines = []
+    for paragraph in text.split("\n"):
+        words = paragraph.split()
+        if not words or max_width is None:
+            lines.append(paragraph)
+            continue
+        line = words[0]
+        for word in words[1:]:
+            candidate = f"{line} {word}"
+            if font.getlength(candidate) <= max_width:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+    return lines
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _render(text: str, font: Optional[str], font_size: int, color: tuple, width: Optional[int], height: Optional[int],
+            align: str, stroke_color: Optional[tuple], stroke_width: int, shadow_color: Optional[tuple],
+            shadow_offset: int, bg_color: Optional[tuple], line_spacing: float) -> np.ndarray:
+    pil_font = load_font(font, font_size)
+    padding = stroke_width
+    lines = wrap_text(text, pil_font, width - 2 * padding if width else None)
+
+    ascent, descent = pil_font.getmetrics()
+    line_height = int(round((ascent + descent) * line_spacing))
+    line_widths = [pil_font.getlength(line) for line in lines]
+    text_height = line_height * (len(lines) - 1) + ascent + descent + 2 * padding + shadow_offset
+
+    canvas_width = width or int(np.ceil(max(line_widths, default=0))) + 2 * padding + shadow_offset
+    canvas_height = height or text_height
+    image = Image.new("RGBA", (canvas_width, canvas_height), bg_color or (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+
+    top = padding + max(0, (canvas_height - text_height) // 2)
+    layers = []
+    if shadow_color and shadow_offset:
+        layers.append((shadow_offset, shadow_color, shadow_color))
+    layers.append((0, color, stroke_color))
+    for offset, fill, stroke_fill in layers:
+        for index, (line, line_width) in enumerate(zip(lines, line_widths)):
+            if align == "left":
+                x = padding
+            elif align == "right":
+                x = canvas_width - padding - shadow_offset - line_width
+            else:
+                x = (canvas_width - shadow_offset - line_width) / 2
+            draw.text((x + offset, top + index * line_height + offset), line, font=pil_font, fill=fill,
+                      stroke_width=stroke_width if stroke_fill else 0, stroke_fill=stroke_fill)
+
+    array = np.asarray(image)
+    array.setflags(write=False)  # Shared by every caller through the cache
+    return array
+
+
+def render_text(text: str, font: Optional[str] = None, font_size: float = 48, color="white", width: Optional[float] = None,
+                height: Optional[float] = None, align: Literal["left", "center", "right"] = "center",
+                stroke_color=None, stroke_width: float = 0, shadow_color=None, shadow_offset: float = 0,
+                bg_color=None, line_spacing: float = 1.0) -> np.ndarray:
+    """
+    Rasterize text in-process with Pillow.
+
+    Args:
+        text: Text to render, wrapped to width when given.
+        font: Font path, file name in the captions fonts directory or system font name.
+        font_size: Font size in pixels.
+        color: Text color, as a name, hex string or RGB(A) tuple.
+        width: Box width; the text is word-wrapped inside it. Fits the text when None.
+        height: Box height; the text is vertically centered in it. Fits the text when None.
+        align: Horizontal alignment of the lines.
+        stroke_color: Outline color, no outline when None.
+        stroke_width: Outline width in pixels.
+        shadow_color: Drop shadow color, no shadow when None.
+        shadow_offset: Drop shadow offset in pixels (down and right).
+        bg_color: Box background, transparent when None.
+        line_spacing: Line height multiplier.
+
+    Returns:
+        np.ndarray: Read-only (height, width, 4) uint8 RGBA array. Identical requests share the same cached array.
+    """
+    return _render(text, font, int(round(font_size)), _to_rgba(color),
+                   int(width) if width else None, int(height) if height else None, align,
+                   _to_rgba(stroke_color), int(round(stroke_width)), _to_rgba(shadow_color),
+                   int(round(shadow_offset)), _to_rgba(bg_color), float(line_spacing))
+
+
+def text_clip(text: str, **style) -> ImageClip:
+    """Rendered text as an ImageClip with its alpha channel as mask. Accepts the render_text style arguments."""
+    return ImageClip(render_text(text, **style), transparent=True)
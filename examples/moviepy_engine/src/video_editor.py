@@ -1,38 +1,43 @@
 import os
+import asyncio
 import logging
 import requests
-from moviepy.editor import VideoFileClip, AudioFileClip, TextClip, CompositeVideoClip, ImageClip
-from openai import OpenAI
+# MoviePy modules are imported one by one: moviepy.editor pulls in every effect and IPython
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.video.VideoClip import ImageClip
+from moviepy.video.fx.crop import crop
+from moviepy.video.fx.resize import resize
 import pysrt
-from yt_dlp import YoutubeDL
 from pathlib import Path
 import uuid
 import re  # Added import for regular expression operations
 import json  # Added import for JSON operations
 
-from dotenv import load_dotenv
-
 # MEDIACHAIN
-from core.image.generation.image_generation import generate_image
-from core.image.utils.enhace_prompt import enhance_prompt
+from core.image.generation.image_generation import generate_images_as_completed
+from core.image.utils.enhace_prompt import enhance_prompts
+from core.video.embeddings.frame_index import FrameFeatureIndex
+from core.utils.workspace import scratch_path
+from core.utils.clients import get_env, get_openai_client
+from core.utils.metrics import track_call, record_download, record_cache_lookup
 
-# Load environment variables from .env file
-load_dotenv()
+from .background_library import BackgroundLibrary
+from .video_readers import CroppedVideoFileClip
+from .parallel_renderer import render_parallel
+from .compositor import FastCompositeVideoClip
+from .ken_burns import KenBurnsClip
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
-openai_api_key = os.getenv('OPENAI_API_KEY')
-
 def download_image(image_url):
     try:
         response = requests.get(image_url)
         if response.status_code == 200:
-            # Create a unique filename for the image in temp directory
-            unique_id = uuid.uuid4()
-            temp_dir = os.path.join('/tmp', 'moviepy')  # For Unix-like systems
-            os.makedirs(temp_dir, exist_ok=True)
-            image_path = os.path.join(temp_dir, f"image_{unique_id}.png")
+            record_download("image", len(response.content))
+            # Create a unique filename for the image in the job workspace (temp directory outside of a job)
+            image_path = scratch_path("image_", ".png", fallback_dir=os.path.join('/tmp', 'moviepy'))
             
             # Save the image content
             with open(image_path, 'wb') as f:
@@ -48,16 +53,26 @@ def download_image(image_url):
 
 class VideoEditor:
     def __init__(self):
-        self.openai = OpenAI(api_key=openai_api_key)
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
+        downloads_dir = os.path.join(self.base_dir, '..', 'downloads')
+        self.background_library = BackgroundLibrary(
+            downloads_dir,
+            feature_index=FrameFeatureIndex(os.path.join(downloads_dir, 'features'))
+        )
+
+    @property
+    def openai(self):
+        return get_openai_client()
 
     def download_video(self, youtube_url, quality="480"):
+        from yt_dlp import YoutubeDL  # Only needed to download
+
         try:
             downloads_dir = os.path.join(self.base_dir, '..', 'downloads')
             os.makedirs(downloads_dir, exist_ok=True)
             
             # First extract info without downloading to get video details
-            with YoutubeDL({'quiet': True}) as ydl:
+            with YoutubeDL({'quiet': True}) as ydl, track_call("yt_dlp", "info"):
                 info_dict = ydl.extract_info(youtube_url, download=False)
                 video_id = info_dict['id']
             
@@ -67,8 +82,10 @@ class VideoEditor:
             video_path = os.path.join(downloads_dir, f"{safe_filename}.mp4")
             
             # Check if file already exists
+            record_cache_lookup("background_videos", os.path.exists(video_path))
             if os.path.exists(video_path):
                 logging.info(f"Video already exists at {quality_suffix}: {video_path}")
+                self.index_background_video(video_path, video_id=safe_filename)
                 return video_path
             
             ydl_opts = {
@@ -81,24 +98,31 @@ class VideoEditor:
                 }]
             }
             
-            with YoutubeDL(ydl_opts) as ydl:
+            with YoutubeDL(ydl_opts) as ydl, track_call("yt_dlp", "download"):
                 ydl.download([youtube_url])
+            record_download("yt_dlp", os.path.getsize(video_path))
 
             logging.info("Video downloaded successfully.")
+            self.index_background_video(video_path, video_id=safe_filename)
             return video_path
         except Exception as e:
             logging.error(f"Error downloading video: {e}")
             return None
 
+    def index_background_video(self, video_path, video_id=None):
+        """Add a downloaded video to the background library, the download stays usable if indexing fails."""
+        try:
+            return self.background_library.register(video_path, video_id=video_id)
+        except Exception as e:
+            logging.error(f"Error indexing background video: {e}")
+            return None
+
     def cut_video(self, video_path, start_time, end_time):
         if not os.path.exists(video_path):
             logging.error(f"Video file does not exist, {video_path}")
             return
         try:
-            unique_id = uuid.uuid4()
-            assets_dir = os.path.join(self.base_dir, '..', 'assets')
-            os.makedirs(assets_dir, exist_ok=True)
-            output_path = os.path.join(assets_dir, f"cut_video_{unique_id}.mp4")
+            output_path = scratch_path("cut_video_", ".mp4", fallback_dir=os.path.join(self.base_dir, '..', 'assets'))
             
             clip = VideoFileClip(video_path)
             cut_clip = clip.subclip(start_time, end_time)
@@ -127,6 +151,16 @@ class VideoEditor:
             logging.error(f"Error adding audio to video: {e}")
             return None
     
+    def load_video_9_16(self, video_path, target_height=None) -> VideoFileClip:
+        """Open a video already center-cropped to 9:16 (and optionally scaled) by ffmpeg at decode time."""
+        try:
+            video_clip = CroppedVideoFileClip(video_path, crop="9:16", target_height=target_height)
+            logging.info(f"Video loaded cropped to 9:16: {video_clip.size}")
+            return video_clip
+        except Exception as e:
+            logging.error(f"Error loading cropped video: {e}")
+            return None
+
     def crop_video_9_16(self, video_clip: VideoFileClip) -> VideoFileClip:
         try:
             # Crop the video to TikTok format (9:16 aspect ratio)
@@ -137,7 +171,7 @@ class VideoEditor:
 
             if target_width < video_width:
                 # Center crop horizontally
-                cropped_clip = video_clip.crop(x_center=video_width / 2, width=target_width, height=target_height)
+                cropped_clip = crop(video_clip, x_center=video_width / 2, width=target_width, height=target_height)
             else:
                 # If the video is already narrower than 9:16, don't crop
                 cropped_clip = video_clip
@@ -148,7 +182,7 @@ class VideoEditor:
             logging.error(f"Error cropping video: {e}")
             return None
 
-    def add_captions_to_video(self, video_clip, subtitles_clips:list) -> CompositeVideoClip:
+    def add_captions_to_video(self, video_clip, subtitles_clips:list) -> FastCompositeVideoClip:
         try:
             if video_clip is None:
                 raise ValueError("video_clip is None")
@@ -159,14 +193,14 @@ class VideoEditor:
                 subtitles_clips = [subtitles_clips] if subtitles_clips else []
 
             # Combine the video and subtitle clips
-            final_clip = CompositeVideoClip([video_clip] + subtitles_clips)
+            final_clip = FastCompositeVideoClip([video_clip] + subtitles_clips)
             logging.info("Captions added to video successfully.")
             return final_clip
         except Exception as e:
             logging.error(f"Error adding captions to video: {e}")
             return None
 
-    async def add_images_to_video(self, video_clip, images):
+    async def add_images_to_video(self, video_clip, images, max_concurrency=4, ken_burns: dict = None):
         """This function receives the following object
         **Example JSON Output:**
             {
@@ -179,25 +213,38 @@ class VideoEditor:
                 ]
             }
 
+        ken_burns: Optional KenBurnsClip arguments (zoom_start, zoom_end, pan_start, pan_end, easing)
+            to slowly zoom/pan over every image instead of showing it still.
         """
         logging.info("Adding images to video", images)
         clips = [video_clip]
         video_duration = video_clip.duration
         
         logging.info("Enhancing prompts")
-        # Enhance prompts and generate images
-        for i, image_object in enumerate(images):
-            prompt = image_object["prompt"]
-            enhanced_prompt = enhance_prompt("openai", openai_api_key, prompt, model="gpt-3.5-turbo-0125")
+        # Enhance all prompts with a single LLM call
+        prompts = [image_object["prompt"] for image_object in images]
+        try:
+            enhanced_prompts = enhance_prompts("openai", get_env('OPENAI_API_KEY'), prompts, model="gpt-3.5-turbo-0125")
+        except Exception as e:
+            logging.error(f"Error enhancing prompts, using the original prompts: {e}")
+            enhanced_prompts = prompts
+        for i, enhanced_prompt in enumerate(enhanced_prompts):
             images[i]["enhanced_prompt"] = enhanced_prompt
 
         logging.info("Generating images")
-        # Generate and download images
-        for i, image_object in enumerate(images):
-            image_url = await generate_image(service="pollinations", prompt=image_object["enhanced_prompt"])
+        # Generate every image in one batch, and download each one as soon as it is ready
+        downloads = []
+        async for i, image_url in generate_images_as_completed([image_object["enhanced_prompt"] for image_object in images],
+                                                               service="auto", max_concurrency=max_concurrency,
+                                                               return_exceptions=True):
+            images[i]["image_url"], images[i]["image_path"] = None, None
+            if isinstance(image_url, Exception):
+                logging.error(f"Error generating image for prompt {images[i]['enhanced_prompt']}: {image_url}")
+                continue
             images[i]["image_url"] = image_url
-            image_path = download_image(image_object["image_url"])
-            images[i]["image_path"] = image_path
+            downloads.append((i, asyncio.create_task(asyncio.to_thread(download_image, image_url))))
+        for i, download in downloads:
+            images[i]["image_path"] = await download
 
         logging.info("Adding images to video")
         # Add images with timestamps
@@ -215,17 +262,23 @@ class VideoEditor:
                     
                     duration = end_time - start_time
                     
-                    image_clip = (ImageClip(image_object["image_path"])
+                    image_clip = ImageClip(image_object["image_path"])
+                    if ken_burns:
+                        height = video_clip.h / 3
+                        size = (round(image_clip.w * height / image_clip.h), round(height))
+                        image_clip = KenBurnsClip(image_clip.img, size, duration, **ken_burns)
+                    else:
+                        image_clip = resize(image_clip, height=video_clip.h / 3)
+                    image_clip = (image_clip
                                 .set_duration(duration)
                                 .set_position(('center', 70))
-                                .resize(height=video_clip.h / 3)
                                 .set_start(start_time))
                     
                     clips.append(image_clip)
                 except Exception as e:
                     logging.error(f"Error processing image at timestamp {image_object['timestamp']}: {e}")
         
-        return CompositeVideoClip(clips)
+        return FastCompositeVideoClip(clips)
 
     def render_final_video(self, final_clip) -> str:
         """Render the final video with all components added."""
@@ -241,9 +294,10 @@ class VideoEditor:
         if height % 2 != 0:
             height -= 1
         
-        final_clip = final_clip.resize(newsize=(width, height))
+        final_clip = resize(final_clip, newsize=(width, height))
         
-        final_clip.write_videofile(
+        render_parallel(
+            final_clip,
             output_path,
             codec='libx264',
             preset='veryfast',
@@ -251,7 +305,6 @@ class VideoEditor:
             audio_codec='aac',
             audio_bitrate='128k',
             fps=30
-
         )
         
         logging.info("Final video rendered successfully.")
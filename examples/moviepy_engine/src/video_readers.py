@@ -0,0 +1,113 @@
+import os
+import subprocess as sp
+
+from moviepy.video.io.VideoFileClip import VideoFileClip
+from moviepy.video.VideoClip import VideoClip
+from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+
+from .ffmpeg_utils import get_ffmpeg_binary, center_crop_9_16_box
+
+
+class CroppedFFMPEG_VideoReader(FFMPEG_VideoReader):
+    """
+    FFMPEG_VideoReader that crops and scales inside the ffmpeg decode command,
+    so only the pixels we keep are sent through the pipe.
+
+    Args:
+        crop: (x, y, width, height) box in source pixels, or "9:16" for a centered 9:16 crop.
+        target_height: Output height, the width follows the cropped aspect ratio.
+    """
+
+    def __init__(self, filename, crop=None, target_height=None, **kwargs):
+        self.crop = crop
+        self.target_height = target_height
+        self.crop_box = None
+        super().__init__(filename, **kwargs)
+
+    def _resolve_output(self):
+        source_width, source_height = self.size
+        if self.crop == "9:16":
+            self.crop_box = center_crop_9_16_box(source_width, source_height)
+        elif self.crop:
+            self.crop_box = tuple(int(value) for value in self.crop)
+        else:
+            self.crop_box = (0, 0, source_width, source_height)
+
+        _, _, crop_width, crop_height = self.crop_box
+        if self.target_height:
+            height = int(self.target_height)
+            width = int(round(crop_width * height / crop_height))
+            self.size = (width, height)
+        else:
+            self.size = (crop_width, crop_height)
+
+        self.bufsize = self.depth * self.size[0] * self.size[1] + 100
+
+    def initialize(self, starttime=0):
+        """Opens the file, creates the pipe with the crop and scale filters."""
+        self.close()  # if any
+
+        if self.crop_box is None:
+            self._resolve_output()
+
+        if starttime != 0:
+            offset = min(1, starttime)
+            i_arg = ['-ss', "%.06f" % (starttime - offset),
+                     '-i', self.filename,
+                     '-ss', "%.06f" % offset]
+        else:
+            i_arg = ['-i', self.filename]
+
+        x, y, crop_width, crop_height = self.crop_box
+        video_filter = 'crop=%d:%d:%d:%d,scale=%d:%d' % (crop_width, crop_height, x, y, self.size[0], self.size[1])
+
+        cmd = ([get_ffmpeg_binary()] + i_arg +
+               ['-loglevel', 'error',
+                '-f', 'image2pipe',
+                '-vf', video_filter,
+                '-sws_flags', self.resize_algo,
+                '-pix_fmt', self.pix_fmt,
+                '-vcodec', 'rawvideo', '-'])
+        popen_params = {"bufsize": self.bufsize,
+                        "stdout": sp.PIPE,
+                        "stderr": sp.PIPE,
+                        "stdin": sp.DEVNULL}
+
+        if os.name == "nt":
+            popen_params["creationflags"] = 0x08000000
+
+        self.proc = sp.Popen(cmd, **popen_params)
+
+
+class CroppedVideoFileClip(VideoFileClip):
+    """
+    VideoFileClip whose frames are cropped and scaled by ffmpeg at decode time,
+    replacing a per-frame `crop` / `resize` on full-size NumPy frames.
+    """
+
+    def __init__(self, filename, crop=None, target_height=None, audio=True,
+                 audio_buffersize=200000, resize_algorithm='bicubic',
+                 audio_fps=44100, audio_nbytes=2, fps_source='tbr'):
+
+        VideoClip.__init__(self)
+
+        self.reader = CroppedFFMPEG_VideoReader(filename, crop=crop, target_height=target_height,
+                                                resize_algo=resize_algorithm, fps_source=fps_source)
+
+        self.duration = self.reader.duration
+        self.end = self.reader.duration
+
+        self.fps = self.reader.fps
+        self.size = self.reader.size
+        self.rotation = self.reader.rotation
+
+        self.filename = self.reader.filename
+
+        self.make_frame = lambda t: self.reader.get_frame(t)
+
+        if audio and self.reader.infos['audio_found']:
+            self.audio = AudioFileClip(filename,
+                                       buffersize=audio_buffersize,
+                                       fps=audio_fps,
+                                       nbytes=audio_nbytes)